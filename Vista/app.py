@@ -9,7 +9,24 @@ import pymysql
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from process.main import PlateRecognition
-from db.main import connection  # Importar la conexión a la base de datos
+from db.main import connection, DB_PARAMS  # Importar la conexión a la base de datos
+from db.plate_index import PlateIndex
+from db.retention import CaptureIndex, RetentionManager, RetentionService
+from process.near_duplicates import NearDuplicateFilter
+from Vista.thumbnails import ThumbnailCache, ThumbnailLoader
+from Vista.roi_editor import RoiEditorDialog
+from process.roi import RoiStore
+from process.metrics import (MetricsRegistry, register_process_metrics, start_metrics_server, frames_dropped,
+                             db_write_latency, queue_depth, timed)
+
+# Número de capturas cargadas desde la base de datos por página
+GALLERY_PAGE_SIZE = 20
+
+# Ventana en segundos en la que una placa (o una variante OCR cercana) se considera repetida
+PLATE_DEDUP_SECONDS = 600
+
+# Nombre de la fuente en la sección [ROI] de weapon_config.ini
+ROI_SOURCE = 'plate_camera'
 
 # Crear una carpeta para guardar las capturas si no existe
 os.makedirs('captures', exist_ok=True)
@@ -51,6 +68,7 @@ class VideoWindow(QMainWindow):
 
         # Scroll area para las capturas
         scroll_area = QScrollArea()
+        self.scroll_area = scroll_area
         scroll_widget = QWidget()
         scroll_widget.setLayout(self.capture_list)
         scroll_area.setWidget(scroll_widget)
@@ -64,9 +82,16 @@ class VideoWindow(QMainWindow):
         self.video_frame.setAlignment(Qt.AlignCenter)
         self.video_frame.setStyleSheet("background-color: #23272A; border: 2px solid #7289DA;")
 
+        # Botón para editar la región de interés bajo el video
+        roi_button = QPushButton("Editar región de interés")
+        roi_button.clicked.connect(self.edit_roi)
+        video_layout = QVBoxLayout()
+        video_layout.addWidget(self.video_frame)
+        video_layout.addWidget(roi_button)
+
         # Añadir secciones al layout principal
         main_layout.addWidget(scroll_area)
-        main_layout.addWidget(self.video_frame)
+        main_layout.addLayout(video_layout)
 
         # Crear widget central y establecer layout
         central_widget = QWidget()
@@ -74,57 +99,176 @@ class VideoWindow(QMainWindow):
         self.setCentralWidget(central_widget)
 
         # Configuración de la cámara y procesamiento
-        self.processor = PlateRecognition()
+        self.roi_store = RoiStore()
+        self.processor = PlateRecognition(roi=self.roi_store.get(ROI_SOURCE))
+        self.last_frame = None
         self.cap = cv2.VideoCapture('examples/image_example.jpeg')  
         # Temporizador para actualizar el video en tiempo real
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_frame)
         self.timer.start(30)  # Actualización cada 30 ms
 
-        # Inicializar un conjunto para almacenar placas guardadas
-        self.saved_plates = set()
-
-        # Cargar capturas existentes de la base de datos al iniciar
+        # Índice persistente de placas guardadas (tolera variantes del OCR)
+        self.plate_index = PlateIndex()
+        # Última placa consultada por vehículo seguido (track_id -> placa)
+        self.reported_plates = {}
+
+        # Vehículos casi idénticos reutilizan la captura ya escrita en disco
+        self.duplicate_filter = NearDuplicateFilter()
+
+        # Retención de capturas en segundo plano
+        self.capture_index = CaptureIndex()
+        # Miniaturas generadas en segundo plano y cacheadas en disco; la retención borra las de capturas que ya no existen
+        self.thumbnail_cache = ThumbnailCache()
+        self.retention_service = RetentionService(RetentionManager(self.capture_index, connection_params=DB_PARAMS,
+                                                                   thumbnail_cache=self.thumbnail_cache))
+        self.retention_service.start()
+        self.thumbnail_loader = ThumbnailLoader(self.thumbnail_cache)
+        self.thumbnail_loader.thumbnail_ready.connect(self.set_card_thumbnail)
+        self.thumbnail_loader.start()
+        self.card_images = {}
+
+        # Paginación de la galería por clave: id de la última captura cargada (None antes de la primera página).
+        # Si la tabla Informacion no tiene columna id se pasa a páginas por desplazamiento, sin orden garantizado
+        self.gallery_last_id = None
+        self.gallery_keyset = True
+        self.gallery_offset = 0
+        self.gallery_exhausted = False
+        scroll_area.verticalScrollBar().valueChanged.connect(self.on_gallery_scroll)
+        scroll_area.verticalScrollBar().rangeChanged.connect(self.on_gallery_range_changed)
+
+        # Métricas del proceso en el endpoint local ([METRICS] de weapon_config.ini)
+        self.metrics = MetricsRegistry()
+        register_process_metrics(self.metrics)
+        self.processor.register_metrics(self.metrics, ROI_SOURCE)
+        self.frames_dropped = frames_dropped(self.metrics, ROI_SOURCE)
+        self.db_write_latency = db_write_latency(self.metrics, ROI_SOURCE, 'Informacion')
+        queue_depth(self.metrics, ROI_SOURCE, 'thumbnails', self.thumbnail_loader.requests.qsize)
+        self.metrics_server = start_metrics_server(self.metrics, 'plate_app')
+
+        # Cargar la primera página de capturas de la base de datos al iniciar
         self.load_saved_captures()
 
     def load_saved_captures(self):
+        if self.gallery_exhausted:
+            return
+        cursor = None
         try:
             # Conexión a la base de datos
             cursor = connection.cursor()
 
-            # Consulta para obtener todas las placas y las rutas de las imágenes guardadas
-            cursor.execute("SELECT num_placa, imagen FROM Informacion")
-            rows = cursor.fetchall()
+            if self.gallery_keyset:
+                try:
+                    rows = self.fetch_gallery_page(cursor)
+                except pymysql.MySQLError as e:
+                    # 1054: columna desconocida (tabla creada sin id); se avisa y se sigue sin paginación por clave
+                    if not e.args or e.args[0] != 1054:
+                        raise
+                    print(f"[WARN] Galería sin paginación por id ({e}); se cargan páginas sin orden")
+                    self.statusBar().showMessage("Galería sin columna id en Informacion: capturas sin orden")
+                    self.gallery_keyset = False
+                    self.gallery_offset = 0
+            if not self.gallery_keyset:
+                cursor.execute("SELECT NULL, num_placa, imagen FROM Informacion LIMIT %s OFFSET %s",
+                               (GALLERY_PAGE_SIZE, self.gallery_offset))
+                rows = cursor.fetchall()
+                self.gallery_offset += len(rows)
+            if len(rows) < GALLERY_PAGE_SIZE:
+                self.gallery_exhausted = True
 
             # Iterar sobre los resultados y agregar a la interfaz
             for row in rows:
-                license_plate, image_path = row
-                if os.path.exists(image_path):
+                _, license_plate, image_path = row
+                if image_path not in self.card_images and os.path.exists(image_path):
                     self.add_capture_card(license_plate, image_path)
 
         except pymysql.MySQLError as e:
             print(f"Error al cargar datos desde la base de datos: {e}")
         finally:
-            cursor.close()
+            if cursor is not None:
+                cursor.close()
+
+    def fetch_gallery_page(self, cursor):
+        # Consulta paginada por id, de la más reciente a la más antigua: las filas insertadas
+        # mientras se recorre la galería no repiten ni saltan capturas
+        if self.gallery_last_id is None:
+            cursor.execute("SELECT id, num_placa, imagen FROM Informacion ORDER BY id DESC LIMIT %s",
+                           (GALLERY_PAGE_SIZE,))
+        else:
+            cursor.execute("SELECT id, num_placa, imagen FROM Informacion WHERE id < %s "
+                           "ORDER BY id DESC LIMIT %s", (self.gallery_last_id, GALLERY_PAGE_SIZE))
+        rows = cursor.fetchall()
+        if rows:
+            self.gallery_last_id = rows[-1][0]
+        return rows
+
+    def on_gallery_scroll(self, value):
+        # Cargar la siguiente página al acercarse al final de la lista
+        scroll_bar = self.scroll_area.verticalScrollBar()
+        if value >= scroll_bar.maximum() - 200:
+            self.load_saved_captures()
+
+    def on_gallery_range_changed(self, minimum, maximum):
+        # Si la página cargada no llena la columna no hay scroll: cargar otra
+        self.on_gallery_scroll(self.scroll_area.verticalScrollBar().value())
 
     def update_frame(self):
         ret, frame = self.cap.read()
         if not ret:
+            self.frames_dropped.inc()
             return
 
-        # Procesar el frame para detectar la placa
-        vehicle_image, license_plate, info = self.processor.process_vehicular_plate(frame, True, True)
+        # Procesar el frame para detectar las placas de todos los vehículos
+        vehicle_image, vehicles = self.processor.process_vehicular_plates(frame, True, True)
 
         # Mostrar el frame en la ventana derecha
         self.display_video(vehicle_image)
-
-        # Si la placa fue identificada y no está repetida, guardar una captura
-        if license_plate and license_plate not in self.saved_plates:
-            self.saved_plates.add(license_plate)
-            capture_filename = f'captures/{license_plate}.png'
-            cv2.imwrite(capture_filename, vehicle_image)
-            self.save_to_database(license_plate, capture_filename)
-            self.add_capture_card(license_plate, capture_filename)
+        self.last_frame = vehicle_image
+
+        # Guardar una captura por cada placa identificada que no esté repetida, con el recorte limpio
+        # del vehículo en el frame del que se leyó la placa (el vehículo puede haber salido ya de
+        # la escena cuando el OCR termina)
+        # Cada placa de un vehículo se consulta una sola vez en el índice, no en cada frame
+        for vehicle in vehicles:
+            vehicle_crop = vehicle.get('vehicle_crop')
+            track_id, license_plate = vehicle['track_id'], vehicle['license_plate']
+            if not license_plate or self.reported_plates.get(track_id) == license_plate:
+                continue
+            self.reported_plates[track_id] = license_plate
+            if vehicle_crop is not None and vehicle_crop.size:
+                self.save_plate_capture(license_plate, vehicle_crop)
+        alive = {track.track_id for track in self.processor.tracker.tracks}
+        for track_id in [track_id for track_id in self.reported_plates if track_id not in alive]:
+            del self.reported_plates[track_id]
+
+    def edit_roi(self):
+        if self.last_frame is None:
+            return
+        # Pausar el video mientras se edita el polígono
+        self.timer.stop()
+        roi = self.processor.roi
+        dialog = RoiEditorDialog(self.last_frame.copy(), roi.polygon if roi else None, ROI_SOURCE, self)
+        if dialog.exec_() == RoiEditorDialog.Accepted:
+            self.roi_store.set(ROI_SOURCE, dialog.polygon())
+            self.processor.roi = self.roi_store.get(ROI_SOURCE)
+        self.timer.start(30)
+
+    def save_plate_capture(self, license_plate, vehicle_crop):
+        is_new, plate = self.plate_index.check_and_add(license_plate, PLATE_DEDUP_SECONDS)
+        # Una lectura que solo tenía ruido del OCR queda vacía al normalizarla
+        if not is_new or not plate:
+            return
+        capture_filename = f'captures/{plate}.png'
+        # El hash se calcula sobre el vehículo y no sobre el frame completo: con una cámara fija dos
+        # vehículos distintos dan frames casi iguales
+        previous_capture = self.duplicate_filter.check(vehicle_crop, capture_filename)
+        if previous_capture is not None:
+            capture_filename = previous_capture
+        else:
+            cv2.imwrite(capture_filename, vehicle_crop)
+            self.capture_index.register(capture_filename, 'plate')
+        self.save_to_database(plate, capture_filename)
+        self.add_capture_card(plate, capture_filename)
 
     def display_video(self, frame):
         # Convertir la imagen de OpenCV a formato compatible con PyQt5
@@ -146,11 +290,16 @@ class VideoWindow(QMainWindow):
         title = QLabel(f"Placa: {license_plate}")
         title.setAlignment(Qt.AlignCenter)
 
-        # Mostrar la imagen en la carta
-        image_label = QLabel()
-        pixmap = QPixmap(image_path)
-        pixmap = pixmap.scaled(250, 150, Qt.KeepAspectRatio)
-        image_label.setPixmap(pixmap)
+        # Mostrar la miniatura en la carta (se genera en segundo plano si no existe)
+        image_label = QLabel("Cargando...")
+        image_label.setAlignment(Qt.AlignCenter)
+        image_label.setFixedSize(250, 150)
+        self.card_images[image_path] = image_label
+        thumb_path = self.thumbnail_cache.get(image_path)
+        if thumb_path is not None:
+            image_label.setPixmap(QPixmap(thumb_path))
+        else:
+            self.thumbnail_loader.request(image_path)
 
         # Añadir título e imagen al layout de la carta
         card_layout.addWidget(title)
@@ -164,6 +313,11 @@ class VideoWindow(QMainWindow):
 
         self.capture_list.addWidget(card_widget)
 
+    def set_card_thumbnail(self, image_path, thumb_path):
+        image_label = self.card_images.get(image_path)
+        if image_label is not None:
+            image_label.setPixmap(QPixmap(thumb_path))
+
     def show_large_image(self, license_plate, image_path):
         # Crear una ventana secundaria para mostrar la imagen en grande
         large_image_window = QMainWindow(self)
@@ -208,14 +362,26 @@ class VideoWindow(QMainWindow):
 
             # Insertar información en la base de datos
             query = "INSERT INTO Informacion (num_placa, imagen) VALUES (%s, %s)"
-            cursor.execute(query, (license_plate, image_path))
-            connection.commit()
+            with timed(self.db_write_latency):
+                cursor.execute(query, (license_plate, image_path))
+                connection.commit()
 
         except pymysql.MySQLError as e:
             print(f"Error al guardar en la base de datos: {e}")
         finally:
             cursor.close()
 
+    def closeEvent(self, event):
+        self.timer.stop()
+        self.processor.close()
+        self.thumbnail_loader.stop()
+        self.plate_index.close()
+        self.retention_service.stop()
+        self.capture_index.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        event.accept()
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = VideoWindow()
@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton
+from PyQt5.QtGui import QPixmap, QImage
+from PyQt5.QtCore import Qt, pyqtSignal
+
+
+class ClickableImage(QLabel):
+    # (x, y) normalizados al tamaño del frame; botón derecho deshace el último punto
+    point_added = pyqtSignal(float, float)
+    point_removed = pyqtSignal()
+
+    def __init__(self):
+        super().__init__()
+        self.setAlignment(Qt.AlignCenter)
+
+    def mousePressEvent(self, event):
+        pixmap = self.pixmap()
+        if pixmap is None:
+            return
+        if event.button() == Qt.RightButton:
+            self.point_removed.emit()
+            return
+        # La imagen está centrada en el label: convertir a coordenadas de la imagen
+        x = event.pos().x() - (self.width() - pixmap.width()) / 2.0
+        y = event.pos().y() - (self.height() - pixmap.height()) / 2.0
+        if 0 <= x <= pixmap.width() and 0 <= y <= pixmap.height():
+            self.point_added.emit(x / pixmap.width(), y / pixmap.height())
+
+
+class RoiEditorDialog(QDialog):
+    """
+    Editor de la región de interés de una fuente: clic izquierdo agrega un vértice, clic derecho
+    quita el último. Sin polígono (menos de 3 puntos) se procesa el frame completo.
+    """
+
+    def __init__(self, frame, polygon=None, source='', parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Región de interés - {source}" if source else "Región de interés")
+        self.frame = frame
+        self.points = list(polygon or [])
+
+        layout = QVBoxLayout(self)
+        help_label = QLabel("Clic izquierdo: agregar punto · Clic derecho: quitar último punto")
+        layout.addWidget(help_label)
+
+        self.image_label = ClickableImage()
+        self.image_label.setMinimumSize(640, 480)
+        self.image_label.point_added.connect(self.add_point)
+        self.image_label.point_removed.connect(self.remove_point)
+        layout.addWidget(self.image_label)
+
+        buttons = QHBoxLayout()
+        clear_btn = QPushButton("Limpiar (frame completo)")
+        clear_btn.clicked.connect(self.clear_points)
+        save_btn = QPushButton("Guardar")
+        save_btn.clicked.connect(self.accept)
+        cancel_btn = QPushButton("Cancelar")
+        cancel_btn.clicked.connect(self.reject)
+        buttons.addWidget(clear_btn)
+        buttons.addWidget(save_btn)
+        buttons.addWidget(cancel_btn)
+        layout.addLayout(buttons)
+
+        self.resize(900, 650)
+        self.refresh()
+
+    def add_point(self, x, y):
+        self.points.append((x, y))
+        self.refresh()
+
+    def remove_point(self):
+        if self.points:
+            self.points.pop()
+            self.refresh()
+
+    def clear_points(self):
+        self.points = []
+        self.refresh()
+
+    def polygon(self):
+        """Polígono normalizado, o None si no hay suficientes puntos"""
+        return self.points if len(self.points) >= 3 else None
+
+    def refresh(self):
+        preview = self.frame.copy()
+        h, w = preview.shape[:2]
+        pixel_points = np.array([(int(x * w), int(y * h)) for x, y in self.points], dtype=np.int32)
+        if len(pixel_points) >= 3:
+            overlay = preview.copy()
+            cv2.fillPoly(overlay, [pixel_points], (0, 255, 255))
+            preview = cv2.addWeighted(preview, 0.7, overlay, 0.3, 0)
+        if len(pixel_points) >= 2:
+            cv2.polylines(preview, [pixel_points], len(pixel_points) >= 3, (0, 255, 255), 2)
+        for point in pixel_points:
+            cv2.circle(preview, tuple(int(v) for v in point), 5, (0, 0, 255), -1)
+
+        rgb_image = cv2.cvtColor(preview, cv2.COLOR_BGR2RGB)
+        q_image = QImage(rgb_image.data, w, h, 3 * w, QImage.Format_RGB888)
+        pixmap = QPixmap.fromImage(q_image).scaled(self.image_label.width(), self.image_label.height(),
+                                                   Qt.KeepAspectRatio)
+        self.image_label.setPixmap(pixmap)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.refresh()
@@ -0,0 +1,115 @@
+import os
+import hashlib
+import queue
+import cv2
+from PyQt5.QtCore import QThread, pyqtSignal
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir: str = 'captures/.thumbnails', size: tuple = (250, 150)):
+        self.cache_dir = cache_dir
+        self.width, self.height = size
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def source_key(self, image_path: str) -> str:
+        # every thumbnail of one source shares this prefix, whatever version of the file it was made from
+        return hashlib.sha1(os.path.abspath(image_path).encode('utf-8')).hexdigest()
+
+    def thumbnail_path(self, image_path: str) -> str:
+        # the key changes whenever the source file is rewritten, so stale thumbnails are never served
+        stat = os.stat(image_path)
+        key = f'{stat.st_mtime_ns}:{stat.st_size}:{self.width}x{self.height}'
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f'{self.source_key(image_path)}_{digest}.jpg')
+
+    def forget(self, image_path: str) -> int:
+        # called when the source is deleted or rewritten (retention)
+        return self._remove(lambda name: name.startswith(f'{self.source_key(image_path)}_'))
+
+    def prune(self) -> int:
+        # a rewritten source leaves its older thumbnails behind: keep only the newest one per source
+        newest = {}
+        with os.scandir(self.cache_dir) as iterator:
+            for entry in iterator:
+                # names without a source prefix come from the older unkeyed layout and are all removed
+                if entry.is_file() and self._is_thumbnail(entry.name) and '_' in entry.name:
+                    source, mtime = entry.name.split('_')[0], entry.stat().st_mtime
+                    if source not in newest or mtime > newest[source][1]:
+                        newest[source] = (entry.name, mtime)
+        keep = {name for name, _ in newest.values()}
+        return self._remove(lambda name: name not in keep)
+
+    @staticmethod
+    def _is_thumbnail(name: str) -> bool:
+        # <source>_<version>.jpg; temp files being written are left alone
+        return name.endswith('.jpg') and not name.endswith('.tmp.jpg')
+
+    def _remove(self, matches) -> int:
+        removed = 0
+        with os.scandir(self.cache_dir) as iterator:
+            names = [entry.name for entry in iterator if entry.is_file() and self._is_thumbnail(entry.name)]
+        for name in names:
+            if matches(name):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def get(self, image_path: str):
+        try:
+            thumb_path = self.thumbnail_path(image_path)
+        except OSError:
+            return None
+        return thumb_path if os.path.exists(thumb_path) else None
+
+    def generate(self, image_path: str):
+        try:
+            thumb_path = self.thumbnail_path(image_path)
+        except OSError:
+            return None
+        if os.path.exists(thumb_path):
+            return thumb_path
+
+        image = cv2.imread(image_path)
+        if image is None:
+            return None
+        h, w = image.shape[:2]
+        scale = min(self.width / w, self.height / h, 1.0)
+        thumbnail = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))),
+                               interpolation=cv2.INTER_AREA)
+
+        # write to a temp file first so a half-written thumbnail is never picked up
+        tmp_path = f'{thumb_path}.tmp.jpg'
+        cv2.imwrite(tmp_path, thumbnail, [cv2.IMWRITE_JPEG_QUALITY, 85])
+        os.replace(tmp_path, thumb_path)
+        return thumb_path
+
+
+class ThumbnailLoader(QThread):
+    thumbnail_ready = pyqtSignal(str, str)
+
+    def __init__(self, cache: ThumbnailCache):
+        super().__init__()
+        self.cache = cache
+        self.requests = queue.Queue()
+        self.running = False
+
+    def request(self, image_path: str):
+        self.requests.put(image_path)
+
+    def run(self):
+        self.running = True
+        while self.running:
+            try:
+                image_path = self.requests.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            thumb_path = self.cache.generate(image_path)
+            if thumb_path is not None:
+                self.thumbnail_ready.emit(image_path, thumb_path)
+
+    def stop(self):
+        self.running = False
+        self.wait()
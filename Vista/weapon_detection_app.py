@@ -4,14 +4,38 @@ import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QLabel, QPushButton, QListWidget, 
                              QListWidgetItem, QFrame, QMessageBox, QSlider,
-                             QGroupBox, QGridLayout, QTextEdit, QSplitter)
+                             QGroupBox, QGridLayout, QTextEdit, QSplitter,
+                             QFileDialog, QProgressBar)
 from PyQt5.QtCore import QTimer, QThread, pyqtSignal, Qt
 from PyQt5.QtGui import QPixmap, QImage, QFont, QPalette, QColor
 import os
 from datetime import datetime
 import json
 import pymysql
-from process.weapon_detection import WeaponDetector
+from process.weapon_detection import WeaponDetector, DetectionParams
+from db.export import DetectionExporter, available_formats
+from db.retention import CaptureIndex, RetentionManager, RetentionService
+from process.roi import RoiStore
+from process.resolution import ResolutionController, resolution_config_from_ini
+from process.metrics import (MetricsRegistry, Counter, register_process_metrics, start_metrics_server,
+                             frames_dropped, db_write_latency, queue_depth, timed)
+from Vista.roi_editor import RoiEditorDialog
+
+DB_PARAMS = {
+    'host': "localhost",
+    'user': "root",
+    'password': "",
+    'db': "placas"
+}
+
+# Nombre de la fuente en la sección [ROI] de weapon_config.ini
+ROI_SOURCE = 'weapon_camera'
+
+EXPORT_FILTERS = {
+    'jsonl': "JSON Lines (*.jsonl)",
+    'csv': "CSV (*.csv)",
+    'parquet': "Parquet (*.parquet)"
+}
 
 class VideoThread(QThread):
     change_pixmap_signal = pyqtSignal(np.ndarray)
@@ -23,6 +47,13 @@ class VideoThread(QThread):
         self.running = False
         self.cap = None
         self.detection_enabled = True
+        self.roi = None
+        # Umbral y clases: la interfaz reemplaza la tupla, el hilo la lee una vez por frame
+        self.params = DetectionParams()
+        self.last_frame = None
+        # Frames emitidos a la interfaz y lecturas fallidas de la cámara (métricas)
+        self.frames_emitted = 0
+        self.frames_dropped = Counter()
         
     def run(self):
         self.cap = cv2.VideoCapture(0)  # Cámara web
@@ -30,21 +61,29 @@ class VideoThread(QThread):
         
         while self.running:
             ret, frame = self.cap.read()
+            if not ret:
+                self.frames_dropped.inc()
             if ret:
+                self.last_frame = frame
                 if self.detection_enabled:
-                    # Realizar detección de armas
-                    results, detections = self.weapon_detector.detect_weapons(frame)
+                    # Realizar detección de armas dentro de la región de interés
+                    roi = self.roi
+                    results, detections = self.weapon_detector.detect_weapons(frame, roi, self.params)
                     
                     # Dibujar detecciones
                     annotated_frame = self.weapon_detector.draw_detections(frame, detections)
+                    if roi is not None:
+                        annotated_frame = roi.draw(annotated_frame)
                     
                     # Emitir señal si se detectaron armas
                     if detections:
                         summary = self.weapon_detector.get_detection_summary(detections)
                         self.weapon_detected_signal.emit(detections, summary)
                     
+                    self.frames_emitted += 1
                     self.change_pixmap_signal.emit(annotated_frame)
                 else:
+                    self.frames_emitted += 1
                     self.change_pixmap_signal.emit(frame)
         
         if self.cap:
@@ -54,29 +93,75 @@ class VideoThread(QThread):
         self.running = False
         self.wait()
 
+class ExportThread(QThread):
+    progress_signal = pyqtSignal(int, int)
+    finished_signal = pyqtSignal(int, str)
+    error_signal = pyqtSignal(str)
+    
+    def __init__(self, exporter, path, export_format, detections_history):
+        super().__init__()
+        self.exporter = exporter
+        self.path = path
+        self.export_format = export_format
+        # Copia superficial: el hilo de la interfaz sigue agregando detecciones
+        self.detections_history = list(detections_history)
+        
+    def run(self):
+        try:
+            exported = self.exporter.export(self.path, self.export_format,
+                                            self.detections_history,
+                                            self.progress_signal.emit)
+            self.finished_signal.emit(exported, self.path)
+        except Exception as e:
+            self.error_signal.emit(str(e))
+
 class WeaponDetectionApp(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.weapon_detector = WeaponDetector()
+        # Tamaño de inferencia adaptativo según [DETECTION] de weapon_config.ini
+        resolution_config = resolution_config_from_ini()
+        resolution = ResolutionController(resolution_config, ROI_SOURCE) if resolution_config.enabled else None
+        self.weapon_detector = WeaponDetector(resolution=resolution)
+        self.roi_store = RoiStore()
         self.video_thread = VideoThread(self.weapon_detector)
+        self.video_thread.roi = self.roi_store.get(ROI_SOURCE)
         self.detections_history = []
+        self.export_thread = None
+        self.frames_shown = 0
         self.init_ui()
         self.setup_database()
+        self.setup_retention()
+        self.setup_metrics()
         
     def setup_database(self):
         """Configurar conexión a la base de datos"""
         try:
-            self.connection = pymysql.connect(
-                host="localhost",
-                user="root",
-                password="",
-                db="placas"
-            )
+            self.connection = pymysql.connect(**DB_PARAMS)
             self.create_weapons_table()
         except Exception as e:
             print(f"Error de conexión a BD: {e}")
             self.connection = None
     
+    def setup_retention(self):
+        """Iniciar el servicio de retención de capturas y exportaciones"""
+        self.capture_index = CaptureIndex()
+        manager = RetentionManager(self.capture_index,
+                                   connection_params=DB_PARAMS if self.connection else None)
+        self.retention_service = RetentionService(manager)
+        self.retention_service.start()
+    
+    def setup_metrics(self):
+        """Publicar las métricas del proceso en el endpoint local ([METRICS] de weapon_config.ini)"""
+        self.metrics = MetricsRegistry()
+        register_process_metrics(self.metrics)
+        self.weapon_detector.register_metrics(self.metrics, ROI_SOURCE)
+        self.video_thread.frames_dropped = frames_dropped(self.metrics, ROI_SOURCE)
+        # Frames emitidos por el hilo de video que la interfaz aún no ha mostrado
+        queue_depth(self.metrics, ROI_SOURCE, 'display',
+                    lambda: self.video_thread.frames_emitted - self.frames_shown)
+        self.db_write_latency = db_write_latency(self.metrics, ROI_SOURCE, 'weapon_detections')
+        self.metrics_server = start_metrics_server(self.metrics, 'weapon_app')
+    
     def create_weapons_table(self):
         """Crear tabla para almacenar detecciones de armas"""
         try:
@@ -202,6 +287,11 @@ class WeaponDetectionApp(QMainWindow):
         
         layout.addLayout(button_layout)
         
+        # Progreso de exportación
+        self.export_progress = QProgressBar()
+        self.export_progress.setVisible(False)
+        layout.addWidget(self.export_progress)
+        
         # Estadísticas
         stats_group = QGroupBox("Estadísticas")
         stats_layout = QGridLayout(stats_group)
@@ -261,6 +351,11 @@ class WeaponDetectionApp(QMainWindow):
         controls_layout.addWidget(confidence_label, 1, 0)
         controls_layout.addWidget(self.confidence_slider, 1, 1)
         
+        # Región de interés
+        self.roi_btn = QPushButton("Editar Región de Interés")
+        self.roi_btn.clicked.connect(self.edit_roi)
+        controls_layout.addWidget(self.roi_btn, 2, 0, 1, 2)
+        
         layout.addWidget(controls_group)
         
         # Panel de alertas
@@ -278,6 +373,7 @@ class WeaponDetectionApp(QMainWindow):
     
     def update_image(self, cv_img):
         """Actualizar imagen del video"""
+        self.frames_shown += 1
         rgb_image = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
         h, w, ch = rgb_image.shape
         bytes_per_line = ch * w
@@ -302,12 +398,12 @@ class WeaponDetectionApp(QMainWindow):
         # Mostrar alerta
         self.show_alert(summary)
         
-        # Guardar en base de datos
-        self.save_to_database(detection_info)
-        
         # Guardar imagen si es alerta alta
         if summary['alert_level'] == 'high':
-            self.save_detection_image(detections)
+            detection_info['image_path'] = self.save_detection_image(detections)
+        
+        # Guardar en base de datos
+        self.save_to_database(detection_info)
     
     def update_detections_list(self):
         """Actualizar lista de detecciones"""
@@ -368,7 +464,19 @@ class WeaponDetectionApp(QMainWindow):
     def update_confidence(self):
         """Actualizar umbral de confianza"""
         confidence = self.confidence_slider.value() / 100.0
-        self.weapon_detector.confidence_threshold = confidence
+        self.video_thread.params = self.video_thread.params._replace(confidence_threshold=confidence)
+    
+    def edit_roi(self):
+        """Editar el polígono de la región de interés sobre el último frame"""
+        frame = self.video_thread.last_frame
+        if frame is None:
+            QMessageBox.warning(self, "Región de interés", "Aún no hay video para editar la región")
+            return
+        roi = self.video_thread.roi
+        dialog = RoiEditorDialog(frame.copy(), roi.polygon if roi else None, ROI_SOURCE, self)
+        if dialog.exec_() == RoiEditorDialog.Accepted:
+            self.roi_store.set(ROI_SOURCE, dialog.polygon())
+            self.video_thread.roi = self.roi_store.get(ROI_SOURCE)
     
     def capture_frame(self):
         """Capturar frame actual"""
@@ -393,17 +501,21 @@ class WeaponDetectionApp(QMainWindow):
                 filename = f"captures/weapon_detection_{timestamp}.jpg"
                 
                 os.makedirs("captures", exist_ok=True)
-                self.weapon_detector.save_detection(frame, detections, filename)
+                saved_path = self.weapon_detector.save_unique_detection(frame, detections, filename)
+                if saved_path == filename:
+                    self.capture_index.register(filename, 'high')
+                return saved_path
+        return None
     
     def save_to_database(self, detection_info):
         """Guardar detección en base de datos"""
         if self.connection:
             try:
-                with self.connection.cursor() as cursor:
+                with timed(self.db_write_latency), self.connection.cursor() as cursor:
                     sql = """
                     INSERT INTO weapon_detections 
-                    (weapon_count, alert_level, detection_types, metadata)
-                    VALUES (%s, %s, %s, %s)
+                    (weapon_count, alert_level, detection_types, image_path, metadata)
+                    VALUES (%s, %s, %s, %s, %s)
                     """
                     detection_types = ', '.join(detection_info['summary']['detection_types'])
                     metadata = json.dumps(detection_info['detections'])
@@ -412,6 +524,7 @@ class WeaponDetectionApp(QMainWindow):
                         detection_info['summary']['weapons_detected'],
                         detection_info['summary']['alert_level'],
                         detection_types,
+                        detection_info.get('image_path'),
                         metadata
                     ))
                     self.connection.commit()
@@ -441,32 +554,83 @@ class WeaponDetectionApp(QMainWindow):
         self.update_statistics()
     
     def export_detections(self):
-        """Exportar detecciones a archivo"""
-        if not self.detections_history:
+        """Exportar detecciones a archivo en un hilo de trabajo"""
+        if self.export_thread is not None and self.export_thread.isRunning():
+            QMessageBox.warning(self, "Exportar", "Ya hay una exportación en curso")
+            return
+        
+        if self.connection is None and not self.detections_history:
             QMessageBox.warning(self, "Exportar", "No hay detecciones para exportar")
             return
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"exports/weapon_detections_{timestamp}.json"
-        
         os.makedirs("exports", exist_ok=True)
         
-        export_data = []
-        for detection in self.detections_history:
-            export_data.append({
-                'timestamp': detection['timestamp'].isoformat(),
-                'summary': detection['summary'],
-                'detections': detection['detections']
-            })
-        
-        with open(filename, 'w') as f:
-            json.dump(export_data, f, indent=2)
+        formats = available_formats()
+        filters = ";;".join(EXPORT_FILTERS[f] for f in formats)
+        default_path = f"exports/weapon_detections_{timestamp}.{formats[0]}"
+        filename, selected_filter = QFileDialog.getSaveFileName(self, "Exportar detecciones",
+                                                                default_path, filters)
+        if not filename:
+            return
         
-        QMessageBox.information(self, "Exportar", f"Detecciones exportadas a {filename}")
+        # Si el diálogo no devuelve un filtro conocido, el formato sale de la extensión del archivo
+        export_format = next((f for f in formats if EXPORT_FILTERS[f] == selected_filter), None)
+        if export_format is None:
+            extension = os.path.splitext(filename)[1].lstrip(".").lower()
+            export_format = extension if extension in formats else formats[0]
+        if not filename.endswith(f".{export_format}"):
+            filename = f"{filename}.{export_format}"
+        
+        # Con base de datos se exporta el historial completo almacenado
+        exporter = DetectionExporter(DB_PARAMS if self.connection else None)
+        self.export_thread = ExportThread(exporter, filename, export_format,
+                                          self.detections_history)
+        self.export_thread.progress_signal.connect(self.update_export_progress)
+        self.export_thread.finished_signal.connect(self.on_export_finished)
+        self.export_thread.error_signal.connect(self.on_export_error)
+        
+        self.export_btn.setEnabled(False)
+        self.export_progress.setValue(0)
+        self.export_progress.setVisible(True)
+        self.export_thread.start()
+    
+    def update_export_progress(self, exported, total):
+        """Actualizar barra de progreso de exportación"""
+        self.export_progress.setMaximum(max(total, 1))
+        self.export_progress.setValue(exported)
+    
+    def on_export_finished(self, exported, filename):
+        """Manejar fin de la exportación"""
+        self.export_btn.setEnabled(True)
+        self.export_progress.setVisible(False)
+        # Solo se gestionan las exportaciones dentro de exports/: un archivo guardado en otra carpeta
+        # es del usuario y la retención no debe borrarlo. Se registra con la misma ruta que usa
+        # discover('exports') para no contarlo dos veces
+        path = os.path.abspath(filename)
+        if os.path.dirname(path) == os.path.abspath("exports"):
+            self.capture_index.register(os.path.join("exports", os.path.basename(path)), 'export')
+        QMessageBox.information(self, "Exportar",
+                                f"{exported} detecciones exportadas a {filename}")
+    
+    def on_export_error(self, message):
+        """Manejar error durante la exportación"""
+        self.export_btn.setEnabled(True)
+        self.export_progress.setVisible(False)
+        QMessageBox.critical(self, "Exportar", f"Error al exportar detecciones: {message}")
     
     def closeEvent(self, event):
         """Manejar cierre de la aplicación"""
         self.video_thread.stop()
+        if self.export_thread is not None and self.export_thread.isRunning():
+            self.export_thread.exporter.cancel()
+            self.export_thread.wait()
+        self.retention_service.stop()
+        self.capture_index.close()
+        if self.weapon_detector.resolution is not None:
+            print(f"Tamaño de inferencia: {self.weapon_detector.resolution.stats()}")
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
         if self.connection:
             self.connection.close()
         event.accept()
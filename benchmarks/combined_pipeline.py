@@ -0,0 +1,105 @@
+"""
+Cost of analysing one camera for weapons and plates: the two pipelines side by side (each with its
+own capture and decode, run one after the other) against CombinedPipeline (one decode, both models
+at the same time, a shared letterbox when the sizes match).
+
+    python benchmarks/combined_pipeline.py --frames 200 --imgsz 480
+    python benchmarks/combined_pipeline.py --source rtsp://camera --output benchmarks/combined_pipeline.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Any, Dict
+
+import cv2
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from process.combined_pipeline import CombinedPipeline
+from process.config import PipelineConfig, SchedulerConfig
+from process.main import PlateRecognition
+from process.weapon_detection import DetectionParams, WeaponDetector
+from benchmarks.suite import ROOT
+
+
+def decoded_frames(source, frames: int):
+    capture = cv2.VideoCapture(source)
+    try:
+        for _ in range(frames):
+            ret, frame = capture.read()
+            if not ret:
+                return
+            yield frame
+    finally:
+        capture.release()
+
+
+def run_plates(source, frames: int, config: PipelineConfig) -> Dict[str, Any]:
+    processor = PlateRecognition(config)
+    try:
+        count, start = 0, time.perf_counter()
+        for frame in decoded_frames(source, frames):
+            processor.process_vehicular_plates(frame, True, False)
+            count += 1
+        return {'frames': count, 'seconds': time.perf_counter() - start}
+    finally:
+        processor.close()
+
+
+def run_weapons(source, frames: int, params: DetectionParams) -> Dict[str, Any]:
+    detector = WeaponDetector()
+    count, start = 0, time.perf_counter()
+    for frame in decoded_frames(source, frames):
+        detector.detect_weapons(frame, None, params)
+        count += 1
+    return {'frames': count, 'seconds': time.perf_counter() - start}
+
+
+def run_combined(source, frames: int, config: PipelineConfig, params: DetectionParams) -> Dict[str, Any]:
+    pipeline = CombinedPipeline(config, weapon_params=params)
+    try:
+        start = time.perf_counter()
+        count = sum(1 for _ in pipeline.run(source, max_frames=frames))
+        result = {'frames': count, 'seconds': time.perf_counter() - start}
+        result.update({name: value for name, value in pipeline.stats().items() if name != 'plates'})
+        return result
+    finally:
+        pipeline.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', default=os.path.join(ROOT, 'examples', 'plates2.mp4'))
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--imgsz', type=int, default=480, help='inference size of both detectors (shared letterbox)')
+    parser.add_argument('--weapon-imgsz', type=int, default=None, help='a different weapon size (no sharing)')
+    parser.add_argument('--output', help='write the results json here')
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    config = PipelineConfig(scheduler=SchedulerConfig(detect_imgsz=args.imgsz))
+    params = DetectionParams(imgsz=args.weapon_imgsz or args.imgsz)
+
+    results: Dict[str, Any] = {'frames': args.frames, 'imgsz': args.imgsz, 'weapon_imgsz': params.imgsz}
+    # first run of each model pays its lazy initialization, outside the measurement
+    run_combined(source, 4, config, params)
+    for name, run in (('plates', lambda: run_plates(source, args.frames, config)),
+                      ('weapons', lambda: run_weapons(source, args.frames, params)),
+                      ('combined', lambda: run_combined(source, args.frames, config, params))):
+        result = results[name] = run()
+        print(f"{name:9s} {result['frames']:5d} frames  {result['seconds']:7.2f} s  "
+              f"{result['frames'] / result['seconds']:7.1f} frames/s")
+
+    separate = results['plates']['seconds'] + results['weapons']['seconds']
+    results['combined_vs_separate'] = results['combined']['seconds'] / separate
+    print(f"combined: {100 * results['combined_vs_separate']:.0f}% of the two pipelines side by side "
+          f"({results['combined']['seconds']:.2f} s vs {separate:.2f} s)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
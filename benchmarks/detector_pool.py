@@ -0,0 +1,77 @@
+"""
+Finds the replica / intra-op thread split of WeaponDetectorPool with the best throughput on
+this machine: every split uses all the cores (replicas x threads = cpu count) and runs the
+same frames.
+
+    python benchmarks/detector_pool.py --frames 120
+    python benchmarks/detector_pool.py --splits 1x8 2x4 4x2 8x1 --output benchmarks/detector_pool.json
+
+The best split is the one to pass to WeaponDetectorPool(replicas, intra_op_threads).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from typing import Any, Dict, List, Tuple
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from process.detector_pool import WeaponDetectorPool
+from benchmarks.suite import load_sample_images, load_synthetic_frames, load_video_frames
+
+
+def core_splits(cpu_count: int) -> List[Tuple[int, int]]:
+    return [(replicas, cpu_count // replicas) for replicas in range(1, cpu_count + 1) if cpu_count % replicas == 0]
+
+
+def parse_split(text: str) -> Tuple[int, int]:
+    replicas, threads = text.lower().split('x')
+    return int(replicas), int(threads)
+
+
+def run_split(replicas: int, threads: int, frames: list, warmup: int) -> Dict[str, Any]:
+    pool = WeaponDetectorPool(replicas, threads, max_pending=2 * replicas)
+    try:
+        pool.detect_batch(frames[:max(warmup, replicas)])
+        start = time.perf_counter()
+        pool.detect_batch(frames)
+        elapsed = time.perf_counter() - start
+        stats = pool.stats()
+    finally:
+        pool.shutdown()
+    return {'replicas': replicas, 'intra_op_threads': threads, 'frames': len(frames),
+            'frames_per_second': len(frames) / elapsed, 'latency_p50_ms': 1e3 * stats['latency_p50'],
+            'latency_p95_ms': 1e3 * stats['latency_p95'], 'replica_frames': stats['replica_frames']}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=120, help='frames per split')
+    parser.add_argument('--warmup', type=int, default=4)
+    parser.add_argument('--cpus', type=int, default=os.cpu_count() or 1, help='cores to split')
+    parser.add_argument('--splits', nargs='*', help='replicas x threads, e.g. 2x4 (default: every divisor of --cpus)')
+    parser.add_argument('--output', help='write the results json here')
+    args = parser.parse_args()
+
+    sources = load_synthetic_frames() + load_sample_images() + load_video_frames(args.frames)
+    frames = [sources[i % len(sources)] for i in range(args.frames)]
+    splits = [parse_split(text) for text in args.splits] if args.splits else core_splits(args.cpus)
+
+    results = []
+    for replicas, threads in splits:
+        result = run_split(replicas, threads, frames, args.warmup)
+        results.append(result)
+        print(f"{replicas:3d} replicas x {threads:3d} threads  {result['frames_per_second']:8.1f} frames/s  "
+              f"p50 {result['latency_p50_ms']:8.1f} ms  p95 {result['latency_p95_ms']:8.1f} ms")
+
+    best = max(results, key=lambda result: result['frames_per_second'])
+    print(f"best: {best['replicas']} replicas x {best['intra_op_threads']} threads "
+          f"({best['frames_per_second']:.1f} frames/s on {args.cpus} cores)")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'cpus': args.cpus, 'results': results, 'best': best}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
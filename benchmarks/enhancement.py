@@ -0,0 +1,83 @@
+"""
+Micro-benchmark of the plate enhancement stage: the previous TextExtraction.image_contrast
+against PlateEnhancer (and its exposure-gated CLAHE), one crop at a time and in batches.
+
+    python benchmarks/enhancement.py --crops 256 --repeat 5
+"""
+import os
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from process.ocr_extraction.enhancement import PlateEnhancer
+
+
+def legacy_image_contrast(img: np.ndarray) -> np.ndarray:
+    # the enhancement as it was before PlateEnhancer, kept as reference (clahe always ran)
+    lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
+    l, a, b = cv2.split(lab)
+    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
+    img = cv2.cvtColor(cv2.merge((clahe.apply(l), a, b)), cv2.COLOR_LAB2BGR)
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if cv2.Laplacian(gray, cv2.CV_64F).var() < 100:
+        img = cv2.equalizeHist(gray)
+    return img
+
+
+def synthetic_plates(count: int, seed: int = 0) -> list:
+    """Plate-like crops of varying size, exposure, blur and noise."""
+    rng = np.random.default_rng(seed)
+    crops = []
+    for i in range(count):
+        h, w = int(rng.integers(50, 140)), int(rng.integers(160, 420))
+        plate = np.full((h, w, 3), (40, 200, 230), dtype=np.uint8)
+        text = ''.join(rng.choice(list('ABCDEFGHKLMNPRSTUVXYZ'), 3)) + '%03d' % rng.integers(0, 1000)
+        cv2.putText(plate, text, (int(w * 0.05), int(h * 0.7)), cv2.FONT_HERSHEY_SIMPLEX, h / 50, (20, 20, 20),
+                    max(1, h // 25))
+        exposure = i % 3
+        if exposure == 1:
+            plate = (plate * 0.15).astype(np.uint8)
+        elif exposure == 2:
+            plate = cv2.add(plate, np.full_like(plate, 150))
+        if i % 4 == 0:
+            plate = cv2.GaussianBlur(plate, (7, 7), 0)
+        noise = rng.normal(0, 6, plate.shape)
+        crops.append(np.clip(plate + noise, 0, 255).astype(np.uint8))
+    return crops
+
+
+def timed(function, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--crops', type=int, default=256)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    crops = synthetic_plates(args.crops)
+    enhancer = PlateEnhancer()
+    gated = PlateEnhancer(exposure_gated_clahe=True)
+    results = {
+        'legacy': timed(lambda: [legacy_image_contrast(crop) for crop in crops], args.repeat),
+        'enhance': timed(lambda: [enhancer.enhance(crop) for crop in crops], args.repeat),
+        'enhance_batch': timed(lambda: enhancer.enhance_batch(crops), args.repeat),
+        'gated_batch': timed(lambda: gated.enhance_batch(crops), args.repeat),
+    }
+    for name, seconds in results.items():
+        print(f'{name:>14}: {seconds / len(crops) * 1e6:8.1f} us/crop  '
+              f'({results["legacy"] / seconds:4.2f}x legacy)')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Frames per second moved from a producer process to N consumer processes: pickling every frame
+through a multiprocessing.Queue against publishing FrameRing slots (only the slot number is queued).
+Each consumer reads the whole frame (a sum) so both transports pay for touching the pixels.
+
+    python benchmarks/frame_ring.py --frames 300 --consumers 2
+    python benchmarks/frame_ring.py --width 3840 --height 2160 --output benchmarks/frame_ring.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing as mp
+from typing import Any, Dict
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from process.frame_ring import FrameRing, FrameSubscriber
+
+
+def _queue_consumer(inbox, done):
+    total = 0
+    while True:
+        frame = inbox.get()
+        if frame is None:
+            break
+        total += int(frame[::16, ::16].sum())
+    done.put(total)
+
+
+def _ring_consumer(ring, inbox, done):
+    subscriber = FrameSubscriber(ring, inbox)
+    total = 0
+    while True:
+        message = subscriber.get()
+        if message is None:
+            break
+        total += int(subscriber.frame(message)[::16, ::16].sum())
+        subscriber.release(message)
+    done.put(total)
+
+
+def run_queue(ctx, frame: np.ndarray, frames: int, consumers: int) -> float:
+    inboxes = [ctx.Queue(maxsize=4) for _ in range(consumers)]
+    done = ctx.Queue()
+    processes = [ctx.Process(target=_queue_consumer, args=(inbox, done)) for inbox in inboxes]
+    for process in processes:
+        process.start()
+    start = time.perf_counter()
+    for _ in range(frames):
+        for inbox in inboxes:
+            inbox.put(frame)
+    for inbox in inboxes:
+        inbox.put(None)
+    for _ in processes:
+        done.get()
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    return elapsed
+
+
+def run_ring(ctx, frame: np.ndarray, frames: int, consumers: int, slots: int) -> float:
+    ring = FrameRing(slots, frame.shape, ctx=ctx)
+    inboxes = [ctx.Queue() for _ in range(consumers)]
+    done = ctx.Queue()
+    processes = [ctx.Process(target=_ring_consumer, args=(ring, inbox, done)) for inbox in inboxes]
+    for process in processes:
+        process.start()
+    try:
+        start = time.perf_counter()
+        for seq in range(frames):
+            slot = ring.acquire(timeout=None)
+            ring.write(slot, frame)
+            ring.publish(slot, seq, frame.shape, inboxes)
+        for inbox in inboxes:
+            inbox.put(None)
+        for _ in processes:
+            done.get()
+        elapsed = time.perf_counter() - start
+        for process in processes:
+            process.join()
+    finally:
+        ring.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--consumers', type=int, default=2, help='consumer processes (weapon + plate = 2)')
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--slots', type=int, default=8)
+    parser.add_argument('--output', help='write the results json here')
+    args = parser.parse_args()
+
+    ctx = mp.get_context('spawn')
+    frame = np.random.default_rng(0).integers(0, 256, (args.height, args.width, 3), dtype=np.uint8)
+    results: Dict[str, Any] = {'frames': args.frames, 'consumers': args.consumers,
+                               'frame_shape': list(frame.shape), 'slots': args.slots}
+    for name, run in (('queue', lambda: run_queue(ctx, frame, args.frames, args.consumers)),
+                      ('ring', lambda: run_ring(ctx, frame, args.frames, args.consumers, args.slots))):
+        elapsed = run()
+        results[name] = {'seconds': elapsed, 'frames_per_second': args.frames / elapsed}
+        print(f"{name:6s} {args.frames / elapsed:8.1f} frames/s  ({args.consumers} consumers, "
+              f"{args.width}x{args.height})")
+    print(f"speedup: {results['queue']['seconds'] / results['ring']['seconds']:.2f}x")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Load test of the local inference server: throughput and latency of one model against the number
+of concurrent clients, with the mean batch the micro-batcher formed at each level.
+
+    python benchmarks/inference_server.py --model weapons --concurrency 1 2 4 8 16
+    python benchmarks/inference_server.py --port 9120 --no-server --output benchmarks/inference_server.json
+
+By default the server is started in this process with --max-batch / --max-delay-ms; --no-server
+measures a server that is already running (python inference_server.py).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from typing import Any, Dict, List
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from process.config import InferenceServerConfig
+from process.inference_client import InferenceClient
+from process.inference_server import InferenceServer, MODELS
+from process.ocr_extraction.worker_pool import percentile
+from benchmarks.suite import load_sample_images, load_synthetic_frames, load_video_frames
+
+
+def call(client: InferenceClient, model: str, frame):
+    if model == 'weapons':
+        return client.detect_weapons(frame)
+    if model == 'vehicles':
+        return client.detect_vehicles(frame)
+    return client.segment_plates(frame)
+
+
+def run_level(client: InferenceClient, model: str, frames: list, concurrency: int, requests: int) -> Dict[str, Any]:
+    before = client.stats()[model]
+    latencies: List[List[float]] = [[] for _ in range(concurrency)]
+    errors: List[Exception] = []
+
+    def worker(index: int):
+        try:
+            for i in range(index, requests, concurrency):
+                start = time.perf_counter()
+                call(client, model, frames[i % len(frames)])
+                latencies[index].append(time.perf_counter() - start)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+
+    after = client.stats()[model]
+    batches = after['batches'] - before['batches']
+    samples = [latency for thread_latencies in latencies for latency in thread_latencies]
+    return {'concurrency': concurrency, 'requests': requests, 'requests_per_second': requests / elapsed,
+            'latency_p50_ms': 1e3 * percentile(samples, 0.50), 'latency_p95_ms': 1e3 * percentile(samples, 0.95),
+            'mean_batch_size': (after['requests'] - before['requests']) / batches if batches else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', choices=MODELS, default='weapons')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--requests', type=int, default=200, help='requests per concurrency level')
+    parser.add_argument('--frames', type=int, default=60, help='distinct frames sent')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0, help='0 picks a free port for the in-process server')
+    parser.add_argument('--no-server', action='store_true', help='use a server that is already running')
+    parser.add_argument('--max-batch', type=int, default=InferenceServerConfig().max_batch_size)
+    parser.add_argument('--max-delay-ms', type=float, default=InferenceServerConfig().max_delay_ms)
+    parser.add_argument('--encoding', default='raw', help="'raw', '.jpg' or '.png'")
+    parser.add_argument('--output', help='write the results json here')
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if not args.no_server:
+        config = InferenceServerConfig(host=args.host, port=args.port, models=[args.model],
+                                       max_batch_size=args.max_batch, max_delay_ms=args.max_delay_ms)
+        server = InferenceServer(config).start()
+        port = server.config.port
+
+    sources = load_synthetic_frames() + load_sample_images() + load_video_frames(args.frames)
+    frames = [sources[i % len(sources)] for i in range(args.frames)]
+    client = InferenceClient(args.host, port, encoding=args.encoding)
+    try:
+        # first requests pay the lazy model initialization
+        for frame in frames[:4]:
+            call(client, args.model, frame)
+        results = []
+        for concurrency in args.concurrency:
+            result = run_level(client, args.model, frames, concurrency, args.requests)
+            results.append(result)
+            print(f"{concurrency:3d} clients  {result['requests_per_second']:8.1f} req/s  "
+                  f"p50 {result['latency_p50_ms']:8.1f} ms  p95 {result['latency_p95_ms']:8.1f} ms  "
+                  f"batch {result['mean_batch_size']:4.1f}")
+    finally:
+        client.close()
+        if server is not None:
+            server.stop()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'model': args.model, 'max_batch_size': args.max_batch, 'max_delay_ms': args.max_delay_ms,
+                       'results': results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Checks that plate enhancement does not cost OCR accuracy: every labelled sample image goes
+through vehicle detection and plate segmentation once, then the plate crop is read with the
+previous enhancement, with PlateEnhancer and with PlateEnhancer(exposure_gated_clahe=True).
+
+    python benchmarks/ocr_accuracy.py --labels benchmarks/plates.csv
+
+Exits with status 1 when PlateEnhancer reads fewer plates correctly than the previous stage. The
+gated variant is reported so it can be turned on once it reads at least as many.
+"""
+import os
+import sys
+import csv
+import argparse
+import cv2
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from process.main import PlateRecognition
+from process.config import OcrConfig, PipelineConfig
+from db.plate_index import normalize_plate
+from process.ocr_extraction.enhancement import PlateEnhancer
+from benchmarks.enhancement import legacy_image_contrast
+
+
+def plate_crop(processor: PlateRecognition, image):
+    """Masked plate crop of the first vehicle with a segmented plate, or None."""
+    detected, vehicles_info, _ = processor.model_detect.check_vehicle(image)
+    if not detected:
+        return None
+    for bbox, _, _ in processor.model_detect.extract_detections_info(image, vehicles_info):
+        vehicle_crop = processor.model_detect.image_vehicle_crop(image, bbox)
+        (has_plate, plate_info), = processor.model_segmentation.check_vehicle_plates([vehicle_crop])
+        if has_plate:
+            plate_mask, _, _ = processor.model_segmentation.extract_plate_info(vehicle_crop, plate_info)
+            return processor.model_segmentation.mask_processing(vehicle_crop, plate_mask)
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--labels', default=os.path.join(ROOT, 'benchmarks', 'plates.csv'))
+    parser.add_argument('--engine', default='easyocr')
+    args = parser.parse_args()
+
+    processor = PlateRecognition(PipelineConfig(ocr=OcrConfig(engine=args.engine, mode='sync')))
+    text_extraction = processor.process_text_extraction
+    gated = PlateEnhancer(exposure_gated_clahe=True)
+    correct = {'legacy': 0, 'enhancer': 0, 'gated': 0}
+    total = 0
+
+    with open(args.labels, newline='') as f:
+        for row in csv.DictReader(f):
+            image = cv2.imread(os.path.join(ROOT, row['image']))
+            crop = plate_crop(processor, image) if image is not None else None
+            if crop is None or crop.size == 0:
+                print(f"{row['image']}: no plate found, skipped")
+                continue
+            total += 1
+            reads = {'legacy': text_extraction.text_extraction(legacy_image_contrast(crop)),
+                     'enhancer': text_extraction.text_extraction(text_extraction.image_contrast(crop)),
+                     'gated': text_extraction.text_extraction(gated.enhance(crop))}
+            for name, text in reads.items():
+                # the plate number is read along with the city line below it
+                correct[name] += row['plate'] in normalize_plate(text)
+            print(f"{row['image']}: expected {row['plate']}, "
+                  + ', '.join(f'{name} {normalize_plate(text)!r}' for name, text in reads.items()))
+
+    print(', '.join(f'{name} {count}/{total}' for name, count in correct.items()))
+    processor.close()
+    sys.exit(0 if correct['enhancer'] >= correct['legacy'] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Throughput of the pipeline components co-located on one host (a capture decode loop, weapon
+detection, plate recognition with its OCR workers), each in its own process as in
+examples/video_multiprocess.py: first with the library defaults, where torch, OpenCV and EasyOCR
+each size their thread pools to every core, then with a ResourceManager giving each one its own cpus.
+Each component's rate is reported on its own; the gain is computed over the inference components
+only (weapons, plates), since a decode loop running flat out would dominate any sum.
+
+    python benchmarks/resources.py --seconds 20
+    python benchmarks/resources.py --cpus 0-15 --output benchmarks/resources.json
+
+The gain grows with the core count; on a machine with a handful of cores the two modes are close.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing as mp
+from typing import Any, Dict, List, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from process.config import OcrConfig, PipelineConfig, ResourceConfig
+from process.resources import ResourceManager, cpu_ranges
+from benchmarks.suite import ROOT, load_sample_images, load_synthetic_frames, load_video_frames
+
+COMPONENTS = ('capture', 'weapons', 'plates')
+INFERENCE = ('weapons', 'plates')
+
+
+def _capture_loop():
+    import cv2
+    capture = cv2.VideoCapture(os.path.join(ROOT, 'examples', 'plates2.mp4'))
+
+    def step():
+        ret, _ = capture.read()
+        if not ret:
+            # rewind: the loop keeps decoding until the deadline
+            capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    return step
+
+
+def _weapon_loop(frames):
+    from process.weapon_detection import WeaponDetector
+    detector = WeaponDetector()
+    index = [0]
+
+    def step():
+        detector.detect_weapons(frames[index[0] % len(frames)])
+        index[0] += 1
+    return step
+
+
+def _plate_loop(frames, resources: Optional[ResourceManager]):
+    from process.main import PlateRecognition
+    processor = PlateRecognition(PipelineConfig(ocr=OcrConfig(mode='thread')), resources=resources)
+    index = [0]
+
+    def step():
+        processor.process_vehicular_plates(frames[index[0] % len(frames)], True, False)
+        index[0] += 1
+    return step
+
+
+def _component(name: str, resources: Optional[ResourceManager], seconds: float, start, results):
+    if resources is not None:
+        resources.configure_process()
+        resources.apply(name, process=True)
+    frames = load_synthetic_frames() + load_sample_images() + load_video_frames(30)
+    if name == 'capture':
+        step = _capture_loop()
+    elif name == 'weapons':
+        step = _weapon_loop(frames)
+    else:
+        step = _plate_loop(frames, resources)
+    # every component starts timing together, once all the models are loaded
+    start.wait()
+    count = 0
+    begin = time.perf_counter()
+    while time.perf_counter() - begin < seconds:
+        step()
+        count += 1
+    results.put((name, count / (time.perf_counter() - begin)))
+
+
+def run_mode(resources: Optional[ResourceManager], seconds: float) -> Dict[str, float]:
+    ctx = mp.get_context('spawn')
+    start = ctx.Barrier(len(COMPONENTS))
+    results = ctx.Queue()
+    processes = [ctx.Process(target=_component, args=(name, resources, seconds, start, results), name=name)
+                 for name in COMPONENTS]
+    for process in processes:
+        process.start()
+    rates = dict(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return rates
+
+
+def parse_cpus(text: str) -> List[int]:
+    # 0-3,8 -> [0, 1, 2, 3, 8]
+    cpus = []
+    for part in text.split(','):
+        first, _, last = part.partition('-')
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=20.0, help='measured time per mode')
+    parser.add_argument('--cpus', help='cpus to split, e.g. 0-15 (default: every available cpu)')
+    parser.add_argument('--output', help='write the results json here')
+    args = parser.parse_args()
+
+    resources = ResourceManager(ResourceConfig(cpus=parse_cpus(args.cpus) if args.cpus else None))
+    print(resources.describe())
+
+    results: Dict[str, Any] = {'cpus': cpu_ranges(resources.cpus), 'plan': resources.stats()}
+    for mode, manager in (('default', None), ('managed', resources)):
+        rates = run_mode(manager, args.seconds)
+        results[mode] = {'frames_per_second': rates}
+        print(f"{mode:<8} " + '  '.join(f'{name} {rates[name]:7.1f}' for name in COMPONENTS) + ' frames/s')
+
+    # per component, and the mean over the inference ones: the capture loop's decode rate is left out
+    gains = {name: results['managed']['frames_per_second'][name] / results['default']['frames_per_second'][name] - 1
+             for name in COMPONENTS}
+    results['gain'] = gains
+    results['inference_gain'] = sum(gains[name] for name in INFERENCE) / len(INFERENCE)
+    print('managed vs default: ' + '  '.join(f'{name} {100 * gains[name]:+.1f}%' for name in COMPONENTS) +
+          f"  inference {100 * results['inference_gain']:+.1f}%")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Stage-level benchmark suite: weapon detection, vehicle detection, plate mask processing,
+plate enhancement, OCR and the end-to-end plate pipeline, on the repository's sample media.
+
+    python benchmarks/suite.py --output benchmarks/results.json
+    python benchmarks/suite.py --save-baseline benchmarks/baseline.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json --tolerance 0.15
+
+Every case reports per-call latency percentiles (ms) and throughput (items/s) as JSON. With
+--baseline, cases whose p50 or p95 latency grew, or whose throughput fell, by more than the
+tolerance are flagged and the exit status is 1. Cases whose models or libraries are not
+available are reported as skipped. benchmarks/baseline.json is the stored reference; it is
+machine-specific, so regenerate it with --save-baseline on the machine the comparison runs on.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from process.ocr_extraction.worker_pool import percentile
+from benchmarks.enhancement import synthetic_plates
+
+PERCENTILES = (0.50, 0.90, 0.95, 0.99)
+
+
+class Case:
+    """
+    One benchmarked stage. `setup` loads models and inputs (not timed) and returns a list of
+    (callable, items) pairs; each timed call processes `items` items (frames, crops...).
+    """
+
+    def __init__(self, name: str, setup: Callable[[], List[Tuple[Callable[[], Any], int]]], unit: str = 'frames'):
+        self.name = name
+        self.setup = setup
+        self.unit = unit
+
+
+def load_sample_images() -> List[np.ndarray]:
+    image = cv2.imread(os.path.join(ROOT, 'examples', 'image_example.jpeg'))
+    return [image] if image is not None else []
+
+
+def load_video_frames(max_frames: int) -> List[np.ndarray]:
+    capture = cv2.VideoCapture(os.path.join(ROOT, 'examples', 'plates2.mp4'))
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    return frames
+
+
+def load_synthetic_frames() -> List[np.ndarray]:
+    # the images of create_test_image.py, generated on first use
+    frames = []
+    for name, create in (('test_weapon.jpg', 'create_test_image'), ('test_safe.jpg', 'create_safe_test_image')):
+        path = os.path.join(ROOT, 'examples', name)
+        if not os.path.exists(path):
+            import create_test_image
+            cwd = os.getcwd()
+            os.chdir(ROOT)
+            try:
+                getattr(create_test_image, create)()
+            finally:
+                os.chdir(cwd)
+        frames.append(cv2.imread(path))
+    return frames
+
+
+def vehicle_plate_inputs(processor) -> List[Tuple[np.ndarray, Any]]:
+    """(vehicle crop, plate mask) for every segmented plate of the sample image and video."""
+    inputs = []
+    for frame in load_sample_images() + load_video_frames(30)[::10]:
+        detected, info, _ = processor.model_detect.check_vehicle(frame)
+        if not detected:
+            continue
+        for bbox, _, _ in processor.model_detect.extract_detections_info(frame, info):
+            crop = processor.model_detect.image_vehicle_crop(frame, bbox)
+            (has_plate, plate_info), = processor.model_segmentation.check_vehicle_plates([crop])
+            if has_plate:
+                plate_mask, _, _ = processor.model_segmentation.extract_plate_info(crop, plate_info)
+                inputs.append((crop, plate_mask))
+    return inputs
+
+
+def plate_recognition(ocr_mode: str = 'sync'):
+    from process.main import PlateRecognition
+    from process.config import OcrConfig, PipelineConfig
+    return PlateRecognition(PipelineConfig(ocr=OcrConfig(mode=ocr_mode)))
+
+
+def build_cases(args) -> List[Case]:
+    state: Dict[str, Any] = {}
+
+    def processor():
+        if 'processor' not in state:
+            state['processor'] = plate_recognition()
+        return state['processor']
+
+    def plate_crops():
+        if 'plate_crops' not in state:
+            segmentation = processor().model_segmentation
+            crops = [segmentation.mask_processing(crop, mask) for crop, mask in vehicle_plate_inputs(processor())]
+            state['plate_crops'] = [crop for crop in crops if crop.size]
+        return state['plate_crops']
+
+    def weapon_detector():
+        if 'weapon_detector' not in state:
+            from process.weapon_detection import WeaponDetector
+            state['weapon_detector'] = WeaponDetector()
+        return state['weapon_detector']
+
+    def detect_weapons():
+        detector = weapon_detector()
+        frames = load_synthetic_frames() + load_sample_images() + load_video_frames(args.frames)
+        return [(lambda f=f: detector.detect_weapons(f), 1) for f in frames]
+
+    def draw_detections():
+        detector = weapon_detector()
+        frames = load_synthetic_frames() + load_sample_images()
+        cases = []
+        for frame in frames:
+            _, detections = detector.detect_weapons(frame)
+            h, w = frame.shape[:2]
+            # always draw something, even when the model finds nothing on the sample
+            detections = detections or [{'bbox': [w // 4, h // 4, w // 2, h // 2], 'confidence': 0.9,
+                                         'class_id': 0, 'class_name': 'gun'}]
+            cases.append((lambda f=frame, d=detections: detector.draw_detections(f.copy(), d), 1))
+        return cases
+
+    def check_vehicle():
+        detection = processor().model_detect
+        frames = load_sample_images() + load_video_frames(args.frames)
+        return [(lambda f=f: detection.check_vehicle(f), 1) for f in frames]
+
+    def mask_processing():
+        segmentation = processor().model_segmentation
+        return [(lambda c=crop, m=mask: segmentation.mask_processing(c, m), 1)
+                for crop, mask in vehicle_plate_inputs(processor())]
+
+    def image_contrast():
+        from process.ocr_extraction.main import TextExtraction
+        text_extraction = TextExtraction()
+        crops = synthetic_plates(64)
+        return [(lambda c=c: text_extraction.image_contrast(c), 1) for c in crops]
+
+    def text_extraction():
+        extraction = processor().process_text_extraction
+        crops = plate_crops() or synthetic_plates(8)
+        contrasted = [extraction.image_contrast(crop) for crop in crops]
+        return [(lambda c=c: extraction.text_extraction(c), 1) for c in contrasted]
+
+    def process_vehicular_plate():
+        from process.tracking import VehicleTracker
+        from process.scheduler import StageScheduler
+        from process.ocr_extraction.cache import OcrResultCache
+        recognizer = processor()
+        frames = load_video_frames(args.frames)
+
+        # tracking, scheduling and the ocr cache start from scratch on every pass over the clip: track
+        # ids restart at 1, so a warm cache would answer every crop and ocr would never run
+        def run_video():
+            recognizer.tracker = VehicleTracker(recognizer.config.tracking)
+            recognizer.scheduler = StageScheduler(recognizer.config.scheduler)
+            if recognizer.ocr_cache is not None:
+                ocr = recognizer.config.ocr
+                recognizer.ocr_cache = OcrResultCache(ocr.cache_size, ocr.cache_ttl_seconds)
+            for frame in frames:
+                recognizer.process_vehicular_plate(frame.copy(), True, False)
+        return [(run_video, len(frames))]
+
+    return [
+        Case('weapon.detect_weapons', detect_weapons),
+        Case('weapon.draw_detections', draw_detections),
+        Case('vehicle.check_vehicle', check_vehicle),
+        Case('plate.mask_processing', mask_processing, 'plates'),
+        Case('ocr.image_contrast', image_contrast, 'crops'),
+        Case('ocr.text_extraction', text_extraction, 'crops'),
+        Case('pipeline.process_vehicular_plate', process_vehicular_plate),
+    ]
+
+
+def run_case(case: Case, warmup: int, repeat: int) -> Dict[str, Any]:
+    try:
+        calls = case.setup()
+    except Exception as e:
+        return {'status': 'skipped', 'reason': f'{type(e).__name__}: {e}'}
+    if not calls:
+        return {'status': 'skipped', 'reason': 'no inputs'}
+
+    for _ in range(warmup):
+        for call, _ in calls:
+            call()
+
+    latencies, items, total = [], 0, 0.0
+    for _ in range(repeat):
+        for call, count in calls:
+            start = time.perf_counter()
+            call()
+            elapsed = time.perf_counter() - start
+            latencies.append(elapsed / count)
+            items += count
+            total += elapsed
+
+    result: Dict[str, Any] = {'status': 'ok', 'unit': case.unit, 'calls': len(latencies), 'items': items,
+                              'mean_ms': 1e3 * total / items, 'min_ms': 1e3 * min(latencies),
+                              'max_ms': 1e3 * max(latencies)}
+    for q in PERCENTILES:
+        result[f'p{int(q * 100)}_ms'] = 1e3 * percentile(latencies, q)
+    result['throughput'] = items / total if total else 0.0
+    return result
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {'timestamp': datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'processor': platform.processor(), 'cpu_count': os.cpu_count(), 'opencv': cv2.__version__,
+            'numpy': np.__version__}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regression messages for every case slower than the baseline by more than `tolerance`."""
+    regressions = []
+    for name, result in results['cases'].items():
+        reference = baseline.get('cases', {}).get(name)
+        if result.get('status') != 'ok' or not reference or reference.get('status') != 'ok':
+            continue
+        for metric in ('p50_ms', 'p95_ms'):
+            if result[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(f'{name}: {metric} {result[metric]:.2f} > baseline {reference[metric]:.2f}')
+        if result['throughput'] < reference['throughput'] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {result['throughput']:.1f} < baseline "
+                               f"{reference['throughput']:.1f} {result['unit']}/s")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--only', nargs='*', help='run only the cases whose name starts with one of these')
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--frames', type=int, default=60, help='frames read from examples/plates2.mp4')
+    parser.add_argument('--output', help='write the results json here (stdout otherwise)')
+    parser.add_argument('--baseline', help='compare against this results json')
+    parser.add_argument('--save-baseline', help='also write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed relative slowdown')
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {'environment': environment(), 'cases': {}}
+    for case in build_cases(args):
+        if args.only and not any(case.name.startswith(prefix) for prefix in args.only):
+            continue
+        result = run_case(case, args.warmup, args.repeat)
+        results['cases'][case.name] = result
+        if result['status'] == 'ok':
+            print(f"{case.name:<36} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  "
+                  f"{result['throughput']:9.1f} {result['unit']}/s", file=sys.stderr)
+        else:
+            print(f"{case.name:<36} skipped: {result['reason']}", file=sys.stderr)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        results['regressions'] = regressions
+        for message in regressions:
+            print(f'REGRESSION {message}', file=sys.stderr)
+        status = 1 if regressions else 0
+
+    report = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(report)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import json
+import time
+import sqlite3
+from typing import List, Optional
+
+ARCHIVE_INDEX_PATH = 'db/archive_index.sqlite'
+
+
+class ArchiveIndex:
+    """
+    Images of bulk archives already indexed, keyed by the hash of their content, so an
+    interrupted or repeated run skips them even if they were renamed or moved.
+    """
+
+    def __init__(self, db_path: str = ARCHIVE_INDEX_PATH):
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        # WAL lets the decoding processes read the index while this connection writes
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS archive_images (
+                content_hash TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                plates TEXT NOT NULL,
+                indexed_at REAL NOT NULL
+            )
+        """)
+        self.connection.commit()
+
+    def is_indexed(self, content_hash: str) -> bool:
+        row = self.connection.execute("SELECT 1 FROM archive_images WHERE content_hash = ?",
+                                      (content_hash,)).fetchone()
+        return row is not None
+
+    def plates_of(self, content_hash: str) -> Optional[List[str]]:
+        row = self.connection.execute("SELECT plates FROM archive_images WHERE content_hash = ?",
+                                      (content_hash,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def add(self, content_hash: str, path: str, plates: List[str], now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self.connection.execute("INSERT OR REPLACE INTO archive_images (content_hash, path, plates, indexed_at) "
+                                "VALUES (?, ?, ?, ?)", (content_hash, path, json.dumps(plates), now))
+
+    def commit(self):
+        self.connection.commit()
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM archive_images").fetchone()[0]
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+def open_readonly(db_path: str = ARCHIVE_INDEX_PATH) -> sqlite3.Connection:
+    return sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, check_same_thread=False)
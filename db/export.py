@@ -0,0 +1,233 @@
+import csv
+import json
+from datetime import datetime
+
+import pymysql
+import pymysql.cursors
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_COLUMNS = ['id', 'timestamp', 'weapon_count', 'alert_level',
+                  'detection_types', 'image_path', 'detections']
+
+
+def available_formats():
+    """
+    Formatos de exportación disponibles en este entorno
+    Returns:
+        list: Extensiones soportadas ('parquet' solo si pyarrow está instalado)
+    """
+    formats = ['jsonl', 'csv']
+    if pa is not None:
+        formats.append('parquet')
+    return formats
+
+
+class JsonLinesWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8')
+
+    def write_chunk(self, records):
+        for record in records:
+            self.file.write(json.dumps(record, ensure_ascii=False))
+            self.file.write('\n')
+
+    def close(self):
+        self.file.close()
+
+
+class CsvWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w', encoding='utf-8', newline='')
+        self.writer = csv.DictWriter(self.file, fieldnames=EXPORT_COLUMNS)
+        self.writer.writeheader()
+
+    def write_chunk(self, records):
+        for record in records:
+            row = dict(record)
+            row['detection_types'] = ', '.join(record['detection_types'])
+            row['detections'] = json.dumps(record['detections'], ensure_ascii=False)
+            self.writer.writerow(row)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        if pa is None:
+            raise RuntimeError("La exportación a Parquet requiere pyarrow")
+        self.schema = pa.schema([
+            ('id', pa.int64()),
+            ('timestamp', pa.string()),
+            ('weapon_count', pa.int64()),
+            ('alert_level', pa.string()),
+            ('detection_types', pa.list_(pa.string())),
+            ('image_path', pa.string()),
+            ('detections', pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write_chunk(self, records):
+        columns = {name: [] for name in EXPORT_COLUMNS}
+        for record in records:
+            for name in EXPORT_COLUMNS:
+                value = record[name]
+                if name == 'detections':
+                    value = json.dumps(value, ensure_ascii=False)
+                columns[name].append(value)
+        # Cada chunk se escribe como un row group independiente
+        self.writer.write_table(pa.table(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITERS = {
+    'jsonl': JsonLinesWriter,
+    'csv': CsvWriter,
+    'parquet': ParquetWriter,
+}
+
+
+class DetectionExporter:
+    def __init__(self, connection_params=None, chunk_size=1000):
+        """
+        Exportador por streaming del historial de detecciones de armas
+        Args:
+            connection_params: Parámetros de pymysql.connect (None para exportar solo memoria)
+            chunk_size: Número de filas leídas y escritas por bloque
+        """
+        self.connection_params = connection_params
+        self.chunk_size = chunk_size
+        self.cancelled = False
+
+    def cancel(self):
+        """Solicitar la cancelación de la exportación en curso"""
+        self.cancelled = True
+
+    def _connect(self):
+        # Conexión propia: un cursor del lado del servidor ocupa la conexión
+        # hasta agotarse y no debe compartirse con el hilo de la interfaz
+        return pymysql.connect(cursorclass=pymysql.cursors.SSDictCursor,
+                               **self.connection_params)
+
+    def count_rows(self):
+        """
+        Cuenta las detecciones almacenadas en la base de datos
+        Returns:
+            int: Número de filas en weapon_detections
+        """
+        connection = pymysql.connect(**self.connection_params)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM weapon_detections")
+                return cursor.fetchone()[0]
+        finally:
+            connection.close()
+
+    def iter_database_chunks(self):
+        """
+        Recorre weapon_detections con un cursor del lado del servidor
+        Returns:
+            generator: Listas de registros de a lo sumo chunk_size elementos
+        """
+        connection = self._connect()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT id, timestamp, weapon_count, alert_level,
+                           detection_types, image_path, metadata
+                    FROM weapon_detections
+                    ORDER BY id
+                """)
+                while not self.cancelled:
+                    rows = cursor.fetchmany(self.chunk_size)
+                    if not rows:
+                        break
+                    yield [self.row_to_record(row) for row in rows]
+        finally:
+            connection.close()
+
+    def iter_history_chunks(self, detections_history):
+        """
+        Recorre el historial en memoria con el mismo formato que la base de datos
+        Args:
+            detections_history: Lista de detecciones de WeaponDetectionApp
+        Returns:
+            generator: Listas de registros de a lo sumo chunk_size elementos
+        """
+        for start in range(0, len(detections_history), self.chunk_size):
+            if self.cancelled:
+                break
+            chunk = detections_history[start:start + self.chunk_size]
+            yield [self.history_to_record(start + i + 1, detection)
+                   for i, detection in enumerate(chunk)]
+
+    @staticmethod
+    def row_to_record(row):
+        timestamp = row['timestamp']
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.isoformat()
+        detection_types = row['detection_types'] or ''
+        return {
+            'id': row['id'],
+            'timestamp': timestamp,
+            'weapon_count': row['weapon_count'],
+            'alert_level': row['alert_level'],
+            'detection_types': [t for t in detection_types.split(', ') if t],
+            'image_path': row['image_path'],
+            'detections': json.loads(row['metadata']) if row['metadata'] else [],
+        }
+
+    @staticmethod
+    def history_to_record(record_id, detection):
+        summary = detection['summary']
+        return {
+            'id': record_id,
+            'timestamp': detection['timestamp'].isoformat(),
+            'weapon_count': summary['weapons_detected'],
+            'alert_level': summary['alert_level'],
+            'detection_types': summary.get('detection_types', []),
+            'image_path': detection.get('image_path'),
+            'detections': detection['detections'],
+        }
+
+    def export(self, path, export_format, detections_history=None, progress_callback=None):
+        """
+        Exporta las detecciones a un archivo sin cargarlas completas en memoria
+        Args:
+            path: Ruta del archivo de salida
+            export_format: 'jsonl', 'csv' o 'parquet'
+            detections_history: Historial en memoria usado si no hay base de datos
+            progress_callback: Función (exportadas, total) llamada tras cada bloque
+        Returns:
+            int: Número de registros exportados
+        """
+        if export_format not in WRITERS:
+            raise ValueError(f"Formato de exportación no soportado: {export_format}")
+
+        if self.connection_params is not None:
+            total = self.count_rows()
+            chunks = self.iter_database_chunks()
+        else:
+            detections_history = detections_history or []
+            total = len(detections_history)
+            chunks = self.iter_history_chunks(detections_history)
+
+        writer = WRITERS[export_format](path)
+        exported = 0
+        try:
+            for records in chunks:
+                writer.write_chunk(records)
+                exported += len(records)
+                if progress_callback:
+                    progress_callback(exported, total)
+        finally:
+            writer.close()
+        return exported
@@ -1,7 +1,10 @@
 import pymysql
-connection = pymysql.connect(
-    host= "localhost",
-    user= "root",
-    password= "1234",
-    db="placas"
-)
+
+DB_PARAMS = {
+    'host': "localhost",
+    'user': "root",
+    'password': "1234",
+    'db': "placas"
+}
+
+connection = pymysql.connect(**DB_PARAMS)
@@ -0,0 +1,159 @@
+import re
+import time
+import sqlite3
+from collections import deque
+from typing import Dict, Optional, Set, Tuple
+
+PLATE_INDEX_PATH = 'db/plate_index.sqlite'
+
+
+def normalize_plate(license_plate: str) -> str:
+    # OCR variants such as "ABC-123", "abc 123\n" all collapse to "ABC123"
+    return re.sub(r'[^0-9A-Z]', '', license_plate.upper())
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    # banded Levenshtein: returns max_distance + 1 as soon as the bound is exceeded
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class PlateIndex:
+    """
+    Persistent index of recognized plates with approximate lookup.
+
+    Every plate is stored in SQLite; plates seen within `horizon_seconds` are also kept
+    in an in-memory deletion-neighbourhood index (each plate is registered under all its
+    variants with up to `max_distance` characters deleted). Two plates within edit
+    distance `max_distance` always share a variant, so a lookup is a handful of dict
+    probes regardless of how many plates are stored. Repeat sightings refresh a plate at most
+    once every `refresh_seconds`, so a plate seen on every frame does not commit on every frame.
+    """
+
+    def __init__(self, db_path: str = PLATE_INDEX_PATH, horizon_seconds: float = 3600, max_distance: int = 1,
+                 refresh_seconds: float = 60.0):
+        self.db_path = db_path
+        self.horizon_seconds = horizon_seconds
+        self.max_distance = max_distance
+        self.refresh_seconds = refresh_seconds
+
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS plates (
+                plate TEXT PRIMARY KEY,
+                raw_text TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 1
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS plates_last_seen ON plates (last_seen)")
+        self.connection.commit()
+
+        self.last_seen: Dict[str, float] = {}
+        self.variants: Dict[str, Set[str]] = {}
+        self.expiry: deque = deque()
+        self.load_recent()
+
+    def load_recent(self, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        rows = self.connection.execute("SELECT plate, last_seen FROM plates WHERE last_seen >= ? ORDER BY last_seen",
+                                       (now - self.horizon_seconds,))
+        for plate, last_seen in rows:
+            self._remember(plate, last_seen)
+
+    def deletion_variants(self, plate: str) -> Set[str]:
+        variants = {plate}
+        frontier = {plate}
+        for _ in range(self.max_distance):
+            frontier = {v[:i] + v[i + 1:] for v in frontier for i in range(len(v))}
+            variants |= frontier
+        return variants
+
+    def _remember(self, plate: str, seen_at: float):
+        if plate not in self.last_seen:
+            for variant in self.deletion_variants(plate):
+                self.variants.setdefault(variant, set()).add(plate)
+        self.last_seen[plate] = seen_at
+        self.expiry.append((seen_at, plate))
+
+    def _forget(self, plate: str):
+        del self.last_seen[plate]
+        for variant in self.deletion_variants(plate):
+            plates = self.variants.get(variant)
+            if plates is not None:
+                plates.discard(plate)
+                if not plates:
+                    del self.variants[variant]
+
+    def _expire(self, now: float):
+        limit = now - self.horizon_seconds
+        while self.expiry and self.expiry[0][0] < limit:
+            seen_at, plate = self.expiry.popleft()
+            # a newer sighting re-queued the plate; only the latest entry evicts it
+            if self.last_seen.get(plate) == seen_at:
+                self._forget(plate)
+
+    def find_recent(self, license_plate: str, within_seconds: float, now: Optional[float] = None) -> Optional[str]:
+        now = time.time() if now is None else now
+        self._expire(now)
+        plate = normalize_plate(license_plate)
+        if not plate:
+            return None
+        within_seconds = min(within_seconds, self.horizon_seconds)
+
+        seen_at = self.last_seen.get(plate)
+        if seen_at is not None and now - seen_at <= within_seconds:
+            return plate
+
+        best_plate, best_distance = None, self.max_distance + 1
+        for variant in self.deletion_variants(plate):
+            for candidate in self.variants.get(variant, ()):
+                if now - self.last_seen[candidate] > within_seconds:
+                    continue
+                distance = edit_distance(plate, candidate, self.max_distance)
+                if distance < best_distance:
+                    best_plate, best_distance = candidate, distance
+        return best_plate
+
+    def seen_recently(self, license_plate: str, within_seconds: float, now: Optional[float] = None) -> bool:
+        return self.find_recent(license_plate, within_seconds, now) is not None
+
+    def add(self, license_plate: str, now: Optional[float] = None) -> str:
+        now = time.time() if now is None else now
+        plate = normalize_plate(license_plate)
+        if not plate:
+            return plate
+        self.connection.execute("""
+            INSERT INTO plates (plate, raw_text, first_seen, last_seen) VALUES (?, ?, ?, ?)
+            ON CONFLICT(plate) DO UPDATE SET last_seen = excluded.last_seen, hits = hits + 1
+        """, (plate, license_plate, now, now))
+        self.connection.commit()
+        self._remember(plate, now)
+        return plate
+
+    def check_and_add(self, license_plate: str, within_seconds: float, now: Optional[float] = None) -> Tuple[bool, str]:
+        """Returns (is_new, plate). Known plates get their last sighting refreshed; OCR noise that
+        normalizes to an empty plate is never new."""
+        if not normalize_plate(license_plate):
+            return False, ''
+        now = time.time() if now is None else now
+        match = self.find_recent(license_plate, within_seconds, now)
+        if match is not None:
+            # last_seen may lag by up to refresh_seconds: a repeat within that interval is not written
+            if now - self.last_seen[match] >= self.refresh_seconds:
+                self.add(match, now)
+            return False, match
+        return True, self.add(license_plate, now)
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,402 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import configparser
+import cv2
+import pymysql
+
+CAPTURE_INDEX_PATH = 'db/capture_index.sqlite'
+CONFIG_PATH = 'weapon_config.ini'
+
+# Orden en que se libera espacio cuando se supera el presupuesto (primero los de menor prioridad)
+LEVEL_PRIORITY = {'export': 0, 'safe': 1, 'low': 2, 'plate': 3, 'medium': 4, 'high': 5}
+
+DEFAULT_MAX_AGE_DAYS = {'export': 14, 'safe': 3, 'low': 7, 'plate': 30, 'medium': 30, 'high': 90}
+
+
+def metadata_path_for(image_path):
+    """Ruta del JSON de metadatos que WeaponDetector.save_detection escribe junto a la imagen"""
+    return image_path.replace('.jpg', '_metadata.json')
+
+
+def scale_metadata_bboxes(metadata_path, scale):
+    """Escala los bbox del JSON de metadatos de una captura redimensionada (escritura atómica)"""
+    try:
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+    except (OSError, ValueError):
+        return
+    for detection in metadata.get('detections', []):
+        if 'bbox' in detection:
+            detection['bbox'] = [int(round(v * scale)) for v in detection['bbox']]
+    tmp_path = f"{metadata_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(tmp_path, metadata_path)
+
+
+class RetentionPolicy:
+    def __init__(self, budget_bytes=5 * 1024 ** 3, max_age_days=None, compact_after_days=2,
+                 compact_max_width=1280, compact_jpeg_quality=70, batch_size=200,
+                 interval_seconds=300):
+        """
+        Política de retención de capturas y exportaciones
+        Args:
+            budget_bytes: Espacio máximo en disco para todos los archivos indexados
+            max_age_days: Días de retención por nivel de alerta
+            compact_after_days: Antigüedad a partir de la cual se reduce/recomprime una captura
+            compact_max_width: Ancho máximo de una captura compactada
+            compact_jpeg_quality: Calidad JPEG usada al recomprimir
+            batch_size: Archivos procesados como máximo por operación
+            interval_seconds: Pausa entre ciclos del servicio de retención
+        """
+        self.budget_bytes = budget_bytes
+        self.max_age_days = dict(DEFAULT_MAX_AGE_DAYS)
+        if max_age_days:
+            self.max_age_days.update(max_age_days)
+        self.compact_after_days = compact_after_days
+        self.compact_max_width = compact_max_width
+        self.compact_jpeg_quality = compact_jpeg_quality
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+
+    @classmethod
+    def from_config(cls, config_path=CONFIG_PATH):
+        """
+        Crea la política a partir de la sección [RETENTION] del archivo de configuración
+        Args:
+            config_path: Ruta a weapon_config.ini
+        Returns:
+            RetentionPolicy: Política con los valores configurados (o por defecto)
+        """
+        config = configparser.ConfigParser()
+        config.read(config_path, encoding='latin-1')
+        if not config.has_section('RETENTION'):
+            return cls()
+        section = config['RETENTION']
+        max_age_days = {level: section.getfloat(f'max_age_days_{level}')
+                        for level in DEFAULT_MAX_AGE_DAYS
+                        if section.get(f'max_age_days_{level}')}
+        return cls(budget_bytes=int(section.getfloat('budget_mb', 5 * 1024) * 1024 ** 2),
+                   max_age_days=max_age_days,
+                   compact_after_days=section.getfloat('compact_after_days', 2),
+                   compact_max_width=section.getint('compact_max_width', 1280),
+                   compact_jpeg_quality=section.getint('compact_jpeg_quality', 70),
+                   batch_size=section.getint('batch_size', 200),
+                   interval_seconds=section.getfloat('interval_seconds', 300))
+
+
+class CaptureIndex:
+    def __init__(self, db_path=CAPTURE_INDEX_PATH):
+        """
+        Índice persistente de los archivos escritos en captures/ y exports/
+        Args:
+            db_path: Ruta del archivo SQLite del índice
+        """
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS captures (
+                path TEXT PRIMARY KEY,
+                alert_level TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                compacted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS captures_created ON captures (created);
+            CREATE TABLE IF NOT EXISTS directories (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL
+            );
+        """)
+        self.connection.commit()
+
+    @staticmethod
+    def file_size(path):
+        size = os.path.getsize(path)
+        metadata_path = metadata_path_for(path)
+        if metadata_path != path and os.path.exists(metadata_path):
+            size += os.path.getsize(metadata_path)
+        return size
+
+    def register(self, path, alert_level, created=None):
+        """
+        Registra un archivo recién escrito
+        Args:
+            path: Ruta de la imagen o exportación
+            alert_level: Nivel de alerta ('high', 'medium', 'low', 'safe', 'plate', 'export')
+            created: Marca de tiempo de creación (por defecto, ahora)
+        """
+        try:
+            size = self.file_size(path)
+        except OSError as e:
+            print(f"Error registrando captura: {e}")
+            return
+        with self.lock:
+            self.connection.execute("""
+                INSERT INTO captures (path, alert_level, size, created) VALUES (?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET size = excluded.size, created = excluded.created,
+                                                compacted = 0
+            """, (path, alert_level, size, time.time() if created is None else created))
+            self.connection.commit()
+
+    def discover(self, directory, classify):
+        """
+        Indexa archivos que no pasaron por register (p. ej. escritos por otras herramientas).
+        Solo se lista el directorio si su mtime cambió desde la última vez.
+        Args:
+            directory: Directorio a revisar
+            classify: Función (nombre de archivo) -> nivel de alerta o None para ignorarlo
+        Returns:
+            int: Número de archivos nuevos indexados
+        """
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return 0
+        with self.lock:
+            row = self.connection.execute("SELECT mtime_ns FROM directories WHERE path = ?",
+                                          (directory,)).fetchone()
+        if row is not None and row[0] == mtime_ns:
+            return 0
+
+        entries = []
+        with os.scandir(directory) as iterator:
+            for entry in iterator:
+                if not entry.is_file():
+                    continue
+                alert_level = classify(entry.name)
+                if alert_level is None:
+                    continue
+                stat = entry.stat()
+                entries.append((entry.path, alert_level, stat.st_size, stat.st_mtime))
+
+        with self.lock:
+            before = self.connection.total_changes
+            self.connection.executemany("""
+                INSERT OR IGNORE INTO captures (path, alert_level, size, created) VALUES (?, ?, ?, ?)
+            """, entries)
+            added = self.connection.total_changes - before
+            self.connection.execute("""
+                INSERT INTO directories (path, mtime_ns) VALUES (?, ?)
+                ON CONFLICT(path) DO UPDATE SET mtime_ns = excluded.mtime_ns
+            """, (directory, mtime_ns))
+            self.connection.commit()
+        return added
+
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.connection.execute(sql, params).fetchall()
+
+    def total_size(self):
+        return self.query("SELECT COALESCE(SUM(size), 0) FROM captures")[0][0]
+
+    def remove(self, paths):
+        with self.lock:
+            self.connection.executemany("DELETE FROM captures WHERE path = ?", [(p,) for p in paths])
+            self.connection.commit()
+
+    def mark_compacted(self, path, size):
+        with self.lock:
+            self.connection.execute("UPDATE captures SET compacted = 1, size = ? WHERE path = ?", (size, path))
+            self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def classify_capture(filename):
+    """Nivel de alerta de un archivo de captures/ a partir de su nombre"""
+    if filename.endswith('_metadata.json') or filename.endswith('.tmp.jpg'):
+        return None
+    if filename.startswith('weapon_detection_'):
+        return 'high'
+    if filename.endswith('_safe.jpg'):
+        return 'safe'
+    if filename.lower().endswith('.png'):
+        return 'plate'
+    if filename.lower().endswith(('.jpg', '.jpeg')):
+        return 'low'
+    return None
+
+
+def classify_export(filename):
+    """Todos los archivos de exports/ comparten la misma política"""
+    return 'export'
+
+
+class RetentionManager:
+    def __init__(self, capture_index, policy=None, connection_params=None,
+                 directories=(('captures', classify_capture), ('exports', classify_export)), thumbnail_cache=None):
+        """
+        Aplica la política de retención de forma incremental
+        Args:
+            capture_index: CaptureIndex con los archivos conocidos
+            policy: RetentionPolicy (por defecto, la de weapon_config.ini)
+            connection_params: Parámetros de pymysql.connect para limpiar las filas de archivos borrados
+            directories: Pares (directorio, clasificador) que se indexan incrementalmente
+            thumbnail_cache: ThumbnailCache de la galería: se borran las miniaturas de los archivos
+                borrados o compactados y las versiones antiguas de cada miniatura
+        """
+        self.index = capture_index
+        self.policy = policy or RetentionPolicy.from_config()
+        self.connection_params = connection_params
+        self.directories = directories
+        self.thumbnail_cache = thumbnail_cache
+
+    def run_once(self, now=None):
+        """
+        Ejecuta un ciclo de retención procesando como máximo un lote por etapa
+        Returns:
+            dict: Archivos borrados por antigüedad/presupuesto y archivos compactados
+        """
+        now = time.time() if now is None else now
+        for directory, classify in self.directories:
+            self.index.discover(directory, classify)
+        stats = {
+            'expired': self.delete_expired(now),
+            'compacted': self.compact_old(now),
+            'evicted': self.enforce_budget(),
+        }
+        if self.thumbnail_cache is not None:
+            stats['thumbnails'] = self.thumbnail_cache.prune()
+        return stats
+
+    def delete_expired(self, now):
+        paths = []
+        for alert_level, days in self.policy.max_age_days.items():
+            rows = self.index.query("""
+                SELECT path FROM captures WHERE alert_level = ? AND created < ?
+                ORDER BY created LIMIT ?
+            """, (alert_level, now - days * 86400, self.policy.batch_size))
+            paths.extend(row[0] for row in rows)
+        self.delete(paths)
+        return len(paths)
+
+    def enforce_budget(self):
+        excess = self.index.total_size() - self.policy.budget_bytes
+        if excess <= 0:
+            return 0
+        priority = ' '.join(f"WHEN '{level}' THEN {value}" for level, value in LEVEL_PRIORITY.items())
+        rows = self.index.query(f"""
+            SELECT path, size FROM captures
+            ORDER BY CASE alert_level {priority} ELSE 0 END, created
+            LIMIT ?
+        """, (self.policy.batch_size,))
+        paths = []
+        for path, size in rows:
+            if excess <= 0:
+                break
+            paths.append(path)
+            excess -= size
+        self.delete(paths)
+        return len(paths)
+
+    def compact_old(self, now):
+        rows = self.index.query("""
+            SELECT path, alert_level FROM captures
+            WHERE compacted = 0 AND alert_level != 'export' AND created < ?
+            ORDER BY created LIMIT ?
+        """, (now - self.policy.compact_after_days * 86400, self.policy.batch_size))
+        for path, alert_level in rows:
+            self.compact(path)
+        return len(rows)
+
+    def compact(self, path):
+        """Reduce y recomprime una captura conservando su ruta (la BD la referencia)"""
+        image = cv2.imread(path)
+        if image is None:
+            self.index.remove([path])
+            return
+        h, w = image.shape[:2]
+        scale = 1.0
+        if w > self.policy.compact_max_width:
+            scale = self.policy.compact_max_width / w
+            image = cv2.resize(image, (self.policy.compact_max_width, int(h * scale)),
+                               interpolation=cv2.INTER_AREA)
+        if path.lower().endswith('.png'):
+            params = [cv2.IMWRITE_PNG_COMPRESSION, 9]
+        else:
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.policy.compact_jpeg_quality]
+
+        # Escribir a un archivo temporal y reemplazar de forma atómica
+        root, ext = os.path.splitext(path)
+        tmp_path = f"{root}.compact{ext}"
+        if cv2.imwrite(tmp_path, image, params) and os.path.getsize(tmp_path) < os.path.getsize(path):
+            os.replace(tmp_path, path)
+            if self.thumbnail_cache is not None:
+                self.thumbnail_cache.forget(path)
+            # Los bbox de los metadatos están en píxeles de la imagen original
+            metadata_path = metadata_path_for(path)
+            if scale != 1.0 and metadata_path != path and os.path.exists(metadata_path):
+                scale_metadata_bboxes(metadata_path, scale)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        self.index.mark_compacted(path, self.index.file_size(path))
+
+    def delete(self, paths):
+        """Borra archivos, sus metadatos, sus filas en MySQL y sus entradas en el índice"""
+        if not paths:
+            return
+        for path in paths:
+            for file_path in (path, metadata_path_for(path)):
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    print(f"Error borrando {file_path}: {e}")
+            if self.thumbnail_cache is not None:
+                self.thumbnail_cache.forget(path)
+        self.delete_database_rows(paths)
+        self.index.remove(paths)
+
+    def delete_database_rows(self, paths):
+        if self.connection_params is None:
+            return
+        try:
+            connection = pymysql.connect(**self.connection_params)
+            try:
+                with connection.cursor() as cursor:
+                    params = [(p,) for p in paths]
+                    cursor.executemany("DELETE FROM weapon_detections WHERE image_path = %s", params)
+                    cursor.executemany("DELETE FROM Informacion WHERE imagen = %s", params)
+                connection.commit()
+            finally:
+                connection.close()
+        except pymysql.MySQLError as e:
+            print(f"Error limpiando la base de datos: {e}")
+
+
+class RetentionService(threading.Thread):
+    def __init__(self, manager, interval_seconds=None):
+        """
+        Hilo en segundo plano que ejecuta RetentionManager.run_once periódicamente
+        Args:
+            manager: RetentionManager a ejecutar
+            interval_seconds: Pausa entre ciclos (por defecto, la de la política)
+        """
+        super().__init__(daemon=True)
+        self.manager = manager
+        self.interval_seconds = interval_seconds or manager.policy.interval_seconds
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            wait_seconds = self.interval_seconds
+            try:
+                stats = self.manager.run_once()
+                if any(stats.values()):
+                    print(f"[INFO] Retención: {stats}")
+                # Si un ciclo llenó algún lote queda trabajo pendiente: repetir pronto
+                if max(stats.values()) >= self.manager.policy.batch_size:
+                    wait_seconds = 1
+            except Exception as e:
+                print(f"Error en el servicio de retención: {e}")
+            self.stop_event.wait(wait_seconds)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
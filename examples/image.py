@@ -9,12 +9,14 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from process.main import PlateRecognition
 from db.main import connection  # Importar la conexión a la base de datos
+from db.plate_index import PlateIndex
 
 # Crear una carpeta para guardar las capturas si no existe
 os.makedirs('captures', exist_ok=True)
 
-# Inicializar un conjunto para almacenar placas guardadas
-saved_plates = set()
+# Índice persistente de placas guardadas (tolera variantes del OCR)
+plate_index = PlateIndex()
+PLATE_DEDUP_SECONDS = 600
 
 # Función para insertar datos en la base de datos
 def save_to_database(license_plate, image_path):
@@ -34,21 +36,21 @@ if __name__ == "__main__":
     vehicle_image, license_plate, info = processor.process_static_image(image_path, draw=True)
 
     # Verificar si la placa no está repetida
-    if license_plate and license_plate not in saved_plates:
-        # Agregar la placa al conjunto de placas guardadas
-        saved_plates.add(license_plate)
-        
+    is_new, plate = False, ''
+    if license_plate:
+        is_new, plate = plate_index.check_and_add(license_plate, PLATE_DEDUP_SECONDS)
+    if is_new and plate:
         # Generar el nombre de archivo basado en la placa
-        capture_filename = f'captures/{license_plate}.png'
+        capture_filename = f'captures/{plate}.png'
         
         # Guardar la imagen capturada
         cv2.imwrite(capture_filename, vehicle_image)
         print(f'Captura guardada: {capture_filename}')
         
         # Guardar la información en la base de datos
-        save_to_database(license_plate, capture_filename)
+        save_to_database(plate, capture_filename)
     else:
-        if license_plate in saved_plates:
+        if license_plate:
             print('La placa ya ha sido registrada previamente.')
 
     print(f'License plate: {license_plate} \nInfo: {info}')
@@ -58,3 +60,4 @@ if __name__ == "__main__":
 
 # Cerrar la conexión a la base de datos al final
 connection.close()
+plate_index.close()
@@ -8,16 +8,23 @@ import pymysql
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from process.main import PlateRecognition
+from process.config import PipelineConfig, ProfilingConfig
 from db.main import connection  # Importar la conexión a la base de datos
+from db.plate_index import PlateIndex
 
 # Crear una carpeta para guardar las capturas si no existe
 os.makedirs('captures', exist_ok=True)
 
-# Inicializar un conjunto para almacenar placas guardadas
-saved_plates = set()
+# Índice persistente de placas guardadas (tolera variantes del OCR)
+plate_index = PlateIndex()
+PLATE_DEDUP_SECONDS = 600
 
-# Inicializar la clase de procesamiento de placas
-processor = PlateRecognition()
+# Inicializar la clase de procesamiento de placas, midiendo el tiempo de cada etapa
+processor = PlateRecognition(PipelineConfig(profiling=ProfilingConfig(enabled=True)))
+# Los primeros segundos se guardan como traza (abrir en chrome://tracing o ui.perfetto.dev)
+TRACE_SECONDS = 30
+TRACE_PATH = 'captures/trace.json'
+processor.profiler.start_recording(TRACE_SECONDS)
 cap = cv2.VideoCapture('examples/plates3.mp4')
 
 # Función para insertar datos en la base de datos
@@ -42,19 +49,19 @@ if __name__ == "__main__":
         vehicle_image, license_plate, info = processor.process_vehicular_plate(frame, True, True)
 
         # Si la placa fue identificada y no está repetida, guardar una captura
-        if license_plate and license_plate not in saved_plates:
-            # Agregar la placa al conjunto de placas guardadas
-            saved_plates.add(license_plate)
-            
+        is_new, plate = False, ''
+        if license_plate:
+            is_new, plate = plate_index.check_and_add(license_plate, PLATE_DEDUP_SECONDS)
+        if is_new and plate:
             # Generar el nombre de archivo basado en la placa
-            capture_filename = f'captures/{license_plate}.png'
+            capture_filename = f'captures/{plate}.png'
             
             # Guardar la imagen capturada
             cv2.imwrite(capture_filename, vehicle_image)
             print(f'Captura guardada: {capture_filename}')
             
             # Guardar la información en la base de datos
-            save_to_database(license_plate, capture_filename)
+            save_to_database(plate, capture_filename)
 
         print(f'License plate: {license_plate} \nInfo: {info}')
         cv2.imshow('result_process', vehicle_image)
@@ -65,5 +72,13 @@ if __name__ == "__main__":
     cap.release()
     cv2.destroyAllWindows()
 
+# Fracción de frames en que corrió cada etapa (detección, segmentación, OCR)
+print(f'Etapas: {processor.stats()["scheduler"]}')
+for stage, times in processor.stats().get('stages', {}).items():
+    print(f"{stage:<18} {times['count']:6d} veces  p50 {times['p50_ms']:8.2f} ms  p95 {times['p95_ms']:8.2f} ms")
+print(f'Traza guardada: {TRACE_PATH} ({processor.profiler.export_trace(TRACE_PATH)} eventos)')
+processor.close()
+
 # Cerrar la conexión a la base de datos al final
 connection.close()
+plate_index.close()
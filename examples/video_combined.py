@@ -0,0 +1,34 @@
+import os
+import sys
+import cv2
+
+# Ajusta la ruta para importar los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from process.combined_pipeline import CombinedPipeline
+from process.config import PipelineConfig, SchedulerConfig
+from process.weapon_detection import DetectionParams
+
+# Armas y placas de una misma cámara en una sola pasada por frame: el frame se decodifica una vez y
+# los dos modelos corren a la vez. Con el mismo tamaño de inferencia en los dos detectores, el frame
+# además se redimensiona una sola vez para ambos.
+IMGSZ = 480
+pipeline = CombinedPipeline(PipelineConfig(scheduler=SchedulerConfig(detect_imgsz=IMGSZ)),
+                            weapon_params=DetectionParams(imgsz=IMGSZ))
+
+if __name__ == "__main__":
+    for image, events in pipeline.run('examples/plates2.mp4', draw=True):
+        # Un solo flujo de eventos: armas en cada frame en que aparecen, cada placa una vez por vehículo
+        for event in events:
+            if event['type'] == 'weapon':
+                print(f"[{event['seq']}] arma: {event['class_name']} ({event['confidence']:.2f}) en {event['bbox']}")
+            else:
+                print(f"[{event['seq']}] placa: {event['license_plate']} (vehículo {event['track_id']})")
+
+        cv2.imshow('armas y placas', image)
+        if cv2.waitKey(5) == 27:  # Presionar la tecla 'Esc' (código 27) para salir
+            break
+
+    cv2.destroyAllWindows()
+    print(f'Estadísticas: {pipeline.stats()}')
+    pipeline.close()
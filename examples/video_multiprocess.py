@@ -0,0 +1,71 @@
+import os
+import sys
+import argparse
+import multiprocessing as mp
+
+# Ajusta la ruta para importar los módulos del proyecto
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from process.frame_ring import FrameRing
+from process.pipeline_workers import capture_shape, capture_frames, weapon_worker, plate_worker
+from process.resources import ResourceManager
+
+# Captura, detección de armas y reconocimiento de placas en procesos separados: la captura
+# decodifica cada frame directamente en un slot de memoria compartida (FrameRing) y los dos
+# procesos de inferencia leen el mismo slot; por las colas sólo viajan mensajes pequeños.
+RING_SLOTS = 8
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pipeline de armas y placas en varios procesos')
+    parser.add_argument('--source', default='examples/plates2.mp4', help='video o índice de cámara')
+    parser.add_argument('--max-frames', type=int, default=None)
+    parser.add_argument('--pin-cpus', action='store_true', help='reparte los núcleos entre los procesos')
+    args = parser.parse_args()
+    live = args.source.isdigit()
+    source = int(args.source) if live else args.source
+
+    ctx = mp.get_context('spawn')
+    ring = FrameRing(RING_SLOTS, capture_shape(source), ctx=ctx)
+    weapon_inbox, plate_inbox, results = ctx.Queue(), ctx.Queue(), ctx.Queue()
+    stop_event = ctx.Event()
+    # La captura espera a que los dos modelos estén cargados y calentados
+    ready = [ctx.Event(), ctx.Event()]
+    # Cada proceso se fija a sus núcleos y ajusta sus hilos de torch y OpenCV
+    resources = None
+    if args.pin_cpus:
+        resources = ResourceManager()
+        print(resources.describe())
+
+    # Con una cámara se procesa siempre el frame más reciente; con un video, todos
+    processes = [
+        ctx.Process(target=capture_frames, args=(source, ring, [weapon_inbox, plate_inbox], stop_event, live,
+                                                 args.max_frames, ready, resources), name='capture'),
+        ctx.Process(target=weapon_worker, args=(ring, weapon_inbox, results),
+                    kwargs={'latest': live, 'ready': ready[0], 'resources': resources}, name='weapons'),
+        ctx.Process(target=plate_worker, args=(ring, plate_inbox, results),
+                    kwargs={'latest': live, 'ready': ready[1], 'resources': resources}, name='plates'),
+    ]
+    for process in processes:
+        process.start()
+
+    running = {'weapon', 'plate'}
+    try:
+        while running:
+            pipeline, seq, payload = results.get()
+            if seq is None:
+                print(f'{pipeline}: terminado, {payload} frames omitidos')
+                running.discard(pipeline)
+            elif payload:
+                print(f'frame {seq} [{pipeline}]: {payload}')
+    except KeyboardInterrupt:
+        stop_event.set()
+    finally:
+        stop_event.set()
+        for process in processes:
+            process.join(timeout=10)
+        ring.close()
+
+
+if __name__ == "__main__":
+    main()
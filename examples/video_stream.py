@@ -9,16 +9,29 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 from process.main import PlateRecognition
 from db.main import connection  # Importar la conexión a la base de datos
+from db.plate_index import PlateIndex
+from process.metrics import (MetricsRegistry, register_process_metrics, start_metrics_server, frames_dropped,
+                             db_write_latency, timed)
 
 # Crear una carpeta para guardar las capturas si no existe
 os.makedirs('captures', exist_ok=True)
 
-# Inicializar un conjunto para almacenar placas guardadas
-saved_plates = set()
+# Índice persistente de placas guardadas (tolera variantes del OCR)
+plate_index = PlateIndex()
+PLATE_DEDUP_SECONDS = 600
 
 # Inicializar la clase de procesamiento de placas
 processor = PlateRecognition()
 
+# Métricas del proceso en el endpoint local ([METRICS] de weapon_config.ini)
+METRICS_SOURCE = 'camera_0'
+metrics = MetricsRegistry()
+register_process_metrics(metrics)
+processor.register_metrics(metrics, METRICS_SOURCE)
+dropped_frames = frames_dropped(metrics, METRICS_SOURCE)
+db_latency = db_write_latency(metrics, METRICS_SOURCE, 'Informacion')
+metrics_server = start_metrics_server(metrics, 'plate_headless')
+
 # Configuración de la cámara
 cap = cv2.VideoCapture(0)
 cap.set(3, 1280)  # Ancho de la cámara
@@ -30,8 +43,9 @@ def save_to_database(license_plate, image_path):
         with connection.cursor() as cursor:
             # Insertar la información en la base de datos
             sql = "INSERT INTO Informacion (num_placa, imagen) VALUES (%s, %s)"
-            cursor.execute(sql, (license_plate, image_path))
-            connection.commit()  # Confirmar la inserción
+            with timed(db_latency):
+                cursor.execute(sql, (license_plate, image_path))
+                connection.commit()  # Confirmar la inserción
             print(f'Información guardada en la base de datos: {license_plate}')
     except pymysql.MySQLError as e:
         print(f'Error al guardar en la base de datos: {e}')
@@ -40,25 +54,26 @@ if __name__ == "__main__":
     while True:
         ret, frame = cap.read()
         if not ret:
+            dropped_frames.inc()
             break
 
         # Procesar el frame para detectar la placa
         vehicle_image, license_plate, info = processor.process_vehicular_plate(frame, True, True)
 
         # Si la placa fue identificada y no está repetida, guardar una captura
-        if license_plate and license_plate not in saved_plates:
-            # Agregar la placa al conjunto de placas guardadas
-            saved_plates.add(license_plate)
-            
+        is_new, plate = False, ''
+        if license_plate:
+            is_new, plate = plate_index.check_and_add(license_plate, PLATE_DEDUP_SECONDS)
+        if is_new and plate:
             # Generar el nombre de archivo basado en la placa
-            image_filename = f'captures/{license_plate}.png'
+            image_filename = f'captures/{plate}.png'
             
             # Guardar la imagen capturada
             cv2.imwrite(image_filename, vehicle_image)
             print(f'Captura guardada: {image_filename}')
             
             # Guardar la información en la base de datos
-            save_to_database(license_plate, image_filename)
+            save_to_database(plate, image_filename)
 
         print(f'License plate: {license_plate} \nInfo: {info}')
         cv2.imshow('result_process', vehicle_image)
@@ -69,5 +84,12 @@ if __name__ == "__main__":
     cap.release()
     cv2.destroyAllWindows()
 
+# Fracción de frames en que corrió cada etapa (detección, segmentación, OCR)
+print(f'Etapas: {processor.stats()["scheduler"]}')
+processor.close()
+if metrics_server is not None:
+    metrics_server.stop()
+
 # Cerrar la conexión a la base de datos al final
 connection.close()
+plate_index.close()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Indexa las placas de un archivo de imágenes (carpetas de operadores de parqueaderos).
+
+Las imágenes ya indexadas se reconocen por el hash de su contenido, así que el proceso se
+puede interrumpir y volver a lanzar. Cada placa se guarda en la tabla Informacion.
+
+    python index_archive.py /ruta/al/archivo --decode-workers 8 --ocr-mode process --ocr-workers 4
+"""
+
+import argparse
+import pymysql
+from db.archive_index import ArchiveIndex, ARCHIVE_INDEX_PATH
+from process.archive_indexing import ArchiveIndexer
+from process.config import OcrConfig, PipelineConfig
+from process.main import PlateRecognition
+
+
+class DatabaseWriter:
+    """Guarda las placas de cada imagen en la tabla Informacion"""
+
+    def __init__(self, connection_params):
+        self.connection = pymysql.connect(**connection_params)
+
+    def __call__(self, image_path, plates):
+        if not plates:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.executemany("INSERT INTO Informacion (num_placa, imagen) VALUES (%s, %s)",
+                               [(plate, image_path) for plate in plates])
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('root', help='Carpeta con las imágenes (se recorre recursivamente)')
+    parser.add_argument('--index', default=ARCHIVE_INDEX_PATH, help='Índice SQLite de imágenes ya procesadas')
+    parser.add_argument('--decode-workers', type=int, default=None, help='Procesos de lectura (por defecto: CPUs)')
+    parser.add_argument('--batch-size', type=int, default=16, help='Imágenes por lote de detección')
+    parser.add_argument('--ocr-mode', choices=['sync', 'thread', 'process'], default='process')
+    parser.add_argument('--ocr-workers', type=int, default=2)
+    parser.add_argument('--ocr-engine', default='easyocr')
+    parser.add_argument('--min-plate-area', type=int, default=0,
+                        help='Área mínima de placa en píxeles (por defecto se leen todas)')
+    parser.add_argument('--no-db', action='store_true', help='Solo registrar en el índice local, sin MySQL')
+    args = parser.parse_args()
+
+    writer = None
+    if not args.no_db:
+        from db.main import DB_PARAMS
+        writer = DatabaseWriter(DB_PARAMS)
+
+    ocr_config = OcrConfig(engine=args.ocr_engine, mode=args.ocr_mode, workers=args.ocr_workers,
+                           max_pending=args.ocr_workers * args.batch_size, batch_size=args.batch_size, cache_size=0)
+    processor = PlateRecognition(PipelineConfig(ocr=ocr_config))
+    archive_index = ArchiveIndex(args.index)
+    indexer = ArchiveIndexer(processor, archive_index, writer, args.decode_workers, args.batch_size,
+                             min_plate_area=args.min_plate_area)
+    try:
+        indexer.run(args.root)
+    finally:
+        processor.close()
+        archive_index.close()
+        if writer is not None:
+            writer.close()
+
+
+if __name__ == '__main__':
+    main()
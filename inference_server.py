@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Servidor local de inferencia: carga una sola vez los modelos de armas, vehículos y placas y los
+comparte entre las aplicaciones, scripts y herramientas del equipo (ver process/inference_client.py).
+
+Las peticiones simultáneas a un mismo modelo se agrupan en lotes de hasta --max-batch imágenes; la
+primera petición de un lote espera como mucho --max-delay-ms a las demás.
+
+    python inference_server.py --port 9120 --models weapons vehicles plates --max-batch 8 --max-delay-ms 10
+"""
+
+import time
+import argparse
+from process.config import InferenceServerConfig
+from process.inference_server import InferenceServer, MODELS
+
+
+def main():
+    defaults = InferenceServerConfig()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default=defaults.host)
+    parser.add_argument('--port', type=int, default=defaults.port)
+    parser.add_argument('--models', nargs='+', choices=MODELS, default=defaults.models)
+    parser.add_argument('--weapon-model', default=None, help='Modelo YOLO de armas personalizado')
+    parser.add_argument('--max-batch', type=int, default=defaults.max_batch_size, help='Imágenes por lote')
+    parser.add_argument('--max-delay-ms', type=float, default=defaults.max_delay_ms,
+                        help='Espera máxima de una petición para completar su lote')
+    args = parser.parse_args()
+
+    config = InferenceServerConfig(host=args.host, port=args.port, models=args.models,
+                                   weapon_model_path=args.weapon_model, max_batch_size=args.max_batch,
+                                   max_delay_ms=args.max_delay_ms)
+    server = InferenceServer(config).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for model, stats in server.stats().items():
+            print(f"{model}: {stats['requests']} imágenes en {stats['batches']} lotes "
+                  f"(media {stats['mean_batch_size']:.1f} por lote)")
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
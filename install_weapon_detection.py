@@ -160,6 +160,15 @@ except Exception as e:
                 )
                 """
                 cursor.execute(create_table_sql)
+
+                # Tabla de placas: la galería de Vista/app.py pagina por id
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS Informacion (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    num_placa VARCHAR(20) NOT NULL,
+                    imagen VARCHAR(255)
+                )
+                """)
                 connection.commit()
             
             connection.close()
@@ -202,6 +211,10 @@ database = placas
 [DETECTION]
 confidence_threshold = 0.5
 weapon_classes = pistol,rifle,knife,sword,gun,weapon
+# Tamaño de inferencia adaptado a la carga para mantener target_fps (el modelo se entrenó con imgsz 800)
+adaptive_imgsz = true
+imgsz_sizes = 480,640,800
+target_fps = 10
 
 [ALERTS]
 high_threshold = 3
@@ -212,6 +225,33 @@ medium_confidence = 0.6
 captures_dir = captures
 exports_dir = exports
 auto_save = true
+
+[RETENTION]
+budget_mb = 5120
+max_age_days_high = 90
+max_age_days_medium = 30
+max_age_days_low = 7
+max_age_days_safe = 3
+max_age_days_plate = 30
+max_age_days_export = 14
+compact_after_days = 2
+compact_max_width = 1280
+compact_jpeg_quality = 70
+batch_size = 200
+interval_seconds = 300
+
+[METRICS]
+# Endpoint local de métricas en formato Prometheus: http://host:puerto/metrics
+# Un puerto por proceso; sin puerto el proceso no expone métricas.
+enabled = true
+host = 127.0.0.1
+port_weapon_app = 9108
+port_plate_app = 9109
+port_plate_headless = 9110
+
+[ROI]
+# Región de interés por fuente: fuente = x,y x,y x,y ... (fracciones del ancho y alto del frame)
+# Sin entrada se procesa el frame completo. Se puede editar desde la aplicación.
 """
         
         config_file = self.project_root / "weapon_config.ini"
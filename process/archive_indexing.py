@@ -0,0 +1,214 @@
+import os
+import time
+import hashlib
+import sqlite3
+import cv2
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from db.archive_index import ArchiveIndex, open_readonly
+from db.plate_index import normalize_plate
+from process.main import PlateRecognition
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff')
+
+# (path, content_hash, image or None, status): status is 'ok', 'indexed' or an error message
+DecodedImage = Tuple[str, str, Optional[np.ndarray], str]
+
+_decoder_index: Optional[sqlite3.Connection] = None
+
+
+def iter_images(root: str) -> Iterator[str]:
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(directory, name)
+
+
+def _init_decoder(index_path: str):
+    global _decoder_index
+    _decoder_index = open_readonly(index_path)
+
+
+def _decode_image(path: str) -> DecodedImage:
+    # runs in the decoding processes: hash first, decode only what is not indexed yet
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError as e:
+        return path, '', None, f'read error: {e}'
+    content_hash = hashlib.sha1(data).hexdigest()
+    if _decoder_index is not None and _decoder_index.execute(
+            "SELECT 1 FROM archive_images WHERE content_hash = ?", (content_hash,)).fetchone():
+        return path, content_hash, None, 'indexed'
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return path, content_hash, None, 'decode error'
+    return path, content_hash, image, 'ok'
+
+
+class ArchiveIndexer:
+    """
+    Indexes the plates of every image under a directory. Decoding runs in a process pool,
+    vehicle detection and plate segmentation run on batches of images, and OCR goes through
+    the recognizer's worker pool. Each finished image is handed to `on_image` (the storage
+    backend) and then recorded in the archive index, so a new run resumes where the last one stopped.
+    `min_plate_area` is the indexer's own, not the tracker's: a still image gets no later, closer frame
+    of the same vehicle, and an image is marked indexed even when all its plates were too small.
+    """
+
+    def __init__(self, processor: PlateRecognition, archive_index: ArchiveIndex,
+                 on_image: Optional[Callable[[str, List[str]], None]] = None, decode_workers: Optional[int] = None,
+                 batch_size: int = 16, report_every: int = 100, min_plate_area: int = 0):
+        self.processor = processor
+        self.archive_index = archive_index
+        self.on_image = on_image
+        self.decode_workers = decode_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.report_every = report_every
+        self.min_plate_area = min_plate_area
+
+        # content_hash -> [path, plate crops still being read, texts]
+        self.open_images: Dict[str, list] = {}
+        self.stats = {'seen': 0, 'indexed': 0, 'skipped': 0, 'failed': 0, 'plates': 0}
+        self.started_at = 0.0
+
+    def run(self, root: str) -> Dict[str, float]:
+        self.started_at = time.perf_counter()
+        seen_hashes = set()
+        batch: List[DecodedImage] = []
+        window = self.decode_workers * 4
+
+        with ProcessPoolExecutor(self.decode_workers, initializer=_init_decoder,
+                                 initargs=(self.archive_index.db_path,)) as decoders:
+            # a bounded window of decode jobs keeps memory flat on large archives
+            futures: deque = deque()
+            paths = iter_images(root)
+            for path in paths:
+                futures.append(decoders.submit(_decode_image, path))
+                if len(futures) >= window:
+                    self.collect(futures.popleft().result(), seen_hashes, batch)
+            while futures:
+                self.collect(futures.popleft().result(), seen_hashes, batch)
+        if batch:
+            self.process_batch(batch)
+        self.wait_for_ocr()
+        # images whose ocr jobs failed stay out of the index and are retried by the next run
+        self.stats['failed'] += len(self.open_images)
+        self.open_images.clear()
+        self.archive_index.commit()
+        return self.report(final=True)
+
+    def collect(self, decoded: DecodedImage, seen_hashes: set, batch: List[DecodedImage]):
+        path, content_hash, _, status = decoded
+        self.stats['seen'] += 1
+        if status == 'indexed' or content_hash in seen_hashes:
+            self.stats['skipped'] += 1
+        elif status != 'ok':
+            self.stats['failed'] += 1
+            print(f'{path}: {status}')
+        else:
+            seen_hashes.add(content_hash)
+            batch.append(decoded)
+            if len(batch) >= self.batch_size:
+                self.process_batch(batch)
+                batch.clear()
+        if self.stats['seen'] % self.report_every == 0:
+            self.report()
+
+    def process_batch(self, batch: List[DecodedImage]):
+        processor = self.processor
+        scheduler_config = processor.config.scheduler
+        images = [image for _, _, image, _ in batch]
+
+        # vehicle detection over the batch, then plate segmentation over every vehicle crop
+        crops, owners = [], []
+        for (path, content_hash, image, _), (detected, info) in zip(
+                batch, processor.model_detect.check_vehicles(images, scheduler_config.detect_imgsz)):
+            self.open_images[content_hash] = [path, 0, []]
+            if detected:
+                for bbox, _, _ in processor.model_detect.extract_detections_info(image, info):
+                    crops.append(processor.model_detect.image_vehicle_crop(image, bbox))
+                    owners.append(content_hash)
+
+        plate_checks = processor.model_segmentation.check_vehicle_plates(crops, scheduler_config.segment_imgsz)
+        plate_crops = []
+        for vehicle_crop, content_hash, (has_plate, plate_info) in zip(crops, owners, plate_checks):
+            if not has_plate:
+                continue
+            plate_mask, _, _ = processor.model_segmentation.extract_plate_info(vehicle_crop, plate_info)
+            if plate_mask.area < self.min_plate_area:
+                continue
+            plate_crop = processor.model_segmentation.mask_processing(vehicle_crop, plate_mask)
+            if plate_crop.size:
+                plate_crops.append((plate_crop, content_hash))
+        # every crop is counted before any is read: a sync read finishes its image as soon as the
+        # count drops to 0, which must not happen while the image still has crops to read
+        for _, content_hash in plate_crops:
+            self.open_images[content_hash][1] += 1
+        for plate_crop, content_hash in plate_crops:
+            self.read_plate(plate_crop, content_hash)
+
+        for content_hash in [h for h, entry in self.open_images.items() if entry[1] == 0]:
+            self.finish(content_hash)
+        self.drain_ocr()
+
+    def read_plate(self, plate_crop: np.ndarray, content_hash: str):
+        # the crop is already counted in open_images (process_batch)
+        pool = self.processor.ocr_pool
+        if pool is None:
+            self.on_text(content_hash, self.processor.read_plate_text(plate_crop, use_cache=False))
+            return
+        # archives must not lose reads: wait for a free slot instead of dropping the crop
+        pool.submit(plate_crop, content_hash, block=True)
+
+    def drain_ocr(self) -> int:
+        if self.processor.ocr_pool is None:
+            return 0
+        results = self.processor.ocr_pool.poll()
+        for content_hash, text in results:
+            self.on_text(content_hash, text)
+        return len(results)
+
+    def wait_for_ocr(self):
+        pool = self.processor.ocr_pool
+        while pool is not None and pool.pending() > 0:
+            if not self.drain_ocr():
+                time.sleep(0.01)
+        self.drain_ocr()
+
+    def on_text(self, content_hash: str, text: str):
+        entry = self.open_images[content_hash]
+        entry[1] -= 1
+        plate = normalize_plate(text)
+        if plate and plate not in entry[2]:
+            entry[2].append(plate)
+        if entry[1] == 0:
+            self.finish(content_hash)
+
+    def finish(self, content_hash: str):
+        path, _, plates = self.open_images.pop(content_hash)
+        try:
+            if self.on_image is not None:
+                self.on_image(path, plates)
+        except Exception as e:
+            # not recorded in the archive index: the next run retries the image
+            self.stats['failed'] += 1
+            print(f'{path}: storage error: {e}')
+            return
+        # committed with the storage write: an interrupted run must not store the image's plates again
+        self.archive_index.add(content_hash, path, plates)
+        self.archive_index.commit()
+        self.stats['indexed'] += 1
+        self.stats['plates'] += len(plates)
+
+    def report(self, final: bool = False) -> Dict[str, float]:
+        elapsed = max(1e-9, time.perf_counter() - self.started_at)
+        stats = dict(self.stats, elapsed_seconds=elapsed, images_per_second=self.stats['seen'] / elapsed,
+                     indexed_per_second=self.stats['indexed'] / elapsed)
+        print(f"{'done' if final else 'progress'}: {stats['seen']} images ({stats['indexed']} indexed, "
+              f"{stats['skipped']} skipped, {stats['failed']} failed, {stats['plates']} plates) "
+              f"- {stats['images_per_second']:.1f} images/s, {stats['indexed_per_second']:.1f} indexed/s")
+        return stats
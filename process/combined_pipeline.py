@@ -0,0 +1,130 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+import cv2
+import numpy as np
+from process.computer_vision_models.letterbox import LetterboxCache
+from process.config import PipelineConfig
+from process.main import PlateRecognition
+from process.metrics import MetricsRegistry
+from process.resources import ResourceManager
+from process.roi import RegionOfInterest
+from process.weapon_detection import DetectionParams, WeaponDetector
+
+
+class CombinedPipeline:
+    """
+    Weapon detection and plate recognition of one source in a single pass per frame. The frame is
+    decoded once and both models run at the same time: weapons on a helper thread, plates on the
+    caller's. When both detect at the same size on the same region, the frame is letterboxed once
+    for the two of them. Their results come out as one stream of events:
+
+        {'type': 'weapon', 'seq', 'timestamp', 'bbox', 'confidence', 'class_id', 'class_name'}
+        {'type': 'plate', 'seq', 'timestamp', 'track_id', 'license_plate', 'vehicle_bbox', 'vehicle_type'}
+
+    A plate event is emitted once per track and plate text, a weapon event on every frame it is seen.
+    With a ResourceManager, the weapon thread runs on the 'weapons' cpus and the caller's thread on
+    the 'plates' ones (apply it from the thread that calls process_frame; run() does).
+    """
+
+    def __init__(self, config: Optional[PipelineConfig] = None, roi: Optional[RegionOfInterest] = None,
+                 weapon_model_path: Optional[str] = None, weapon_params: Optional[DetectionParams] = None,
+                 resources: Optional[ResourceManager] = None):
+        self.roi = roi
+        self.resources = resources
+        self.plates = PlateRecognition(config, roi, resources)
+        # warmed up at the size this pipeline runs it at, not the detector's default
+        self.weapons = WeaponDetector(weapon_model_path, warmup=False)
+        self.params = weapon_params or self.weapons.params
+        warmup = self.plates.config.warmup
+        if warmup.enabled:
+            self.weapons.warm_up([self.weapon_imgsz(self.params)], tuple(warmup.frame_shape), repeats=warmup.repeats)
+        self.letterbox_cache = LetterboxCache()
+        self.plates.model_detect.letterbox_cache = self.letterbox_cache
+        self.weapons.letterbox_cache = self.letterbox_cache
+        self.executor = ThreadPoolExecutor(1, thread_name_prefix='weapon-detection',
+                                           initializer=resources.apply if resources is not None else None,
+                                           initargs=('weapons',) if resources is not None else ())
+        self.frames = 0
+        self.shared_frames = 0
+        self.reported_plates: Dict[int, str] = {}
+
+    @property
+    def is_hot(self) -> bool:
+        return self.plates.is_hot and self.weapons.is_hot
+
+    def register_metrics(self, registry: MetricsRegistry, source: str):
+        self.plates.register_metrics(registry, f'{source}/plates')
+        self.weapons.register_metrics(registry, f'{source}/weapons')
+
+    def weapon_imgsz(self, params: DetectionParams) -> Optional[int]:
+        if self.weapons.resolution is not None:
+            return self.weapons.resolution.imgsz
+        return params.imgsz
+
+    def process_frame(self, frame: np.ndarray, draw: bool = False) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        self.frames += 1
+        seq = self.frames
+        params = self.params
+        self.letterbox_cache.new_frame()
+
+        # same size on the same roi crop: letterboxed here, before the weapon thread starts, so both
+        # models find it in the cache and neither reads the frame's pixels while the plates draw on it
+        imgsz = self.weapon_imgsz(params)
+        shared = imgsz is not None and imgsz == self.plates.detect_imgsz()
+        if shared:
+            self.letterbox_cache.prepare(self.plates.roi_image(frame)[0], imgsz)
+            self.shared_frames += 1
+        plate_image = frame.copy() if draw and not shared else frame
+
+        weapons_future = self.executor.submit(self.weapons.detect_weapons, frame, self.roi, params)
+        try:
+            image, vehicles = self.plates.process_vehicular_plates(plate_image, True, draw)
+        finally:
+            _, weapons = weapons_future.result()
+        if draw and weapons:
+            image = self.weapons.draw_detections(image, weapons)
+        return image, self.events(seq, weapons, vehicles)
+
+    def events(self, seq: int, weapons: List[dict], vehicles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        timestamp = datetime.now().isoformat()
+        events: List[Dict[str, Any]] = [{'type': 'weapon', 'seq': seq, 'timestamp': timestamp, **detection}
+                                        for detection in weapons]
+        for vehicle in vehicles:
+            track_id, plate = vehicle['track_id'], vehicle['license_plate']
+            if not plate or self.reported_plates.get(track_id) == plate:
+                continue
+            self.reported_plates[track_id] = plate
+            events.append({'type': 'plate', 'seq': seq, 'timestamp': timestamp, 'track_id': track_id,
+                           'license_plate': plate, 'vehicle_bbox': [int(v) for v in vehicle['vehicle_bbox']],
+                           'vehicle_type': vehicle['vehicle_type']})
+        # plates of finished tracks are reported once (track_results), so only live tracks are kept
+        alive = {track.track_id for track in self.plates.tracker.tracks}
+        for track_id in [track_id for track_id in self.reported_plates if track_id not in alive]:
+            del self.reported_plates[track_id]
+        return events
+
+    def run(self, source: Union[int, str], draw: bool = False,
+            max_frames: Optional[int] = None) -> Iterator[Tuple[np.ndarray, List[Dict[str, Any]]]]:
+        """Decodes `source` once per frame and yields (frame, events) until it ends."""
+        if self.resources is not None:
+            self.resources.configure_process()
+            self.resources.apply('plates')
+        capture = cv2.VideoCapture(source)
+        try:
+            while max_frames is None or self.frames < max_frames:
+                ret, frame = capture.read()
+                if not ret:
+                    break
+                yield self.process_frame(frame, draw)
+        finally:
+            capture.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'frames': self.frames, 'shared_letterbox_frames': self.shared_frames,
+                'letterbox_cache': self.letterbox_cache.stats(), 'weapon_warmup': self.weapons.warmup.stats(),
+                'plates': self.plates.stats()}
+
+    def close(self):
+        self.executor.shutdown()
+        self.plates.close()
@@ -0,0 +1,95 @@
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+import cv2
+import numpy as np
+
+# ultralytics pads inputs up to a multiple of the model stride (rectangular inference)
+STRIDE = 32
+PAD_COLOR = (114, 114, 114)
+
+
+class Letterboxed(NamedTuple):
+    """An image resized and padded for inference at `size`, and how to map boxes back to it."""
+    image: np.ndarray
+    scale: float
+    pad: Tuple[float, float]
+    shape: Tuple[int, ...]
+
+    def restore(self, results: List[Any], original: np.ndarray) -> List[Any]:
+        # the model saw the letterboxed image: move its boxes back to the original one
+        pad_x, pad_y = self.pad
+        for res in results:
+            res.orig_img = original
+            res.orig_shape = self.shape[:2]
+            if res.boxes is None or not len(res.boxes):
+                continue
+            data = res.boxes.data.clone()
+            data[:, [0, 2]] = (data[:, [0, 2]] - pad_x) / self.scale
+            data[:, [1, 3]] = (data[:, [1, 3]] - pad_y) / self.scale
+            res.update(boxes=data)
+        return results
+
+
+def letterbox(image: np.ndarray, size: int, stride: int = STRIDE) -> Letterboxed:
+    """The same resize and padding the ultralytics predictor applies for inference at `size`."""
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = int(round(width * scale)), int(round(height * scale))
+    pad_x = ((size - new_width) % stride) / 2
+    pad_y = ((size - new_height) % stride) / 2
+    resized = image if (new_width, new_height) == (width, height) else \
+        cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    if top or bottom or left or right:
+        resized = cv2.copyMakeBorder(resized, top, bottom, left, right, cv2.BORDER_CONSTANT, value=PAD_COLOR)
+    return Letterboxed(resized, scale, (left, top), image.shape)
+
+
+class LetterboxCache:
+    """
+    Letterboxed inputs of the current frame, shared by the models that look at the same image
+    region at the same size: the frame is resized once instead of once per model. Entries are
+    keyed by the image buffer, so two roi crops of the frame only share when they are the same crop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple, Letterboxed] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(image: np.ndarray, size: int) -> Tuple:
+        return image.__array_interface__['data'][0], image.shape, image.strides, size
+
+    def new_frame(self):
+        with self._lock:
+            self._entries.clear()
+
+    def prepare(self, image: np.ndarray, size: int) -> Letterboxed:
+        key = self._key(image, size)
+        # held while resizing: a second model asking for the same input waits instead of resizing again
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared is None:
+                self.misses += 1
+                prepared = self._entries[key] = letterbox(image, size)
+            else:
+                self.hits += 1
+        return prepared
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+def predict(model: Any, image: np.ndarray, imgsz: Optional[int], cache: Optional[LetterboxCache] = None,
+            **kwargs) -> List[Any]:
+    """model(image) at imgsz, through the frame's shared letterbox when a cache is set and the size is known."""
+    if imgsz is None:
+        return model(image, **kwargs)
+    if cache is None:
+        return model(image, imgsz=imgsz, **kwargs)
+    prepared = cache.prepare(image, imgsz)
+    # already at its inference size: the predictor's own letterbox leaves it untouched
+    return prepared.restore(model(prepared.image, imgsz=imgsz, **kwargs), image)
@@ -1,10 +1,16 @@
 import cv2
 import numpy as np
 import math
-import torch
-from typing import List, Any, Tuple
+from typing import List, Any, Optional, Sequence, Tuple
 from ultralytics import YOLO
 from process.computer_vision_models.models.config import ConfigModels
+from process.computer_vision_models.plate_mask import PlateMask
+from process.computer_vision_models.letterbox import LetterboxCache, predict
+from process.computer_vision_models.warmup import ModelWarmup, WARMUP_FRAME_SHAPE
+
+
+def inference_size(imgsz: Optional[int]) -> dict:
+    return {} if imgsz is None else {'imgsz': imgsz}
 
 
 class VehicleDetection:
@@ -15,11 +21,25 @@ class VehicleDetection:
         self.detection_model = YOLO(self.models.vehicle_model)
         self.detection_classes = self.models.vehicle_classes
         self.color = self.models.vehicle_color
+        # set by pipelines that share the frame's letterboxed input with other models
+        self.letterbox_cache: Optional[LetterboxCache] = None
+        self.warmup = ModelWarmup('vehicle_detection')
+
+    @property
+    def is_hot(self) -> bool:
+        return self.warmup.hot
+
+    def warm_up(self, sizes: Sequence[Optional[int]], frame_shape: Tuple[int, ...] = WARMUP_FRAME_SHAPE,
+                batch_sizes: Sequence[int] = (1,), repeats: int = 2) -> float:
+        return self.warmup.run(lambda images, imgsz: self.detection_model(
+            images, stream=False, conf=0.60, verbose=False, **inference_size(imgsz)), sizes, frame_shape,
+            batch_sizes, repeats)
 
-    def check_vehicle(self, vehicle_image: np.ndarray) -> Tuple[bool, Any, np.ndarray]:
+    def check_vehicle(self, vehicle_image: np.ndarray, imgsz: Optional[int] = None) -> Tuple[bool, Any, np.ndarray]:
         clean_image = vehicle_image.copy()
         detect = False
-        results = self.detection_model(vehicle_image, stream=False, conf=0.60)
+        # imgsz: inference size, None keeps the model default
+        results = predict(self.detection_model, vehicle_image, imgsz, self.letterbox_cache, stream=False, conf=0.60)
         for res in results:
             boxes = res.boxes
             for box in boxes:
@@ -32,6 +52,17 @@ class VehicleDetection:
         else:
             return True, results, clean_image
 
+    def check_vehicles(self, vehicle_images: List[np.ndarray], imgsz: Optional[int] = None) -> List[Tuple[bool, Any]]:
+        if not vehicle_images:
+            return []
+        # one forward pass over a batch of images, one (detected, [result]) per image
+        results = self.detection_model(vehicle_images, stream=False, conf=0.60, **inference_size(imgsz))
+        checks = []
+        for res in results:
+            classes = [self.detection_classes[int(box.cls[0])] for box in res.boxes]
+            checks.append((any(cls in self.color for cls in classes), [res]))
+        return checks
+
     def extract_detection_info(self, vehicle_image: np.ndarray, detect_info: Any) -> Tuple[list, str, float]:
         height, width, _ = vehicle_image.shape
         bbox: List = []
@@ -56,6 +87,31 @@ class VehicleDetection:
                 conf = math.ceil(box.conf[0])
         return bbox, vehicle_type, conf
 
+    def extract_detections_info(self, vehicle_image: np.ndarray, detect_info: Any) -> List[Tuple[list, str, float]]:
+        height, width, _ = vehicle_image.shape
+        vehicles: List[Tuple[list, str, float]] = []
+
+        for res in detect_info:
+            boxes = res.boxes
+            for box in boxes:
+                vehicle_type = self.detection_classes[int(box.cls[0])]
+                if vehicle_type not in self.color:
+                    continue
+
+                # bounding box
+                x1, y1, x2, y2 = box.xyxy[0]
+                x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
+                x1 = max(0, x1)
+                y1 = max(0, y1)
+                x2 = min(width, x2)
+                y2 = min(height, y2)
+                if x2 <= x1 or y2 <= y1:
+                    continue
+
+                conf = round(float(box.conf[0]), 2)
+                vehicles.append(([x1, y1, x2, y2], vehicle_type, conf))
+        return vehicles
+
     def image_vehicle_crop(self, vehicle_image: np.ndarray, bbox: List[int]) -> np.ndarray:
         x1, y1, x2, y2 = bbox
         return vehicle_image[y1:y2, x1:x2]
@@ -76,12 +132,23 @@ class PlateSegmentation:
         # segmentation
         self.segmentation_model = YOLO(self.models.plate_model)
         self.segmentation_classes = self.models.plate_classes
+        self.warmup = ModelWarmup('plate_segmentation')
 
         self.best_mask = None
 
-    def check_vehicle_plate(self, crop_vehicle_image: np.ndarray) -> Tuple[bool, Any]:
+    @property
+    def is_hot(self) -> bool:
+        return self.warmup.hot
+
+    def warm_up(self, sizes: Sequence[Optional[int]], crop_shape: Tuple[int, ...] = WARMUP_FRAME_SHAPE,
+                batch_sizes: Sequence[int] = (1,), repeats: int = 2) -> float:
+        return self.warmup.run(lambda images, imgsz: self.segmentation_model(
+            images, stream=False, conf=0.60, verbose=False, **inference_size(imgsz)), sizes, crop_shape,
+            batch_sizes, repeats)
+
+    def check_vehicle_plate(self, crop_vehicle_image: np.ndarray, imgsz: Optional[int] = None) -> Tuple[bool, Any]:
         segment = None
-        results = self.segmentation_model(crop_vehicle_image, stream=False, conf=0.60)
+        results = self.segmentation_model(crop_vehicle_image, stream=False, conf=0.60, **inference_size(imgsz))
         for res in results:
             segment = res.masks
 
@@ -90,7 +157,15 @@ class PlateSegmentation:
         else:
             return True, results
 
-    def extract_plate_info(self, crop_vehicle_image: np.ndarray, mask_info: Any) -> Tuple[list, list, float]:
+    def check_vehicle_plates(self, crop_vehicle_images: List[np.ndarray],
+                             imgsz: Optional[int] = None) -> List[Tuple[bool, Any]]:
+        if not crop_vehicle_images:
+            return []
+        # a single forward pass over every vehicle crop of the frame, one result per crop
+        results = self.segmentation_model(crop_vehicle_images, stream=False, conf=0.60, **inference_size(imgsz))
+        return [(res.masks is not None, [res]) for res in results]
+
+    def extract_plate_info(self, crop_vehicle_image: np.ndarray, mask_info: Any) -> Tuple[PlateMask, list, float]:
         height, width, _ = crop_vehicle_image.shape
         max_confidence = 0
         best_segment = None
@@ -102,7 +177,6 @@ class PlateSegmentation:
                     best_segment = segment
                     max_confidence = boxes.conf[0]
 
-        self.best_mask = best_segment.masks[best_pos]
         best_box = best_segment.boxes[best_pos]
 
         x1, y1, x2, y2 = best_box.xyxy[0]
@@ -113,38 +187,31 @@ class PlateSegmentation:
         y2 = min(height, y2)
         bbox = [x1, y1, x2, y2]
 
+        # the mask is converted once, at bbox resolution; area, masking and drawing reuse it
+        self.best_mask = PlateMask.from_result(best_segment.masks[best_pos], bbox, (height, width))
         return self.best_mask, bbox, max_confidence
 
+    def plate_padding(self, crop_vehicle_image: np.ndarray) -> Tuple[int, int]:
+        h, w, _ = crop_vehicle_image.shape
+        return int(w * 0.025), int(h * 0.025)
+
     def image_plate_crop(self, crop_vehicle_image: np.ndarray, plate_bbox: List[int]) -> np.ndarray:
         h, w, _ = crop_vehicle_image.shape
-        offset_x, offset_y = int(w * 0.025), int(h * 0.025)
+        offset_x, offset_y = self.plate_padding(crop_vehicle_image)
         xi, yi, xf, yf = plate_bbox
-        xi, yi, xf, yf = xi - offset_x, yi - offset_y, xf + offset_x, yf + offset_y
+        xi, yi, xf, yf = max(0, xi - offset_x), max(0, yi - offset_y), min(w, xf + offset_x), min(h, yf + offset_y)
         return crop_vehicle_image[yi:yf, xi:xf]
 
-    def mask_processing(self, crop_plate_image: np.ndarray, plate_mask: Any) -> np.ndarray:
-        h, w, _ = crop_plate_image.shape
-        m = torch.squeeze(plate_mask.data)
-        composite = torch.stack((m, m, m), 2)
-        composite = cv2.resize(composite.cpu().numpy(), (w, h))
-        img = crop_plate_image.astype(np.uint8)
-        tmp = img * composite.astype(np.uint8)
-        return tmp
-
-    def calculate_mask_area(self, plate_mask: Any) -> int:
-        mask = torch.squeeze(plate_mask.data).cpu().numpy()
-        area = np.sum(mask)
-        return area
-
-    def draw_plate_segmentation(self, vehicle_image: np.ndarray, plate_mask: Any, vehicle_bbox: List[int]) -> np.ndarray:
-        mask = torch.squeeze(plate_mask.data).cpu().numpy() * 255
-        mask = mask.astype(np.uint8)
-        color_mask = cv2.applyColorMap(mask, cv2.COLORMAP_INFERNO)
-        color_mask_resized = cv2.resize(color_mask, (vehicle_bbox[2] - vehicle_bbox[0], vehicle_bbox[3] - vehicle_bbox[1]))
-        blank_mask = np.zeros_like(vehicle_image)
-        blank_mask[vehicle_bbox[1]:vehicle_bbox[3], vehicle_bbox[0]:vehicle_bbox[2]] = color_mask_resized
-        overlay = cv2.addWeighted(vehicle_image, 1, blank_mask, 0.5, 0)
-        return overlay
+    def mask_processing(self, crop_vehicle_image: np.ndarray, plate_mask: PlateMask) -> np.ndarray:
+        # masks and crops the plate in one step, touching only the (padded) plate bbox
+        return plate_mask.crop(crop_vehicle_image, self.plate_padding(crop_vehicle_image))
+
+    def calculate_mask_area(self, plate_mask: PlateMask) -> int:
+        return plate_mask.area
+
+    def draw_plate_segmentation(self, vehicle_image: np.ndarray, plate_mask: PlateMask, vehicle_bbox: List[int]) -> np.ndarray:
+        return plate_mask.overlay(vehicle_image, (vehicle_bbox[0], vehicle_bbox[1]))
+
 
 
 
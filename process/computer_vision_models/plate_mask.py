@@ -0,0 +1,110 @@
+import cv2
+import numpy as np
+from typing import Any, List, Optional, Tuple
+
+
+class PlateMask:
+    """
+    Segmentation mask of one plate, built once per detection.
+
+    The mask is kept as a uint8 array at plate bbox resolution (the ROI), so masking, area and
+    overlay cost depends on the plate size and not on the vehicle crop. `area` stays in model mask
+    pixels, the unit the tracking thresholds were tuned in.
+    """
+
+    def __init__(self, roi: np.ndarray, bbox: List[int], image_shape: Tuple[int, int], area_scale: float = 1.0,
+                 polygon: Optional[np.ndarray] = None):
+        self.roi = roi
+        self.bbox = bbox
+        self.image_shape = image_shape
+        self.area = int(round(np.count_nonzero(roi) * area_scale))
+        self._polygon = polygon
+        self._rle: Optional[List[int]] = None
+
+    @classmethod
+    def from_result(cls, plate_mask: Any, bbox: List[int], image_shape: Tuple[int, int]) -> 'PlateMask':
+        """Builds the ROI mask from an ultralytics Masks entry of an image of `image_shape` (h, w)."""
+        h, w = image_shape
+        xi, yi, xf, yf = bbox
+        roi = np.zeros((max(0, yf - yi), max(0, xf - xi)), dtype=np.uint8)
+        mask_h, mask_w = plate_mask.data.shape[-2:]
+        area_scale = (mask_h * mask_w) / float(h * w)
+
+        # the polygon is already in image pixels: rasterize it inside the bbox only
+        polygon = None
+        if len(plate_mask.xy) and len(plate_mask.xy[0]) >= 3:
+            polygon = np.round(plate_mask.xy[0]).astype(np.int32)
+            if roi.size:
+                cv2.fillPoly(roi, [polygon - np.array([xi, yi], dtype=np.int32)], 1)
+        elif roi.size:
+            # no polygon: cut the bbox out of the low resolution mask and scale only that part
+            mxi, mxf = int(xi * mask_w / w), max(int(xi * mask_w / w) + 1, int(np.ceil(xf * mask_w / w)))
+            myi, myf = int(yi * mask_h / h), max(int(yi * mask_h / h) + 1, int(np.ceil(yf * mask_h / h)))
+            data = plate_mask.data
+            data = data[0] if data.ndim == 3 else data
+            region = data[myi:myf, mxi:mxf].cpu().numpy()
+            region = cv2.resize(region.astype(np.float32), (roi.shape[1], roi.shape[0]), interpolation=cv2.INTER_NEAREST)
+            roi = (region > 0.5).astype(np.uint8)
+        return cls(roi, bbox, image_shape, area_scale, polygon)
+
+    @property
+    def polygon(self) -> np.ndarray:
+        """Outer contour in image pixels, (n, 2) int32."""
+        if self._polygon is None:
+            contours, _ = cv2.findContours(self.roi, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            if contours:
+                contour = max(contours, key=cv2.contourArea).reshape(-1, 2)
+                self._polygon = contour + np.array(self.bbox[:2], dtype=np.int32)
+            else:
+                self._polygon = np.zeros((0, 2), dtype=np.int32)
+        return self._polygon
+
+    @property
+    def rle(self) -> List[int]:
+        """Row-major run lengths of the ROI, starting with a (possibly empty) run of zeros."""
+        if self._rle is None:
+            flat = self.roi.ravel()
+            changes = np.flatnonzero(np.diff(flat)) + 1
+            bounds = np.concatenate(([0], changes, [flat.size]))
+            runs = np.diff(bounds).tolist()
+            if flat.size and flat[0]:
+                runs.insert(0, 0)
+            self._rle = runs
+        return self._rle
+
+    @classmethod
+    def from_rle(cls, runs: List[int], bbox: List[int], image_shape: Tuple[int, int],
+                 area_scale: float = 1.0) -> 'PlateMask':
+        xi, yi, xf, yf = bbox
+        values = np.arange(len(runs)) % 2
+        roi = np.repeat(values, runs).astype(np.uint8).reshape(yf - yi, xf - xi)
+        return cls(roi, bbox, image_shape, area_scale)
+
+    def crop(self, image: np.ndarray, padding: Tuple[int, int] = (0, 0)) -> np.ndarray:
+        """Plate crop of `image` with everything outside the mask zeroed, grown by `padding` (x, y)."""
+        h, w = image.shape[:2]
+        xi, yi, xf, yf = self.bbox
+        pad_x, pad_y = padding
+        cxi, cyi = max(0, xi - pad_x), max(0, yi - pad_y)
+        cxf, cyf = min(w, xf + pad_x), min(h, yf + pad_y)
+
+        plate = np.zeros((cyf - cyi, cxf - cxi) + image.shape[2:], dtype=np.uint8)
+        roi = self.roi[:yf - yi, :xf - xi]
+        region = image[yi:yi + roi.shape[0], xi:xi + roi.shape[1]]
+        roi = roi[:region.shape[0], :region.shape[1]]
+        masked = region * (roi[..., None] if image.ndim == 3 else roi)
+        plate[yi - cyi:yi - cyi + masked.shape[0], xi - cxi:xi - cxi + masked.shape[1]] = masked
+        return plate
+
+    def overlay(self, image: np.ndarray, offset: Tuple[int, int] = (0, 0), alpha: float = 0.5) -> np.ndarray:
+        """Blends the colormapped mask into `image` in place, with the bbox shifted by `offset` (x, y)."""
+        h, w = image.shape[:2]
+        xi, yi = self.bbox[0] + offset[0], self.bbox[1] + offset[1]
+        x0, y0 = max(0, xi), max(0, yi)
+        x1, y1 = min(w, xi + self.roi.shape[1]), min(h, yi + self.roi.shape[0])
+        if x1 <= x0 or y1 <= y0:
+            return image
+        color_mask = cv2.applyColorMap(self.roi[y0 - yi:y1 - yi, x0 - xi:x1 - xi] * 255, cv2.COLORMAP_INFERNO)
+        region = image[y0:y1, x0:x1]
+        image[y0:y1, x0:x1] = cv2.addWeighted(region, 1, color_mask, alpha, 0)
+        return image
@@ -0,0 +1,53 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+# shape of the dummy frames: the camera resolution the models usually see
+WARMUP_FRAME_SHAPE = (720, 1280, 3)
+
+# runs the model on a dummy image (or list of them) at an inference size, None for the model default
+Inference = Callable[[Any, Optional[int]], Any]
+
+
+class ModelWarmup:
+    """
+    Dummy inferences run while a model loads, so its lazy initialization (predictor setup, layer
+    fusion, kernel selection for each input shape) is paid before the first live frame. Each input
+    size and batch size is run `repeats` times; the model is hot once every shape has run.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.hot = False
+        self.seconds = 0.0
+        self.sizes: List[Optional[int]] = []
+        self.first_call_ms = 0.0
+        self.last_call_ms = 0.0
+
+    def run(self, infer: Inference, sizes: Sequence[Optional[int]],
+            frame_shape: Tuple[int, ...] = WARMUP_FRAME_SHAPE, batch_sizes: Sequence[int] = (1,),
+            repeats: int = 2) -> float:
+        self.hot = False
+        dummy = np.full(tuple(frame_shape), 114, dtype=np.uint8)
+        sizes = list(dict.fromkeys(sizes)) or [None]
+        calls: List[float] = []
+        start = time.perf_counter()
+        for size in sizes:
+            for batch_size in batch_sizes:
+                images = dummy if batch_size == 1 else [dummy] * batch_size
+                for _ in range(max(1, repeats)):
+                    call_start = time.perf_counter()
+                    infer(images, size)
+                    calls.append((time.perf_counter() - call_start) * 1e3)
+        self.seconds = time.perf_counter() - start
+        self.sizes = sizes
+        self.first_call_ms, self.last_call_ms = calls[0], calls[-1]
+        self.hot = True
+        print(f'{self.name}: hot after {self.seconds:.2f} s of warm-up at imgsz '
+              f'{", ".join(str(size or "default") for size in sizes)} '
+              f'(first call {self.first_call_ms:.0f} ms, last {self.last_call_ms:.0f} ms)')
+        return self.seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {'hot': self.hot, 'seconds': self.seconds, 'sizes': self.sizes,
+                'first_call_ms': self.first_call_ms, 'last_call_ms': self.last_call_ms}
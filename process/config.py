@@ -0,0 +1,123 @@
+from typing import Dict, List, Optional
+from pydantic import BaseModel
+
+
+class TrackingConfig(BaseModel):
+    # association
+    iou_threshold: float = 0.3
+    max_missed_frames: int = 15
+    # plate candidates kept per track, ranked by area * sharpness
+    max_candidates: int = 3
+    min_plate_area: int = 1500
+    # ocr scheduling: one read after this many candidates, a second to confirm, then stop
+    candidates_before_ocr: int = 3
+    max_ocr_runs: int = 2
+
+
+class OcrConfig(BaseModel):
+    # engine: 'easyocr' or 'trocr', loaded lazily on the first read
+    engine: str = 'easyocr'
+    device: str = 'cpu'
+    # 'sync' runs ocr inside the frame loop; 'thread' / 'process' use OcrWorkerPool
+    mode: str = 'thread'
+    workers: int = 1
+    max_pending: int = 8
+    # plate crops queued while workers are busy are recognized together
+    batch_size: int = 8
+    # near-duplicate crops reuse cached text; cache_size 0 disables the cache
+    cache_size: int = 256
+    cache_ttl_seconds: float = 300.0
+
+
+class SchedulerConfig(BaseModel):
+    # video frames: vehicle detection runs on one frame out of detect_interval, at detect_imgsz
+    # (None keeps the model's size); tracks keep their boxes on the frames in between. Both are
+    # opt-in: the defaults detect on every frame at the model's size
+    detect_interval: int = 1
+    detect_imgsz: Optional[int] = None
+    # plate segmentation only for unconfirmed tracks, once every segment_interval track updates
+    segment_interval: int = 1
+    segment_imgsz: Optional[int] = None
+
+
+class ResolutionConfig(BaseModel):
+    # vehicle detection size adapted at runtime (ResolutionController) so the detection latency holds
+    # target_fps, or latency_budget_ms when set; disabled keeps scheduler.detect_imgsz
+    enabled: bool = False
+    sizes: List[int] = [320, 416, 480, 640]
+    # None starts at the largest size
+    initial_size: Optional[int] = None
+    target_fps: float = 10.0
+    latency_budget_ms: Optional[float] = None
+    # hysteresis: one size down when the smoothed frame latency exceeds the budget, one size up only
+    # when the larger size is predicted (latency ~ imgsz^2) under up_margin of the budget
+    up_margin: float = 0.8
+    smoothing: float = 0.2
+    min_frames_between_changes: int = 30
+
+
+class ProfilingConfig(BaseModel):
+    # per-stage spans of the frame loop; a disabled profiler costs one check per stage
+    enabled: bool = False
+    # trace events kept per recording window (see StageProfiler.start_recording)
+    max_trace_events: int = 100000
+
+
+class InferenceServerConfig(BaseModel):
+    # local only: every tool on the host shares one copy of each model through this server
+    host: str = '127.0.0.1'
+    port: int = 9120
+    # hosted models, any of 'weapons', 'vehicles', 'plates'
+    models: List[str] = ['weapons', 'vehicles', 'plates']
+    weapon_model_path: Optional[str] = None
+    # concurrent requests of a model are merged into one forward pass of up to max_batch_size
+    # images; the first request of a batch waits at most max_delay_ms for the others
+    max_batch_size: int = 8
+    max_delay_ms: float = 10.0
+    request_timeout_seconds: float = 30.0
+    # models are warmed up (batches of 1 and max_batch_size) before the server accepts requests
+    warmup: bool = True
+
+
+class WarmupConfig(BaseModel):
+    # dummy inferences at every configured size while the models load, so the first live frames
+    # do not pay torch / ultralytics lazy initialization
+    enabled: bool = True
+    frame_shape: List[int] = [720, 1280, 3]
+    repeats: int = 2
+    # sync ocr runs inside the frame loop: its first read is warmed up too
+    ocr: bool = True
+
+
+class ComponentResources(BaseModel):
+    # share of the host cpus in the automatic split
+    weight: float = 1.0
+    # explicit cpu ids instead of a share of the split
+    cpus: Optional[List[int]] = None
+    # intra-op threads (torch); None uses one per cpu of the component
+    threads: Optional[int] = None
+
+
+class ResourceConfig(BaseModel):
+    # pipeline components co-located on the host; each gets its own cpus and thread count
+    components: Dict[str, ComponentResources] = {
+        'capture': ComponentResources(weight=1.0),
+        'weapons': ComponentResources(weight=3.0),
+        'plates': ComponentResources(weight=3.0),
+        'ocr': ComponentResources(weight=1.0),
+    }
+    # cpus to split; None uses every cpu the process may run on
+    cpus: Optional[List[int]] = None
+    # pin each component to its cpus, or only set the thread counts
+    pin: bool = True
+    # opencv's thread pool is process-wide; None sizes it like the capture component
+    opencv_threads: Optional[int] = None
+
+
+class PipelineConfig(BaseModel):
+    tracking: TrackingConfig = TrackingConfig()
+    ocr: OcrConfig = OcrConfig()
+    scheduler: SchedulerConfig = SchedulerConfig()
+    resolution: ResolutionConfig = ResolutionConfig()
+    profiling: ProfilingConfig = ProfilingConfig()
+    warmup: WarmupConfig = WarmupConfig()
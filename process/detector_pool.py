@@ -0,0 +1,125 @@
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from process.ocr_extraction.worker_pool import percentile
+from process.resources import CpuAllocation, ResourceManager, available_cpus, set_intra_op_threads
+from process.roi import RegionOfInterest
+from process.weapon_detection import DetectionParams, WeaponDetector
+
+
+def default_split(replicas: Optional[int] = None, cpu_count: Optional[int] = None) -> Tuple[int, int]:
+    """(replicas, intra-op threads per replica) covering the cores; benchmarks/detector_pool.py finds the best one."""
+    cpu_count = cpu_count or len(available_cpus())
+    replicas = replicas or max(1, cpu_count // 4)
+    return replicas, max(1, cpu_count // replicas)
+
+
+class WeaponDetectorPool:
+    """
+    N WeaponDetector replicas, each owned by its own thread with its own torch intra-op thread
+    count. Frames go through a shared bounded queue, so an idle replica always takes the next one;
+    detection parameters travel with each frame (DetectionParams) instead of living on shared state.
+    With a ResourceManager, the replicas split the cpus of its 'weapons' component and each one is
+    pinned to its share.
+    """
+
+    def __init__(self, replicas: Optional[int] = None, intra_op_threads: Optional[int] = None,
+                 model_path: Optional[str] = None, params: Optional[DetectionParams] = None,
+                 max_pending: Optional[int] = None, resources: Optional[ResourceManager] = None):
+        cpu_count = len(resources.allocation('weapons').cpus) if resources is not None else None
+        self.replicas, default_threads = default_split(replicas, cpu_count)
+        self.intra_op_threads = intra_op_threads or default_threads
+        self.resources = resources
+        self.allocations: List[Optional[CpuAllocation]] = [None] * self.replicas
+        if resources is not None:
+            self.allocations = resources.split('weapons', self.replicas)
+        self.params = params or DetectionParams()
+        # a full queue blocks submit: callers feel the backpressure instead of piling up frames
+        self.jobs: queue.Queue = queue.Queue(max_pending or 2 * self.replicas)
+
+        self.calls = [0] * self.replicas
+        self.busy_seconds = [0.0] * self.replicas
+        self.latency: deque = deque(maxlen=1000)
+        self.started_at = time.perf_counter()
+
+        self.errors: List[Exception] = []
+        self.threads = []
+        loaded = [threading.Event() for _ in range(self.replicas)]
+        for index in range(self.replicas):
+            thread = threading.Thread(target=self._run, args=(index, model_path, loaded[index]),
+                                      name=f'weapon-replica-{index}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        for event in loaded:
+            event.wait()
+        if self.errors:
+            self.shutdown()
+            raise RuntimeError(f'weapon detector replica failed to load: {self.errors[0]}') from self.errors[0]
+
+    def _run(self, index: int, model_path: Optional[str], loaded: threading.Event):
+        try:
+            allocation = self.allocations[index]
+            if allocation is not None:
+                self.resources.apply(allocation=allocation._replace(
+                    threads=min(allocation.threads, self.intra_op_threads)))
+            else:
+                set_intra_op_threads(self.intra_op_threads)
+            # warmed up before `loaded` is set: the pool only returns once every replica is hot
+            detector = WeaponDetector(model_path, warmup=False)
+            detector.warm_up([self.params.imgsz])
+        except Exception as e:
+            self.errors.append(e)
+            loaded.set()
+            return
+        loaded.set()
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            future, frame, roi, params, submitted_at = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            start = time.perf_counter()
+            try:
+                future.set_result(detector.detect_weapons(frame, roi, params))
+            except Exception as e:
+                future.set_exception(e)
+            done_at = time.perf_counter()
+            self.calls[index] += 1
+            self.busy_seconds[index] += done_at - start
+            self.latency.append(done_at - submitted_at)
+
+    def submit(self, frame: np.ndarray, roi: Optional[RegionOfInterest] = None,
+               params: Optional[DetectionParams] = None) -> Future:
+        """Queues the frame; the future resolves to detect_weapons' (results, detections)."""
+        future: Future = Future()
+        self.jobs.put((future, frame, roi, params or self.params, time.perf_counter()))
+        return future
+
+    def detect_weapons(self, frame: np.ndarray, roi: Optional[RegionOfInterest] = None,
+                       params: Optional[DetectionParams] = None):
+        return self.submit(frame, roi, params).result()
+
+    def detect_batch(self, frames: List[np.ndarray], roi: Optional[RegionOfInterest] = None,
+                     params: Optional[DetectionParams] = None) -> List[Tuple[Any, List[dict]]]:
+        # results in frame order, whichever replica ran each frame
+        return [future.result() for future in [self.submit(frame, roi, params) for frame in frames]]
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(1e-9, time.perf_counter() - self.started_at)
+        latency = list(self.latency)
+        return {'replicas': self.replicas, 'intra_op_threads': self.intra_op_threads, 'frames': sum(self.calls),
+                'frames_per_second': sum(self.calls) / elapsed, 'queued': self.jobs.qsize(),
+                'replica_frames': list(self.calls),
+                'replica_utilization': [busy / elapsed for busy in self.busy_seconds],
+                'latency_p50': percentile(latency, 0.50), 'latency_p95': percentile(latency, 0.95)}
+
+    def shutdown(self):
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
@@ -0,0 +1,148 @@
+import time
+import queue
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import List, NamedTuple, Optional, Tuple
+import numpy as np
+
+# the per-slot reference counts sit at the start of the block, the frames after them
+_HEADER_ALIGN = 64
+
+
+class FrameMessage(NamedTuple):
+    """What crosses the process boundary for a frame: the slot it lives in, never the pixels."""
+    slot: int
+    seq: int
+    shape: Tuple[int, ...]
+    captured_at: float
+
+
+class FrameRing:
+    """
+    Fixed-size frame slots in one multiprocessing.shared_memory block. The producer takes a free
+    slot, writes (or decodes) the frame into it and publishes it to its consumers with a reference
+    count; every consumer releases the slot when done and the last release returns it to the free
+    list. Frames never get pickled: only FrameMessage tuples travel through the queues.
+
+    The ring is created in the parent and handed to the child processes as a Process argument;
+    the children attach to the same block by name.
+    """
+
+    def __init__(self, slots: int, frame_shape: Tuple[int, ...], dtype=np.uint8, ctx=None):
+        ctx = ctx or mp.get_context()
+        self.slots = slots
+        self.frame_shape = tuple(frame_shape)
+        self.dtype = np.dtype(dtype)
+        self.slot_bytes = int(np.prod(self.frame_shape)) * self.dtype.itemsize
+        self.header_bytes = -(-slots * 4 // _HEADER_ALIGN) * _HEADER_ALIGN
+        self.shm = shared_memory.SharedMemory(create=True, size=self.header_bytes + slots * self.slot_bytes)
+        self.owner = True
+        self.lock = ctx.Lock()
+        self.free = ctx.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self._attach()
+        self.refcounts[:] = 0
+
+    def _attach(self):
+        self.refcounts = np.ndarray((self.slots,), dtype=np.int32, buffer=self.shm.buf)
+        self.frames = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=self.shm.buf,
+                                 offset=self.header_bytes)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ('shm', 'refcounts', 'frames'):
+            del state[name]
+        state['shm_name'] = self.shm.name
+        state['owner'] = False
+        return state
+
+    def __setstate__(self, state):
+        shm_name = state.pop('shm_name')
+        self.__dict__.update(state)
+        self.shm = shared_memory.SharedMemory(name=shm_name)
+        self._attach()
+
+    def acquire(self, timeout: Optional[float] = 0.0) -> Optional[int]:
+        """A free slot for the producer; None when every slot is still held (the frame is dropped)."""
+        try:
+            if timeout == 0.0:
+                return self.free.get_nowait()
+            return self.free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def discard(self, slot: int):
+        # a slot acquired by the producer but never published
+        self.free.put(slot)
+
+    def view(self, slot: int, shape: Optional[Tuple[int, ...]] = None, writable: bool = False) -> np.ndarray:
+        """The frame stored in `slot` as an array over the shared block (no copy); read-only for consumers."""
+        shape = tuple(shape or self.frame_shape)
+        size = int(np.prod(shape)) * self.dtype.itemsize
+        frame = self.frames[slot, :size].view(self.dtype).reshape(shape)
+        frame.flags.writeable = writable
+        return frame
+
+    def write(self, slot: int, frame: np.ndarray) -> Tuple[int, ...]:
+        self.view(slot, frame.shape, writable=True)[...] = frame
+        return frame.shape
+
+    def publish(self, slot: int, seq: int, shape: Tuple[int, ...], outputs: List, captured_at: Optional[float] = None):
+        if not outputs:
+            self.discard(slot)
+            return
+        with self.lock:
+            self.refcounts[slot] = len(outputs)
+        message = FrameMessage(slot, seq, tuple(shape), time.time() if captured_at is None else captured_at)
+        for output in outputs:
+            output.put(message)
+
+    def release(self, slot: int):
+        with self.lock:
+            self.refcounts[slot] -= 1
+            last = self.refcounts[slot] <= 0
+        if last:
+            self.free.put(slot)
+
+    def in_use(self) -> int:
+        with self.lock:
+            return int(np.count_nonzero(self.refcounts))
+
+    def close(self):
+        # arrays over the buffer must go before the block can be closed
+        self.refcounts = self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+class FrameSubscriber:
+    """Consumer side of a ring: one queue of FrameMessages per consumer process."""
+
+    def __init__(self, ring: FrameRing, inbox):
+        self.ring = ring
+        self.inbox = inbox
+        self.skipped = 0
+
+    def get(self, timeout: Optional[float] = None, latest: bool = False) -> Optional[FrameMessage]:
+        """
+        Next frame message, None when the producer finished. With `latest`, frames that queued up
+        while this consumer was busy are released unprocessed and only the newest one is returned.
+        """
+        message = self.inbox.get(timeout=timeout)
+        while latest and message is not None:
+            try:
+                newer = self.inbox.get_nowait()
+            except queue.Empty:
+                break
+            self.ring.release(message.slot)
+            self.skipped += 1
+            message = newer
+        return message
+
+    def frame(self, message: FrameMessage) -> np.ndarray:
+        return self.ring.view(message.slot, message.shape)
+
+    def release(self, message: FrameMessage):
+        self.ring.release(message.slot)
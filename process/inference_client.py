@@ -0,0 +1,86 @@
+import json
+import threading
+import http.client
+from typing import Any, Dict, Optional, Sequence
+from urllib.parse import urlencode
+import cv2
+import numpy as np
+from process.inference_server import SHAPE_HEADER
+
+
+class InferenceClient:
+    """
+    Client of the local InferenceServer. Every calling thread keeps its own keep-alive connection,
+    so one client can be shared by the threads of an app. Frames go as raw pixels by default (no
+    encoding cost on the same host); encoding='.jpg' sends them compressed.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 9120, timeout: float = 30.0, encoding: str = 'raw'):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.encoding = encoding
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return connection
+
+    def _request(self, method: str, path: str, body: Optional[bytes] = None,
+                 headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        # a connection the server closed while idle is reopened once
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, body, headers or {})
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+        payload = json.loads(data)
+        if response.status != 200:
+            raise RuntimeError(f'inference server {method} {path}: {response.status} {payload.get("error", "")}')
+        return payload
+
+    def _post_frame(self, model: str, frame: np.ndarray, **query) -> Dict[str, Any]:
+        query = {name: value for name, value in query.items() if value is not None}
+        path = f'/{model}' + (f'?{urlencode(query)}' if query else '')
+        if self.encoding == 'raw':
+            frame = np.ascontiguousarray(frame, dtype=np.uint8)
+            headers = {'Content-Type': 'application/octet-stream', SHAPE_HEADER: ','.join(map(str, frame.shape))}
+            return self._request('POST', path, frame.tobytes(), headers)
+        ok, encoded = cv2.imencode(self.encoding, frame)
+        if not ok:
+            raise ValueError(f'cannot encode the frame as {self.encoding}')
+        content_type = 'image/png' if self.encoding == '.png' else 'image/jpeg'
+        return self._request('POST', path, encoded.tobytes(), {'Content-Type': content_type})
+
+    def detect_weapons(self, frame: np.ndarray, confidence: Optional[float] = None, imgsz: Optional[int] = None,
+                       weapon_classes: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """{'timestamp', 'detections', 'total_weapons'}, the metadata WeaponDetector.save_detection writes."""
+        classes = ','.join(weapon_classes) if weapon_classes else None
+        return self._post_frame('weapons', frame, conf=confidence, imgsz=imgsz, classes=classes)
+
+    def detect_vehicles(self, frame: np.ndarray, imgsz: Optional[int] = None) -> Dict[str, Any]:
+        return self._post_frame('vehicles', frame, imgsz=imgsz)
+
+    def segment_plates(self, vehicle_crop: np.ndarray, imgsz: Optional[int] = None) -> Dict[str, Any]:
+        return self._post_frame('plates', vehicle_crop, imgsz=imgsz)
+
+    def health(self) -> Dict[str, Any]:
+        return self._request('GET', '/health')
+
+    def stats(self) -> Dict[str, Any]:
+        return self._request('GET', '/stats')
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
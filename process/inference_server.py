@@ -0,0 +1,325 @@
+import json
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from urllib.parse import parse_qs, urlparse
+import cv2
+import numpy as np
+from process.config import InferenceServerConfig
+from process.metrics import MetricsRegistry, queue_depth, register_process_metrics
+from process.profiling import LatencyHistogram
+
+MODELS = ('weapons', 'vehicles', 'plates')
+
+# raw frames (application/octet-stream) carry their shape in this header, e.g. "720,1280,3"
+SHAPE_HEADER = 'X-Frame-Shape'
+
+# runs the images of one batch with their shared parameters: one list of detection dicts per image
+BatchRunner = Callable[[List[np.ndarray], Hashable], List[List[dict]]]
+
+
+class MicroBatcher:
+    """
+    Merges the concurrent requests of one model into batches run by a single thread. The oldest
+    waiting request opens a batch and waits at most max_delay for others to join, so a lone client
+    pays max_delay at worst and a busy server runs full batches. Requests with different parameters
+    in the same batch are run as separate forward passes.
+    """
+
+    def __init__(self, name: str, run_batch: BatchRunner, max_batch_size: int = 8, max_delay: float = 0.01):
+        self.name = name
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay = max_delay
+        self.jobs: queue.Queue = queue.Queue()
+
+        # written by the batch thread only
+        self.requests = 0
+        self.batches = 0
+        self.batch_sizes: deque = deque(maxlen=1000)
+        self.latency = LatencyHistogram()
+
+        self.thread = threading.Thread(target=self._run, name=f'batcher-{name}', daemon=True)
+        self.thread.start()
+
+    def register_metrics(self, registry: MetricsRegistry):
+        self.latency = registry.histogram('inference_request_latency_seconds',
+                                          'Time from request arrival to its detections, queueing included',
+                                          model=self.name)
+        registry.counter_function('inference_requests_total', 'Images run by the server', lambda: self.requests,
+                                  model=self.name)
+        registry.counter_function('inference_batches_total', 'Forward passes run by the server',
+                                  lambda: self.batches, model=self.name)
+        queue_depth(registry, 'inference_server', self.name, self.pending)
+
+    def submit(self, image: np.ndarray, params: Hashable = None) -> Future:
+        """Queues one image; the future resolves to its list of detections."""
+        future: Future = Future()
+        self.jobs.put((future, image, params, time.perf_counter()))
+        return future
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            batch = [job]
+            deadline = job[3] + self.max_delay
+            while len(batch) < self.max_batch_size:
+                # past the deadline, requests that are already waiting still join the batch
+                remaining = deadline - time.perf_counter()
+                try:
+                    job = self.jobs.get(timeout=remaining) if remaining > 0 else self.jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    self.jobs.put(None)
+                    break
+                batch.append(job)
+            self._run_jobs(batch)
+
+    def _run_jobs(self, batch: list):
+        groups: Dict[Hashable, list] = {}
+        for job in batch:
+            if job[0].set_running_or_notify_cancel():
+                groups.setdefault(job[2], []).append(job)
+
+        for params, jobs in groups.items():
+            try:
+                results = self.run_batch([job[1] for job in jobs], params)
+            except Exception as e:
+                for job in jobs:
+                    job[0].set_exception(e)
+            else:
+                for job, detections in zip(jobs, results):
+                    job[0].set_result(detections)
+            done_at = time.perf_counter()
+            for job in jobs:
+                self.latency.add((done_at - job[3]) * 1e3)
+            self.requests += len(jobs)
+            self.batches += 1
+            self.batch_sizes.append(len(jobs))
+
+    def pending(self) -> int:
+        return self.jobs.qsize()
+
+    def stats(self) -> Dict[str, Any]:
+        sizes = list(self.batch_sizes)
+        return {'requests': self.requests, 'batches': self.batches, 'queued': self.pending(),
+                'mean_batch_size': sum(sizes) / len(sizes) if sizes else 0.0,
+                'max_batch_size': max(sizes, default=0),
+                'latency_p50_ms': self.latency.percentile(0.50), 'latency_p95_ms': self.latency.percentile(0.95)}
+
+    def stop(self):
+        self.jobs.put(None)
+        self.thread.join()
+
+
+def weapon_runner(detector) -> BatchRunner:
+    def run(images: List[np.ndarray], params) -> List[List[dict]]:
+        return [detections for _, detections in detector.detect_weapons_batch(images, params)]
+    return run
+
+
+def vehicle_runner(detection) -> BatchRunner:
+    def run(images: List[np.ndarray], imgsz: Optional[int]) -> List[List[dict]]:
+        checks = detection.check_vehicles(images, imgsz)
+        return [[{'bbox': bbox, 'confidence': conf, 'class_name': vehicle_type}
+                 for bbox, vehicle_type, conf in detection.extract_detections_info(image, results)]
+                for image, (_, results) in zip(images, checks)]
+    return run
+
+
+def plate_runner(segmentation) -> BatchRunner:
+    def run(images: List[np.ndarray], imgsz: Optional[int]) -> List[List[dict]]:
+        plates = []
+        for image, (found, results) in zip(images, segmentation.check_vehicle_plates(images, imgsz)):
+            if not found:
+                plates.append([])
+                continue
+            plate_mask, bbox, conf = segmentation.extract_plate_info(image, results)
+            plates.append([{'bbox': bbox, 'confidence': round(float(conf), 2), 'class_name': 'plate',
+                            'mask_area': int(plate_mask.area)}])
+        return plates
+    return run
+
+
+def inference_response(model: str, detections: List[dict]) -> Dict[str, Any]:
+    """Weapons answer with the metadata save_detection writes; the other models use the same layout."""
+    if model == 'weapons':
+        from process.weapon_detection import detection_metadata
+        return detection_metadata(detections)
+    return {'timestamp': datetime.now().isoformat(), 'detections': detections, f'total_{model}': len(detections)}
+
+
+def decode_image(body: bytes, content_type: str, shape: Optional[str]) -> np.ndarray:
+    """A BGR image from a request body: raw pixels with their shape, or an encoded jpg / png."""
+    buffer = np.frombuffer(body, dtype=np.uint8)
+    if content_type == 'application/octet-stream':
+        if not shape:
+            raise ValueError(f'raw frames need the {SHAPE_HEADER} header')
+        dims = tuple(int(value) for value in shape.split(','))
+        if int(np.prod(dims)) != buffer.size:
+            raise ValueError(f'{buffer.size} bytes do not hold a frame of shape {dims}')
+        return buffer.reshape(dims)
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError('the body is not a decodable image')
+    return image
+
+
+class InferenceServer:
+    """
+    Local HTTP server sharing one copy of each model among every tool of the host.
+
+        POST /weapons?conf=0.5&imgsz=640   POST /vehicles?imgsz=480   POST /plates
+        GET /health   GET /stats   GET /metrics
+
+    Images are posted as jpg / png, or as raw BGR pixels (application/octet-stream plus the
+    X-Frame-Shape header). Each model has its own MicroBatcher; process.inference_client wraps the API.
+    """
+
+    def __init__(self, config: Optional[InferenceServerConfig] = None, registry: Optional[MetricsRegistry] = None):
+        self.config = config or InferenceServerConfig()
+        self.registry = registry or MetricsRegistry()
+        self.batchers: Dict[str, MicroBatcher] = {}
+        # model wrappers by name, for their warm-up state
+        self.models: Dict[str, Any] = {}
+        self.weapon_detector = None
+        self.httpd: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+        register_process_metrics(self.registry)
+
+    def add_model(self, name: str, run_batch: BatchRunner) -> MicroBatcher:
+        batcher = MicroBatcher(name, run_batch, self.config.max_batch_size, self.config.max_delay_ms / 1e3)
+        batcher.register_metrics(self.registry)
+        self.batchers[name] = batcher
+        return batcher
+
+    def load_models(self):
+        for name in self.config.models:
+            if name not in MODELS:
+                raise ValueError(f'unknown model: {name} (expected one of {", ".join(MODELS)})')
+        if 'weapons' in self.config.models:
+            from process.weapon_detection import WeaponDetector
+            self.weapon_detector = self.models['weapons'] = WeaponDetector(self.config.weapon_model_path,
+                                                                           warmup=False)
+            self.add_model('weapons', weapon_runner(self.weapon_detector))
+        if 'vehicles' in self.config.models:
+            from process.computer_vision_models.main import VehicleDetection
+            self.models['vehicles'] = VehicleDetection()
+            self.add_model('vehicles', vehicle_runner(self.models['vehicles']))
+        if 'plates' in self.config.models:
+            from process.computer_vision_models.main import PlateSegmentation
+            self.models['plates'] = PlateSegmentation()
+            self.add_model('plates', plate_runner(self.models['plates']))
+        if self.config.warmup:
+            self.warm_up()
+
+    def warm_up(self):
+        # the sizes clients ask for are unknown: the models' default size, alone and in full batches
+        batch_sizes = sorted({1, self.config.max_batch_size})
+        for model in self.models.values():
+            model.warm_up([None], batch_sizes=batch_sizes)
+
+    def is_hot(self) -> Dict[str, bool]:
+        return {name: model.is_hot for name, model in self.models.items()}
+
+    def request_params(self, model: str, query: Dict[str, List[str]]) -> Hashable:
+        # hashable parameters: requests with equal ones share a forward pass
+        imgsz = int(query['imgsz'][0]) if 'imgsz' in query else None
+        if model != 'weapons':
+            return imgsz
+        params = self.weapon_detector.params._replace(imgsz=imgsz)
+        if 'conf' in query:
+            params = params._replace(confidence_threshold=float(query['conf'][0]))
+        if 'classes' in query:
+            params = params._replace(weapon_classes=tuple(query['classes'][0].split(',')))
+        return params
+
+    def detect(self, model: str, image: np.ndarray, params: Hashable = None) -> Dict[str, Any]:
+        detections = self.batchers[model].submit(image, params).result(self.config.request_timeout_seconds)
+        return inference_response(model, detections)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: batcher.stats() for name, batcher in self.batchers.items()}
+
+    def start(self) -> 'InferenceServer':
+        if not self.batchers:
+            self.load_models()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive: a client reuses its connection for every request; headers and body go out
+            # in separate writes, which nagle would hold back until the client's delayed ack
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                path = urlparse(self.path).path
+                if path == '/metrics':
+                    self._send(200, server.registry.render().encode('utf-8'), 'text/plain; version=0.0.4')
+                elif path == '/health':
+                    hot = server.is_hot()
+                    self._send_json(200, {'status': 'ok' if all(hot.values()) else 'warming',
+                                          'models': list(server.batchers), 'hot': hot})
+                elif path == '/stats':
+                    self._send_json(200, server.stats())
+                else:
+                    self._send_json(404, {'error': f'unknown path {path}'})
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                model = url.path.strip('/')
+                if model not in server.batchers:
+                    self._send_json(404, {'error': f'model not served: {model}'})
+                    return
+                try:
+                    image = decode_image(body, self.headers.get_content_type(), self.headers.get(SHAPE_HEADER))
+                    params = server.request_params(model, parse_qs(url.query))
+                except ValueError as e:
+                    self._send_json(400, {'error': str(e)})
+                    return
+                try:
+                    self._send_json(200, server.detect(model, image, params))
+                except FutureTimeout:
+                    self._send_json(504, {'error': f'{model} did not answer in time'})
+                except Exception as e:
+                    self._send_json(500, {'error': f'{type(e).__name__}: {e}'})
+
+            def _send_json(self, status: int, payload: Any):
+                self._send(status, json.dumps(payload).encode('utf-8'), 'application/json')
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((self.config.host, self.config.port), Handler)
+        self.httpd.daemon_threads = True
+        self.config.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='inference-server', daemon=True)
+        self.thread.start()
+        print(f'inference server on http://{self.config.host}:{self.config.port} '
+              f'({", ".join(self.batchers)}; batches of {self.config.max_batch_size}, '
+              f'{self.config.max_delay_ms:g} ms max delay)')
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+        for batcher in self.batchers.values():
+            batcher.stop()
@@ -1,89 +1,435 @@
+import time
 import numpy as np
 import cv2
+from typing import Any, Dict, List, Optional, Tuple
 from process.computer_vision_models.main import (VehicleDetection, PlateSegmentation)
 from process.ocr_extraction.main import TextExtraction
+from process.config import PipelineConfig
+from process.tracking import Track, VehicleTracker
+from process.ocr_extraction.worker_pool import OcrWorkerPool
+from process.ocr_extraction.cache import OcrResultCache
+from process.roi import RegionOfInterest, shift_bbox
+from process.scheduler import StageScheduler
+from process.profiling import StageProfiler
+from process.metrics import (FrameRate, MetricsRegistry, model_memory, model_warmup, queue_depth, resolution_metrics,
+                             stage_latency)
+from process.computer_vision_models.warmup import ModelWarmup
+from process.resolution import ResolutionController
+from process.resources import ResourceManager
 
 
 class PlateRecognition:
-    def __init__(self):
+    def __init__(self, config: Optional[PipelineConfig] = None, roi: Optional[RegionOfInterest] = None,
+                 resources: Optional[ResourceManager] = None):
+        self.config = config or PipelineConfig()
+        # vehicles are only detected inside the roi of this source; None processes the whole frame
+        self.roi = roi
         self.model_detect = VehicleDetection()
         self.model_segmentation = PlateSegmentation()
-        self.process_text_extraction = TextExtraction()
+        self.process_text_extraction = TextExtraction(self.config.ocr.engine, self.config.ocr.device)
+        self.tracker = VehicleTracker(self.config.tracking)
+        self.scheduler = StageScheduler(self.config.scheduler)
+        self.profiler = StageProfiler(self.config.profiling.enabled, self.config.profiling.max_trace_events)
+        # vehicle detection size adapted to the frame latency; None keeps scheduler.detect_imgsz
+        self.resolution: Optional[ResolutionController] = None
+        if self.config.resolution.enabled:
+            self.resolution = ResolutionController(self.config.resolution, 'vehicle_detection')
+        self.ocr_pool: Optional[OcrWorkerPool] = None
+        if self.config.ocr.mode != 'sync':
+            self.ocr_pool = OcrWorkerPool(self.config.ocr.mode, self.config.ocr.workers, self.config.ocr.max_pending,
+                                          self.config.ocr.batch_size, self.config.ocr.engine, self.config.ocr.device,
+                                          resources)
+        self.ocr_cache: Optional[OcrResultCache] = None
+        if self.config.ocr.cache_size > 0:
+            self.ocr_cache = OcrResultCache(self.config.ocr.cache_size, self.config.ocr.cache_ttl_seconds)
         self.license_plate = ''
+        self.frame_rate: Optional[FrameRate] = None
+        self.ocr_warmup: Optional[ModelWarmup] = None
+        if self.config.warmup.enabled:
+            self.warm_up()
+
+    @property
+    def is_hot(self) -> bool:
+        # frames processed before this pay the models' lazy initialization
+        return self.model_detect.is_hot and self.model_segmentation.is_hot and \
+            (self.ocr_warmup is None or self.ocr_warmup.hot)
+
+    def warm_up(self) -> float:
+        warmup = self.config.warmup
+        frame_shape = tuple(warmup.frame_shape)
+        detect_sizes = self.resolution.sizes if self.resolution is not None else [self.config.scheduler.detect_imgsz]
+        seconds = self.model_detect.warm_up(detect_sizes, frame_shape, repeats=warmup.repeats)
+        # segmentation sees vehicle crops, not whole frames
+        crop_shape = (frame_shape[0] // 2, frame_shape[1] // 3, 3)
+        seconds += self.model_segmentation.warm_up([self.config.scheduler.segment_imgsz], crop_shape,
+                                                   repeats=warmup.repeats)
+        if warmup.ocr and self.ocr_pool is None:
+            self.ocr_warmup = ModelWarmup('ocr')
+            plate = np.full((60, 200, 3), 255, dtype=np.uint8)
+            cv2.putText(plate, 'ABC123', (10, 45), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+            seconds += self.ocr_warmup.run(lambda images, imgsz: self.process_text_extraction.text_extraction(
+                self.process_text_extraction.image_contrast(plate)), [None], (1, 1, 3), repeats=1)
+        return seconds
+
+    def register_metrics(self, registry: MetricsRegistry, source: str):
+        # the stage latency histograms are the profiler's, so registering switches it on
+        stage_latency(registry, source, self.profiler)
+        self.frame_rate = registry.frame_rate(source)
+        registry.counter_function('pipeline_detection_frames_total', 'Frames vehicle detection ran on',
+                                  lambda: self.scheduler.stage_frames['detection'], source=source)
+        registry.gauge_function('vehicle_tracks', 'Vehicle tracks alive', lambda: len(self.tracker.tracks),
+                                source=source)
+        if self.ocr_pool is not None:
+            pool = self.ocr_pool
+            queue_depth(registry, source, 'ocr', pool.pending)
+            registry.counter_function('ocr_dropped_total', 'Plate crops dropped because the ocr queue was full',
+                                      lambda: pool.dropped, source=source)
+        model_memory(registry, source, 'vehicle_detection', self.model_detect.detection_model)
+        model_warmup(registry, source, 'vehicle_detection', self.model_detect.warmup)
+        model_warmup(registry, source, 'plate_segmentation', self.model_segmentation.warmup)
+        if self.resolution is not None:
+            self.resolution.name = f'{source} vehicle_detection'
+            resolution_metrics(registry, source, 'vehicle_detection', self.resolution)
+        model_memory(registry, source, 'plate_segmentation', self.model_segmentation.segmentation_model)
+
+    def close(self):
+        if self.ocr_pool is not None:
+            self.ocr_pool.shutdown()
+
+    def apply_ocr_results(self) -> List[Track]:
+        # votes from finished async ocr jobs are applied here, on the frame loop thread
+        if self.ocr_pool is None:
+            return []
+        updated = []
+        with self.profiler.span('ocr_results'):
+            for (track, thumbnail, key), text in self.ocr_pool.poll():
+                if self.ocr_cache is not None:
+                    self.ocr_cache.store(thumbnail, key, text, owner=track.track_id)
+                track.add_vote(text)
+                updated.append(track)
+        return updated
 
     def process_static_image(self, image_path: str, draw: bool):
         # Step 1: Load the image
         plate_image = cv2.imread(image_path)
         return self.process_vehicular_plate(plate_image, dynamic_image=False, draw=draw)
 
+    def roi_image(self, vehicle_image: np.ndarray) -> Tuple[np.ndarray, Tuple[int, int]]:
+        if self.roi is None:
+            return vehicle_image, (0, 0)
+        return self.roi.crop(vehicle_image)
+
+    def run_frame(self, process, vehicle_image: np.ndarray, dynamic_image: bool, draw: bool):
+        if self.frame_rate is not None:
+            self.frame_rate.tick()
+        with self.profiler.span('frame'):
+            return process(vehicle_image, dynamic_image, draw)
+
     def process_vehicular_plate(self, vehicle_image: np.ndarray, dynamic_image: bool, draw: bool):
-        # step 1: check vehicle
-        check_vehicle, info_vehicle, clean_image = self.model_detect.check_vehicle(vehicle_image)
+        return self.run_frame(self._process_vehicular_plate, vehicle_image, dynamic_image, draw)
+
+    def _process_vehicular_plate(self, vehicle_image: np.ndarray, dynamic_image: bool, draw: bool):
+        for track in self.apply_ocr_results():
+            if track.license_plate:
+                self.license_plate = track.license_plate
+
+        if not self.scheduler.start_frame(dynamic_image):
+            return vehicle_image, self.license_plate, 'vehicle detection skipped on this frame'
+
+        # step 1: check vehicle, inside the roi bounding box only
+        detect_image, offset = self.roi_image(vehicle_image)
+        check_vehicle, info_vehicle, clean_image = self.detect_vehicles(detect_image, dynamic_image)
 
         if check_vehicle is False:
+            self.empty_frame(dynamic_image)
             return vehicle_image, self.license_plate, 'no vehicle detected'
 
         # step 2: extract info
-        vehicle_bbox, vehicle_type, vehicle_conf = self.model_detect.extract_detection_info(vehicle_image, info_vehicle)
+        with self.profiler.span('extract_info'):
+            vehicle_bbox, vehicle_type, vehicle_conf = self.model_detect.extract_detection_info(detect_image,
+                                                                                                info_vehicle)
+            vehicle_bbox = shift_bbox(vehicle_bbox, offset)
+        if self.roi is not None and not self.roi.contains(vehicle_image.shape, vehicle_bbox):
+            self.empty_frame(dynamic_image)
+            return vehicle_image, self.license_plate, 'no vehicle detected'
+        track = None
+        if dynamic_image:
+            with self.profiler.span('tracking'):
+                (track,), lost_tracks = self.tracker.update([(vehicle_bbox, vehicle_type, vehicle_conf)])
+            self.finish_lost_tracks(lost_tracks)
 
         # step 3: draw detect (optional)
         if draw:
-            vehicle_image = self.model_detect.draw_vehicle_detection(vehicle_image, vehicle_bbox, vehicle_type,vehicle_conf)
+            with self.profiler.span('draw_detection'):
+                vehicle_image = self.model_detect.draw_vehicle_detection(vehicle_image, vehicle_bbox, vehicle_type,
+                                                                         vehicle_conf)
+        # plates already confirmed for this vehicle are not segmented again
+        if not self.scheduler.needs_segmentation(track):
+            return vehicle_image, track.license_plate, 'vehicle detected and plate already read'
+
         # step 4: crop vehicle
-        image_vehicle_crop = self.model_detect.image_vehicle_crop(vehicle_image, vehicle_bbox)
+        with self.profiler.span('vehicle_crop'):
+            image_vehicle_crop = self.model_detect.image_vehicle_crop(vehicle_image, vehicle_bbox)
 
         # step 5: plate segmentation
-        check_plate, info_plate = self.model_segmentation.check_vehicle_plate(image_vehicle_crop)
+        self.scheduler.ran('segmentation')
+        with self.profiler.span('segmentation'):
+            check_plate, info_plate = self.model_segmentation.check_vehicle_plate(image_vehicle_crop,
+                                                                                  self.config.scheduler.segment_imgsz)
 
         if check_plate is False:
             return vehicle_image, self.license_plate, 'vehicle detected but no plate detected'
 
-        # step 6: extract plate info
-        plate_mask, plate_bbox, plate_conf = self.model_segmentation.extract_plate_info(image_vehicle_crop, info_plate)
+        vehicle_image, license_plate, info = self.read_vehicle_plate(vehicle_image, image_vehicle_crop, info_plate,
+                                                                     vehicle_bbox, track, draw)
+        if license_plate:
+            self.license_plate = license_plate
+        return vehicle_image, self.license_plate, info
 
-        # step 7: draw segmentation (optional)
-        if draw:
-            vehicle_image = self.model_segmentation.draw_plate_segmentation(vehicle_image, plate_mask, vehicle_bbox)
+    def process_vehicular_plates(self, vehicle_image: np.ndarray, dynamic_image: bool,
+                                 draw: bool) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        return self.run_frame(self._process_vehicular_plates, vehicle_image, dynamic_image, draw)
 
-        if dynamic_image:
-            # step 8:
-            plate_area = self.model_segmentation.calculate_mask_area(plate_mask)
+    def _process_vehicular_plates(self, vehicle_image: np.ndarray, dynamic_image: bool,
+                                  draw: bool) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        updated_tracks = self.apply_ocr_results()
 
-            if 6500 > plate_area > 6000:
-                # step 9: process mask
-                processed_mask_image = self.model_segmentation.mask_processing(image_vehicle_crop, plate_mask)
+        if not self.scheduler.start_frame(dynamic_image):
+            # between detection frames the tracks keep their last boxes
+            if draw:
+                vehicle_image = self.draw_tracks(vehicle_image)
+            return vehicle_image, self.track_results(updated_tracks, [])
 
-                if processed_mask_image is None or processed_mask_image.size == 0:
-                    return vehicle_image, self.license_plate, 'error: processed mask image is empty'
+        # step 1: check vehicle, inside the roi bounding box only
+        detect_image, offset = self.roi_image(vehicle_image)
+        check_vehicle, info_vehicle, clean_image = self.detect_vehicles(detect_image, dynamic_image)
 
-                # step 10: crop plate
-                image_plate_crop = self.model_segmentation.image_plate_crop(processed_mask_image, plate_bbox)
+        if check_vehicle is False:
+            return vehicle_image, self.track_results(updated_tracks + self.empty_frame(dynamic_image), [])
 
-                if image_plate_crop is None or image_plate_crop.size == 0:
-                    return vehicle_image, self.license_plate, 'error: image_plate_crop is empty'
+        # step 2: extract info of every qualifying vehicle inside the roi polygon
+        with self.profiler.span('extract_info'):
+            local_vehicles = self.model_detect.extract_detections_info(detect_image, info_vehicle)
+            if self.roi is not None:
+                local_vehicles = [vehicle for vehicle in local_vehicles
+                                  if self.roi.contains(vehicle_image.shape, shift_bbox(vehicle[0], offset))]
+            vehicles = [(shift_bbox(bbox, offset), vehicle_type, conf) for bbox, vehicle_type, conf in local_vehicles]
+        tracks: List[Optional[Track]] = [None] * len(vehicles)
+        lost_tracks: List[Track] = []
+        if dynamic_image:
+            with self.profiler.span('tracking'):
+                tracks, lost_tracks = self.tracker.update(vehicles)
+
+        # step 3: crop the vehicles that still need a plate from the clean roi image, so drawn boxes
+        # never reach the plate models
+        pending = [i for i, track in enumerate(tracks) if self.scheduler.needs_segmentation(track)]
+        with self.profiler.span('vehicle_crop'):
+            vehicle_crops = [self.model_detect.image_vehicle_crop(clean_image, local_vehicles[i][0]) for i in pending]
 
-                # step 11: contrast plate
-                image_plate_contrasted = self.process_text_extraction.image_contrast(image_plate_crop)
+        # step 4: draw detect (optional)
+        if draw:
+            with self.profiler.span('draw_detection'):
+                if self.roi is not None:
+                    vehicle_image = self.roi.draw(vehicle_image)
+                for vehicle_bbox, vehicle_type, vehicle_conf in vehicles:
+                    vehicle_image = self.model_detect.draw_vehicle_detection(vehicle_image, vehicle_bbox,
+                                                                             vehicle_type, vehicle_conf)
 
-                # step 12: text extraction
-                self.license_plate = self.process_text_extraction.text_extraction(image_plate_contrasted)
+        # step 5: plate segmentation over the whole batch of pending crops
+        if vehicle_crops:
+            self.scheduler.ran('segmentation')
+        with self.profiler.span('segmentation'):
+            plate_checks = dict(zip(pending, zip(vehicle_crops, self.model_segmentation.check_vehicle_plates(
+                vehicle_crops, self.config.scheduler.segment_imgsz))))
 
-                return vehicle_image, self.license_plate, f'vehicle detected and plate detected'
+        results: List[Dict[str, Any]] = []
+        for i, ((vehicle_bbox, vehicle_type, vehicle_conf), track) in enumerate(zip(vehicles, tracks)):
+            result = {'vehicle_bbox': vehicle_bbox, 'vehicle_type': vehicle_type, 'vehicle_conf': vehicle_conf,
+                      'track_id': track.track_id if track else None,
+                      'license_plate': track.license_plate if track else '',
+                      'vehicle_crop': track.vehicle_crop if track else None,
+                      'info': 'vehicle detected but no plate detected'}
+            if i not in plate_checks:
+                result['info'] = 'vehicle detected and plate already read'
             else:
-                return vehicle_image, self.license_plate, f'vehicle detected and plate detected but is small'
-        else:
-            # step 8: process mask
-            processed_mask_image = self.model_segmentation.mask_processing(image_vehicle_crop, plate_mask)
+                image_vehicle_crop, (check_plate, info_plate) = plate_checks[i]
+                if check_plate:
+                    vehicle_image, license_plate, result['info'] = self.read_vehicle_plate(
+                        vehicle_image, image_vehicle_crop, info_plate, vehicle_bbox, track, draw)
+                    result['license_plate'] = license_plate or result['license_plate']
+            results.append(result)
+
+        finished_tracks = self.finish_lost_tracks(lost_tracks)
+        return vehicle_image, results + self.track_results(updated_tracks + finished_tracks, tracks)
 
-            # step 9: crop plate
-            image_plate_crop = self.model_segmentation.image_plate_crop(processed_mask_image, plate_bbox)
+    def empty_frame(self, dynamic_image: bool) -> List[Track]:
+        # a detection frame without vehicles still ages the tracks, so the ones that left get finished
+        if not dynamic_image:
+            return []
+        with self.profiler.span('tracking'):
+            _, lost_tracks = self.tracker.update([])
+        return self.finish_lost_tracks(lost_tracks)
 
-            # step 10: contrast plate
+    def finish_lost_tracks(self, lost_tracks: List[Track]) -> List[Track]:
+        # vehicles that left the scene before their plate was read get one read of their best crop
+        finished_tracks = []
+        for track in lost_tracks:
+            if track.ocr_runs == 0 and track.candidates:
+                self.read_track_candidate(track)
+                finished_tracks.append(track)
+                if track.license_plate:
+                    self.license_plate = track.license_plate
+        return finished_tracks
+
+    def detect_vehicles(self, detect_image: np.ndarray, dynamic_image: bool) -> Tuple[bool, Any, np.ndarray]:
+        self.scheduler.ran('detection')
+        start = time.perf_counter()
+        with self.profiler.span('detection'):
+            result = self.model_detect.check_vehicle(detect_image, self.detect_imgsz())
+        # only the detection span: segmentation, ocr and drawing do not depend on the detection size
+        if self.resolution is not None and dynamic_image:
+            self.resolution.observe(time.perf_counter() - start)
+        return result
+
+    def detect_imgsz(self) -> Optional[int]:
+        if self.resolution is not None:
+            return self.resolution.imgsz
+        return self.config.scheduler.detect_imgsz
+
+    def draw_tracks(self, vehicle_image: np.ndarray) -> np.ndarray:
+        if self.roi is not None:
+            vehicle_image = self.roi.draw(vehicle_image)
+        for track in self.tracker.tracks:
+            if track.missed == 0:
+                vehicle_image = self.model_detect.draw_vehicle_detection(vehicle_image, track.bbox, track.vehicle_type,
+                                                                         track.conf)
+        return vehicle_image
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        stats: Dict[str, Dict[str, Any]] = {'scheduler': self.scheduler.stats()}
+        if self.profiler.histograms:
+            stats['stages'] = self.profiler.stats()
+        if self.resolution is not None:
+            stats['resolution'] = self.resolution.stats()
+        if self.ocr_pool is not None:
+            stats['ocr_pool'] = self.ocr_pool.stats()
+        if self.ocr_cache is not None:
+            stats['ocr_cache'] = self.ocr_cache.stats()
+        stats['warmup'] = {'vehicle_detection': self.model_detect.warmup.stats(),
+                           'plate_segmentation': self.model_segmentation.warmup.stats()}
+        if self.ocr_warmup is not None:
+            stats['warmup']['ocr'] = self.ocr_warmup.stats()
+        return stats
+
+    def track_results(self, tracks: List[Track], frame_tracks: List[Optional[Track]]) -> List[Dict[str, Any]]:
+        # plates resolved for vehicles that are not part of the current frame's results
+        results = []
+        for track in tracks:
+            if track in frame_tracks or not track.license_plate:
+                continue
+            results.append({'vehicle_bbox': track.bbox, 'vehicle_type': track.vehicle_type, 'vehicle_conf': None,
+                            'track_id': track.track_id, 'license_plate': track.license_plate,
+                            'vehicle_crop': track.vehicle_crop,
+                            'info': 'plate read from the best frame of the track'})
+        return results
+
+    def read_track_candidate(self, track: Track):
+        image_plate_crop = track.take_ocr_candidate()
+        if image_plate_crop is None:
+            return
+        with self.profiler.span('ocr'):
+            self._read_track_candidate(track, image_plate_crop)
+
+    def _read_track_candidate(self, track: Track, image_plate_crop: np.ndarray):
+        thumbnail, key = None, None
+        if self.ocr_cache is not None:
+            thumbnail = self.ocr_cache.normalize(image_plate_crop)
+            key = self.ocr_cache.key(thumbnail)
+            cached = self.ocr_cache.match(thumbnail, key)
+            if cached is not None:
+                cached_text, owner = cached
+                # a near-identical crop of this same track is not a second independent read
+                if owner == track.track_id:
+                    track.skip_ocr_candidate()
+                else:
+                    track.add_vote(cached_text)
+                return
+
+        if self.ocr_pool is not None:
+            # the ocr stage counts where it runs: a queued job here, read_plate_text in sync mode
+            if self.ocr_pool.submit(image_plate_crop, (track, thumbnail, key)):
+                self.scheduler.ran('ocr')
+            else:
+                track.undo_ocr_candidate(image_plate_crop)
+            return
+        text = self.read_plate_text(image_plate_crop, use_cache=False)
+        if self.ocr_cache is not None:
+            self.ocr_cache.store(thumbnail, key, text, owner=track.track_id)
+        track.add_vote(text)
+
+    def read_plate_text(self, image_plate_crop: np.ndarray, use_cache: bool = True) -> str:
+        if use_cache and self.ocr_cache is not None:
+            cached_text = self.ocr_cache.get(image_plate_crop)
+            if cached_text is not None:
+                return cached_text
+        self.scheduler.ran('ocr')
+        with self.profiler.span('contrast'):
             image_plate_contrasted = self.process_text_extraction.image_contrast(image_plate_crop)
+        with self.profiler.span('text_extraction'):
+            text = self.process_text_extraction.text_extraction(image_plate_contrasted)
+        if use_cache and self.ocr_cache is not None:
+            self.ocr_cache.put(image_plate_crop, text)
+        return text
+
+    def read_vehicle_plate(self, vehicle_image: np.ndarray, image_vehicle_crop: np.ndarray, info_plate: Any,
+                           vehicle_bbox: List[int], track: Optional[Track], draw: bool):
+        # track is None for static images; returns (vehicle_image, license_plate or None, info)
+
+        # step 6: extract plate info
+        with self.profiler.span('plate_info'):
+            plate_mask, plate_bbox, plate_conf = self.model_segmentation.extract_plate_info(image_vehicle_crop,
+                                                                                            info_plate)
 
-            # step 11: text extraction
-            self.license_plate = self.process_text_extraction.text_extraction(image_plate_contrasted)
+        # step 7: draw segmentation (optional)
+        if draw:
+            with self.profiler.span('draw_segmentation'):
+                vehicle_image = self.model_segmentation.draw_plate_segmentation(vehicle_image, plate_mask,
+                                                                                vehicle_bbox)
+
+        if track is not None:
+            if track.confirmed():
+                return vehicle_image, track.license_plate, f'vehicle detected and plate already read'
+
+            # step 8:
+            plate_area = self.model_segmentation.calculate_mask_area(plate_mask)
+
+            if plate_area >= self.config.tracking.min_plate_area:
+                # step 9 - 10: mask and crop plate, on the plate bbox only
+                with self.profiler.span('mask_crop'):
+                    image_plate_crop = self.model_segmentation.mask_processing(image_vehicle_crop, plate_mask)
 
-            return vehicle_image, self.license_plate, f'vehicle detected and plate detected'
+                if image_plate_crop is None or image_plate_crop.size == 0:
+                    return vehicle_image, None, 'error: image_plate_crop is empty'
+
+                # step 11: keep the crop as a candidate of the track, ranked by size and sharpness
+                with self.profiler.span('sharpness'):
+                    sharpness = self.process_text_extraction.sharpness(image_plate_crop)
+                    # a copy: the vehicle crop outlives the frame as the capture of the plate
+                    track.add_candidate(image_plate_crop, plate_area, sharpness, image_vehicle_crop.copy())
+
+                # step 12: contrast + text extraction on the best candidate, only when the track asks for it
+                if track.ready_for_ocr():
+                    self.read_track_candidate(track)
+
+                return vehicle_image, track.license_plate or None, f'vehicle detected and plate detected'
+            else:
+                return vehicle_image, None, f'vehicle detected and plate detected but is small'
+        else:
+            # step 8 - 9: mask and crop plate, on the plate bbox only
+            with self.profiler.span('mask_crop'):
+                image_plate_crop = self.model_segmentation.mask_processing(image_vehicle_crop, plate_mask)
 
+            # step 10 - 11: contrast plate and text extraction (skipped for a cached near-identical crop)
+            license_plate = self.read_plate_text(image_plate_crop)
 
+            return vehicle_image, license_plate, f'vehicle detected and plate detected'
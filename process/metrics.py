@@ -0,0 +1,334 @@
+import os
+import time
+import threading
+import configparser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional, Tuple
+from process.profiling import LatencyHistogram, StageProfiler
+
+CONFIG_PATH = 'weapon_config.ini'
+METRICS_SECTION = 'METRICS'
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    # every series has a single writer (the loop of its source), so the hot path takes no lock
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class FrameRate:
+    """Frames of a source, counted on the hot path; fps is a moving average of the frame interval."""
+    __slots__ = ('frames', 'interval', 'last', 'smoothing', 'idle_seconds')
+
+    def __init__(self, smoothing: float = 0.1, idle_seconds: float = 5.0):
+        self.frames = 0
+        self.interval = 0.0
+        self.last = 0.0
+        self.smoothing = smoothing
+        self.idle_seconds = idle_seconds
+
+    def tick(self):
+        now = time.perf_counter()
+        if self.frames:
+            elapsed = now - self.last
+            self.interval = elapsed if self.frames == 1 else self.interval + self.smoothing * (elapsed - self.interval)
+        self.last = now
+        self.frames += 1
+
+    def fps(self) -> float:
+        if self.interval <= 0 or time.perf_counter() - self.last > self.idle_seconds:
+            return 0.0
+        return 1.0 / self.interval
+
+
+class _Function:
+    # sampled when the endpoint is scraped: costs nothing on the hot path
+    __slots__ = ('fn',)
+
+    def __init__(self, fn: Callable[[], float]):
+        self.fn = fn
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.add((time.perf_counter() - self.start) * 1e3)
+        return False
+
+
+def timed(histogram: LatencyHistogram) -> _Timer:
+    return _Timer(histogram)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = key + extra
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + '}'
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """
+    Metric families rendered in the Prometheus text format. Series are created once (under a lock)
+    and then updated lock-free by their source; gauges backed by functions and the stage histograms
+    of a StageProfiler are only read at scrape time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> (type, help, {labels: series})
+        self._families: Dict[str, Tuple[str, str, Dict[LabelKey, Any]]] = {}
+
+    def _series(self, name: str, kind: str, help_text: str, labels: Dict[str, Any], factory: Callable[[], Any]):
+        key = tuple(sorted((label, str(value)) for label, value in labels.items()))
+        with self._lock:
+            family = self._families.setdefault(name, (kind, help_text, {}))
+            if family[0] != kind:
+                raise ValueError(f'metric {name} is a {family[0]}, not a {kind}')
+            series = family[2].get(key)
+            if series is None:
+                series = family[2][key] = factory()
+        return series
+
+    def counter(self, name: str, help_text: str, **labels) -> Counter:
+        return self._series(name, 'counter', help_text, labels, Counter)
+
+    def gauge(self, name: str, help_text: str, **labels) -> Gauge:
+        return self._series(name, 'gauge', help_text, labels, Gauge)
+
+    def histogram(self, name: str, help_text: str, **labels) -> LatencyHistogram:
+        # observed in ms like every LatencyHistogram, exported in seconds
+        return self._series(name, 'histogram', help_text, labels, LatencyHistogram)
+
+    def gauge_function(self, name: str, help_text: str, fn: Callable[[], float], **labels):
+        self._series(name, 'gauge', help_text, labels, lambda: _Function(fn)).fn = fn
+
+    def counter_function(self, name: str, help_text: str, fn: Callable[[], float], **labels):
+        self._series(name, 'counter', help_text, labels, lambda: _Function(fn)).fn = fn
+
+    def stage_histograms(self, name: str, help_text: str, profiler: StageProfiler, **labels):
+        """Exports every stage histogram of `profiler` as one series with a `stage` label."""
+        self._series(name, 'histogram', help_text, labels, lambda: profiler)
+
+    def frame_rate(self, source: str) -> FrameRate:
+        # registering a source again rebinds its series to the new FrameRate
+        frame_rate = FrameRate()
+        self.counter_function('pipeline_frames_total', 'Frames processed', lambda: frame_rate.frames, source=source)
+        self.gauge_function('pipeline_fps', 'Frames per second, moving average', frame_rate.fps, source=source)
+        return frame_rate
+
+    def render(self) -> str:
+        with self._lock:
+            families = [(name, kind, help_text, list(series.items()))
+                        for name, (kind, help_text, series) in sorted(self._families.items())]
+        lines = []
+        for name, kind, help_text, series in families:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            for key, value in series:
+                if isinstance(value, StageProfiler):
+                    for stage, histogram in sorted(list(value.histograms.items())):
+                        self._render_histogram(lines, name, histogram, key + (('stage', stage),))
+                elif isinstance(value, LatencyHistogram):
+                    self._render_histogram(lines, name, value, key)
+                else:
+                    sample = value.fn() if isinstance(value, _Function) else value.value
+                    lines.append(f'{name}{_labels(key)} {_number(sample)}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _render_histogram(lines: list, name: str, histogram: LatencyHistogram, key: LabelKey):
+        counts = list(histogram.counts)
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{_labels(key, (("le", repr(bound / 1e3)),))} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{name}_bucket{_labels(key, (("le", "+Inf"),))} {cumulative}')
+        lines.append(f'{name}_sum{_labels(key)} {_number(histogram.total_ms / 1e3)}')
+        lines.append(f'{name}_count{_labels(key)} {cumulative}')
+
+
+# metrics shared by the detection processes, so every process exports them under the same names
+
+def frames_dropped(registry: MetricsRegistry, source: str) -> Counter:
+    return registry.counter('frames_dropped_total', 'Frames the capture failed to deliver or the loop discarded',
+                            source=source)
+
+
+def db_write_latency(registry: MetricsRegistry, source: str, table: str) -> LatencyHistogram:
+    return registry.histogram('db_write_latency_seconds', 'Latency of database inserts', source=source, table=table)
+
+
+def queue_depth(registry: MetricsRegistry, source: str, queue: str, fn: Callable[[], float]):
+    registry.gauge_function('queue_depth', 'Items waiting in a queue of the process', fn, source=source, queue=queue)
+
+
+def stage_latency(registry: MetricsRegistry, source: str, profiler: StageProfiler):
+    # inference latency is the detection / segmentation / text_extraction / weapon_inference stages
+    profiler.enabled = True
+    registry.stage_histograms('pipeline_stage_latency_seconds', 'Latency of each pipeline stage', profiler,
+                              source=source)
+
+
+def resolution_metrics(registry: MetricsRegistry, source: str, model_name: str, controller: Any):
+    # controller: ResolutionController
+    registry.gauge_function('inference_imgsz', 'Inference size in use', lambda: controller.imgsz,
+                            source=source, model=model_name)
+    for size in controller.sizes:
+        registry.counter_function('inference_imgsz_seconds_total', 'Time spent at each inference size',
+                                  lambda size=size: controller.time_at_sizes()[size], source=source,
+                                  model=model_name, imgsz=size)
+
+
+def model_memory(registry: MetricsRegistry, source: str, model_name: str, model: Any):
+    sizes: Dict[str, int] = {}
+
+    def memory() -> float:
+        # parameters and buffers do not change after loading: measured on the first scrape
+        if 'bytes' not in sizes:
+            sizes['bytes'] = model_memory_bytes(model)
+        return sizes['bytes']
+    registry.gauge_function('model_memory_bytes', 'Memory of the model parameters and buffers', memory,
+                            source=source, model=model_name)
+
+
+def model_warmup(registry: MetricsRegistry, source: str, model_name: str, warmup: Any):
+    # warmup: the ModelWarmup of the model wrapper, read at scrape time
+    registry.gauge_function('model_hot', '1 once the model finished its warm-up', lambda: float(warmup.hot),
+                            source=source, model=model_name)
+    registry.gauge_function('model_warmup_seconds', 'Duration of the last warm-up of the model',
+                            lambda: warmup.seconds, source=source, model=model_name)
+
+
+def model_memory_bytes(model: Any) -> int:
+    # ultralytics YOLO wraps the torch module in .model
+    module = getattr(model, 'model', model)
+    try:
+        tensors = list(module.parameters()) + list(module.buffers())
+    except (AttributeError, TypeError):
+        return 0
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+
+def resident_memory_bytes() -> int:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def register_process_metrics(registry: MetricsRegistry):
+    registry.gauge_function('process_resident_memory_bytes', 'Resident memory of the process', resident_memory_bytes)
+    registry.counter_function('process_cpu_seconds_total', 'User and system CPU time of the process',
+                              lambda: sum(os.times()[:2]))
+
+
+class MetricsServer:
+    """Serves the registry on http://host:port/metrics from a daemon thread."""
+
+    def __init__(self, registry: MetricsRegistry, port: int = 9108, host: str = '127.0.0.1'):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.httpd: Optional[ThreadingHTTPServer] = None
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'MetricsServer':
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='metrics-server', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.httpd = None
+
+
+def metrics_address(process_name: str, config_path: str = CONFIG_PATH) -> Optional[Tuple[str, int]]:
+    """(host, port) of the endpoint of `process_name` in the [METRICS] section; None when disabled."""
+    config = configparser.ConfigParser()
+    config.read(config_path, encoding='latin-1')
+    if not config.has_section(METRICS_SECTION):
+        return None
+    section = config[METRICS_SECTION]
+    if not section.getboolean('enabled', True) or not section.get(f'port_{process_name}'):
+        return None
+    return section.get('host', '127.0.0.1'), section.getint(f'port_{process_name}')
+
+
+def start_metrics_server(registry: MetricsRegistry, process_name: str,
+                         config_path: str = CONFIG_PATH) -> Optional[MetricsServer]:
+    address = metrics_address(process_name, config_path)
+    if address is None:
+        return None
+    host, port = address
+    try:
+        server = MetricsServer(registry, port, host).start()
+    except OSError as e:
+        print(f'metrics endpoint not started on {host}:{port}: {e}')
+        return None
+    print(f'metrics on http://{host}:{server.port}/metrics')
+    return server
@@ -0,0 +1,68 @@
+import time
+import cv2
+import numpy as np
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+def dhash(image: np.ndarray, hash_size: int = 8) -> int:
+    # difference hash: sign of the horizontal gradient on a (hash_size + 1) x hash_size thumbnail
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = small[:, 1:] > small[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class NearDuplicateFilter:
+    def __init__(self, threshold: int = 6, window_size: int = 16, window_seconds: float = 60.0):
+        """
+        threshold: max Hamming distance (out of 64 bits) for two frames to count as the same capture
+        window_size: recent hashes kept per source
+        window_seconds: hashes older than this never match
+        """
+        self.threshold = threshold
+        self.window_size = window_size
+        self.window_seconds = window_seconds
+        self.recent: Dict[str, deque] = {}
+        self.skipped = 0
+        self.written = 0
+
+    def match(self, image_hash: int, source: str = 'default', now: Optional[float] = None) -> Optional[Any]:
+        now = time.time() if now is None else now
+        for seen_at, recent_hash, payload in reversed(self.recent.get(source, ())):
+            if now - seen_at > self.window_seconds:
+                break
+            if hamming_distance(image_hash, recent_hash) <= self.threshold:
+                return payload
+        return None
+
+    def remember(self, image_hash: int, payload: Any, source: str = 'default', now: Optional[float] = None):
+        now = time.time() if now is None else now
+        window = self.recent.setdefault(source, deque(maxlen=self.window_size))
+        window.append((now, image_hash, payload))
+
+    def forget(self, payload: Any, source: str = 'default'):
+        """Drops a remembered payload, e.g. when writing the capture it stands for failed."""
+        window = self.recent.get(source)
+        if window is None:
+            return
+        kept = [entry for entry in window if entry[2] != payload]
+        self.written -= len(window) - len(kept)
+        window.clear()
+        window.extend(kept)
+
+    def check(self, image: np.ndarray, payload: Any, source: str = 'default') -> Optional[Any]:
+        """Returns the payload of a recent near-duplicate, or None after remembering `payload` for this image."""
+        image_hash = dhash(image)
+        previous = self.match(image_hash, source)
+        if previous is not None:
+            self.skipped += 1
+            return previous
+        self.remember(image_hash, payload, source)
+        self.written += 1
+        return None
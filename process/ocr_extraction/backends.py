@@ -0,0 +1,193 @@
+import threading
+import numpy as np
+import cv2
+from typing import Dict, List, Tuple, Type
+
+# (bbox as four corner points, text, confidence), the layout returned by easyocr's readtext
+TextLine = Tuple[List[List[int]], str, float]
+
+
+def box_points(xi: int, yi: int, xf: int, yf: int) -> List[List[int]]:
+    return [[xi, yi], [xf, yi], [xf, yf], [xi, yf]]
+
+
+class OcrBackend:
+    """
+    Lazily loaded OCR engine. Models are only loaded on the first call that needs them,
+    so constructing a backend (or a TextExtraction) costs nothing.
+    """
+    name: str = ''
+
+    def __init__(self, device: str = 'cpu'):
+        self.device = device
+        self._loaded = False
+        self._load_lock = threading.Lock()
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self.load()
+                self._loaded = True
+
+    def load(self):
+        raise NotImplementedError
+
+    def detect_lines(self, image: np.ndarray) -> List[List[int]]:
+        """Text line boxes [xi, yi, xf, yf] of one plate crop."""
+        raise NotImplementedError
+
+    def recognize_lines(self, line_images: List[np.ndarray]) -> List[Tuple[str, float]]:
+        """(text, confidence) for every line crop, computed in a single batched call."""
+        raise NotImplementedError
+
+    def read(self, image: np.ndarray) -> List[TextLine]:
+        return self.read_batch([image])[0]
+
+    def read_batch(self, images: List[np.ndarray]) -> List[List[TextLine]]:
+        # detect lines per plate, then recognize every line of every plate together
+        self.ensure_loaded()
+        return self.recognize_boxes(images, [self.detect_lines(image) for image in images])
+
+    def recognize_boxes(self, images: List[np.ndarray], boxes_per_image: List[List[List[int]]]) -> List[List[TextLine]]:
+        line_images = [image[yi:yf, xi:xf]
+                       for image, boxes in zip(images, boxes_per_image)
+                       for xi, yi, xf, yf in boxes]
+        recognized = iter(self.recognize_lines(line_images)) if line_images else iter(())
+
+        results = []
+        for boxes in boxes_per_image:
+            lines = []
+            for box in boxes:
+                text, confidence = next(recognized)
+                lines.append((box_points(*box), text, confidence))
+            results.append(lines)
+        return results
+
+
+class EasyOcrBackend(OcrBackend):
+    name = 'easyocr'
+
+    def __init__(self, device: str = 'cpu', languages: Tuple[str, ...] = ('es',)):
+        super().__init__(device)
+        self.languages = list(languages)
+        self.reader = None
+
+    def load(self):
+        import easyocr
+        self.reader = easyocr.Reader(self.languages, gpu=self.device.startswith('cuda'))
+
+    def detect_text(self, image: np.ndarray) -> Tuple[List[List[int]], list]:
+        """(horizontal line boxes [xi, yi, xf, yf], free-form quadrilaterals of rotated or skewed lines)."""
+        horizontal_list, free_list = self.reader.detect(image)
+        h, w = image.shape[:2]
+        boxes = []
+        for x_min, x_max, y_min, y_max in horizontal_list[0]:
+            xi, yi = max(0, int(x_min)), max(0, int(y_min))
+            xf, yf = min(w, int(x_max)), min(h, int(y_max))
+            if xf > xi and yf > yi:
+                boxes.append([xi, yi, xf, yf])
+        return boxes, free_list[0]
+
+    def detect_lines(self, image: np.ndarray) -> List[List[int]]:
+        return self.detect_text(image)[0]
+
+    def read_batch(self, images: List[np.ndarray]) -> List[List[TextLine]]:
+        self.ensure_loaded()
+        detected = [self.detect_text(image) for image in images]
+        # plates with free-form (rotated / skewed) lines go through readtext, which deskews them;
+        # the horizontal lines of every other plate are recognized together
+        skewed = [bool(free_boxes) for _, free_boxes in detected]
+        results = self.recognize_boxes(images, [[] if skew else boxes for (boxes, _), skew in zip(detected, skewed)])
+        for i, image in enumerate(images):
+            if skewed[i]:
+                results[i] = [([[int(x), int(y)] for x, y in bbox], text, float(confidence))
+                              for bbox, text, confidence in self.reader.readtext(image)]
+        return results
+
+    def recognize_lines(self, line_images: List[np.ndarray]) -> List[Tuple[str, float]]:
+        # easyocr recognizes all boxes of one image in batches: stack the lines on one canvas
+        gray_lines = [cv2.cvtColor(line, cv2.COLOR_BGR2GRAY) if line.ndim == 3 else line for line in line_images]
+        padding = 8
+        width = max(line.shape[1] for line in gray_lines)
+        height = sum(line.shape[0] + padding for line in gray_lines)
+        canvas = np.full((height, width), 255, dtype=np.uint8)
+
+        horizontal_list = []
+        offsets: Dict[int, int] = {}
+        y = 0
+        for i, line in enumerate(gray_lines):
+            h, w = line.shape
+            canvas[y:y + h, :w] = line
+            horizontal_list.append([0, w, y, y + h])
+            offsets[y] = i
+            y += h + padding
+
+        recognized: List[Tuple[str, float]] = [('', 0.0)] * len(gray_lines)
+        for bbox, text, confidence in self.reader.recognize(canvas, horizontal_list=horizontal_list, free_list=[],
+                                                            batch_size=len(gray_lines)):
+            index = offsets.get(int(bbox[0][1]))
+            if index is not None:
+                recognized[index] = (text, float(confidence))
+        return recognized
+
+
+class TrOcrBackend(OcrBackend):
+    name = 'trocr'
+
+    def __init__(self, device: str = 'cpu', model_name: str = 'microsoft/trocr-small-printed'):
+        super().__init__(device)
+        self.model_name = model_name
+        self.processor = None
+        self.model = None
+
+    def load(self):
+        import torch
+        from transformers import TrOCRProcessor, VisionEncoderDecoderModel
+        self.torch = torch
+        self.processor = TrOCRProcessor.from_pretrained(self.model_name)
+        self.model = VisionEncoderDecoderModel.from_pretrained(self.model_name).to(torch.device(self.device))
+        self.model.eval()
+
+    def detect_lines(self, image: np.ndarray) -> List[List[int]]:
+        # trocr only recognizes single lines: split the plate on rows without ink
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        h, w = gray.shape
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        if np.mean(binary) < 127:
+            binary = 255 - binary
+        ink = (binary == 0).sum(axis=1) > 0.02 * w
+
+        boxes, start = [], None
+        for y, has_ink in enumerate(list(ink) + [False]):
+            if has_ink and start is None:
+                start = y
+            elif not has_ink and start is not None:
+                if y - start >= 0.15 * h:
+                    boxes.append([0, start, w, y])
+                start = None
+        return boxes or [[0, 0, w, h]]
+
+    def recognize_lines(self, line_images: List[np.ndarray]) -> List[Tuple[str, float]]:
+        rgb_lines = [cv2.cvtColor(line, cv2.COLOR_GRAY2RGB) if line.ndim == 2 else cv2.cvtColor(line, cv2.COLOR_BGR2RGB)
+                     for line in line_images]
+        pixel_values = self.processor(rgb_lines, return_tensors="pt").pixel_values.to(self.torch.device(self.device))
+        with self.torch.no_grad():
+            output = self.model.generate(pixel_values, output_scores=True, return_dict_in_generate=True)
+        texts = self.processor.batch_decode(output.sequences, skip_special_tokens=True)
+        scores = self.model.compute_transition_scores(output.sequences, output.scores, normalize_logits=True)
+        confidences = self.torch.exp(scores.mean(dim=1)).tolist()
+        return list(zip(texts, confidences))
+
+
+OCR_BACKENDS: Dict[str, Type[OcrBackend]] = {
+    EasyOcrBackend.name: EasyOcrBackend,
+    TrOcrBackend.name: TrOcrBackend,
+}
+
+
+def create_backend(engine: str = 'easyocr', device: str = 'cpu') -> OcrBackend:
+    if engine not in OCR_BACKENDS:
+        raise ValueError(f'unknown ocr engine: {engine}, expected one of {list(OCR_BACKENDS)}')
+    return OCR_BACKENDS[engine](device)
@@ -0,0 +1,129 @@
+import time
+import threading
+import numpy as np
+import cv2
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from process.near_duplicates import dhash
+
+
+class OcrResultCache:
+    """
+    LRU cache of OCR text for plate crops, with ttl and size eviction.
+
+    Crops are normalized to a small blurred, zero-mean/unit-variance thumbnail; the perceptual
+    hash of that thumbnail is the cache key. Because a single changed character moves the hash
+    by only a few bits, every hit (exact or near) is verified on the thumbnails themselves: the
+    largest per-column-block difference must stay under `max_block_difference`. Noise, exposure
+    and scale changes of the same plate stay far below it, a different character does not.
+    Each entry remembers its `owner` (e.g. a track id), so a caller can tell a repeat of its own
+    read from an independent one.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0, max_block_difference: float = 0.12,
+                 thumbnail_size: Tuple[int, int] = (64, 16), block_width: int = 8):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_block_difference = max_block_difference
+        self.thumbnail_size = thumbnail_size
+        self.block_width = block_width
+        # key -> (text, stored_at, thumbnail, owner)
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def normalize(self, image_plate_crop: np.ndarray) -> np.ndarray:
+        gray = cv2.cvtColor(image_plate_crop, cv2.COLOR_BGR2GRAY) if image_plate_crop.ndim == 3 else image_plate_crop
+        thumbnail = cv2.resize(gray, self.thumbnail_size, interpolation=cv2.INTER_AREA).astype(np.float32)
+        thumbnail = cv2.GaussianBlur(thumbnail, (3, 3), 0)
+        thumbnail -= thumbnail.mean()
+        thumbnail /= thumbnail.std() + 1e-6
+        return thumbnail
+
+    def key(self, thumbnail: np.ndarray) -> int:
+        return dhash(thumbnail)
+
+    def difference(self, thumbnail_a: np.ndarray, thumbnail_b: np.ndarray) -> float:
+        width, height = self.thumbnail_size
+        diff = np.abs(thumbnail_a - thumbnail_b)
+        blocks = diff.reshape(height, width // self.block_width, self.block_width).mean(axis=(0, 2))
+        return float(blocks.max())
+
+    def _fresh(self, entry, now: float) -> bool:
+        return now - entry[1] <= self.ttl_seconds
+
+    def _expire(self, now: float):
+        # the front holds the least recently used entries; expired ones there are dropped eagerly,
+        # anything else past its ttl is caught by _fresh on lookup
+        while self.entries:
+            key, entry = next(iter(self.entries.items()))
+            if self._fresh(entry, now):
+                break
+            del self.entries[key]
+            self.expirations += 1
+
+    def lookup(self, thumbnail: np.ndarray, key: int, now: Optional[float] = None) -> Optional[str]:
+        match = self.match(thumbnail, key, now)
+        return match[0] if match is not None else None
+
+    def match(self, thumbnail: np.ndarray, key: int, now: Optional[float] = None) -> Optional[Tuple[str, Any]]:
+        """(text, owner) of the cached crop matching the thumbnail, or None."""
+        now = time.time() if now is None else now
+        with self.lock:
+            self._expire(now)
+            entry = self.entries.get(key)
+            if entry is not None and self._fresh(entry, now) \
+                    and self.difference(thumbnail, entry[2]) <= self.max_block_difference:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], entry[3]
+
+            fresh_keys = [k for k, e in self.entries.items() if self._fresh(e, now)]
+            if fresh_keys:
+                # block differences against every cached thumbnail in one vectorized pass
+                width, height = self.thumbnail_size
+                cached = np.stack([self.entries[k][2] for k in fresh_keys])
+                diff = np.abs(cached - thumbnail).reshape(len(fresh_keys), height, width // self.block_width,
+                                                          self.block_width)
+                differences = diff.mean(axis=(1, 3)).max(axis=1)
+                best = int(np.argmin(differences))
+                if differences[best] <= self.max_block_difference:
+                    best_key = fresh_keys[best]
+                    self.entries.move_to_end(best_key)
+                    self.near_hits += 1
+                    text, _, _, owner = self.entries[best_key]
+                    return text, owner
+
+            self.misses += 1
+            return None
+
+    def store(self, thumbnail: np.ndarray, key: int, text: str, now: Optional[float] = None, owner: Any = None):
+        # an empty read is not worth replaying: the next crop deserves a real ocr run
+        if not text.strip():
+            return
+        now = time.time() if now is None else now
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = (text, now, thumbnail, owner)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, image_plate_crop: np.ndarray) -> Optional[str]:
+        thumbnail = self.normalize(image_plate_crop)
+        return self.lookup(thumbnail, self.key(thumbnail))
+
+    def put(self, image_plate_crop: np.ndarray, text: str):
+        thumbnail = self.normalize(image_plate_crop)
+        self.store(thumbnail, self.key(thumbnail), text)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.near_hits + self.misses
+        return {'entries': len(self.entries), 'hits': self.hits, 'near_hits': self.near_hits,
+                'misses': self.misses, 'evictions': self.evictions, 'expirations': self.expirations,
+                'hit_rate': (self.hits + self.near_hits) / lookups if lookups else 0.0}
@@ -0,0 +1,73 @@
+import cv2
+import numpy as np
+from typing import List, Tuple
+
+UNDEREXPOSED = 'Underexposed'
+OVEREXPOSED = 'Overexposed'
+PROPERLY_EXPOSED = 'Properly exposed'
+
+
+class PlateEnhancer:
+    """
+    Contrast stage applied to plate crops before OCR.
+
+    CLAHE runs on every crop, as the previous stage did; with `exposure_gated_clahe` it is only
+    applied to over or underexposed crops, which is faster but changes the OCR input of well-exposed
+    crops (benchmarks/ocr_accuracy.py measures both). Histogram equalization only runs on flat crops.
+    Operators are created once and every statistic is computed a single time per crop; the output
+    is always a single-channel uint8 image.
+    """
+
+    def __init__(self, clip_limit: float = 3.0, tile_grid_size: Tuple[int, int] = (8, 8),
+                 dark_level: int = 50, bright_level: int = 200, exposure_fraction: float = 0.75,
+                 min_sharpness: float = 100.0, exposure_gated_clahe: bool = False):
+        self.exposure_gated_clahe = exposure_gated_clahe
+        self.clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=tile_grid_size)
+        self.dark_level = dark_level
+        self.bright_level = bright_level
+        self.exposure_fraction = exposure_fraction
+        self.min_sharpness = min_sharpness
+
+    def to_gray(self, img: np.ndarray) -> np.ndarray:
+        return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+
+    def histogram(self, gray: np.ndarray) -> np.ndarray:
+        return cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+
+    def exposure_level(self, hist: np.ndarray) -> str:
+        hist = hist / max(1, np.sum(hist))
+        if np.sum(hist[self.bright_level:]) > self.exposure_fraction:
+            return OVEREXPOSED
+        if np.sum(hist[:self.dark_level]) > self.exposure_fraction:
+            return UNDEREXPOSED
+        return PROPERLY_EXPOSED
+
+    def exposure_levels(self, grays: List[np.ndarray]) -> List[str]:
+        # exposure of the whole batch decided on one (n, 256) histogram matrix
+        hists = np.stack([self.histogram(gray) for gray in grays])
+        fractions = hists / np.maximum(1, hists.sum(axis=1, keepdims=True))
+        over = fractions[:, self.bright_level:].sum(axis=1) > self.exposure_fraction
+        under = fractions[:, :self.dark_level].sum(axis=1) > self.exposure_fraction
+        return [OVEREXPOSED if o else UNDEREXPOSED if u else PROPERLY_EXPOSED for o, u in zip(over, under)]
+
+    def sharpness(self, img: np.ndarray) -> float:
+        # variance of the laplacian: low values mean a blurred or flat crop
+        _, std = cv2.meanStdDev(cv2.Laplacian(self.to_gray(img), cv2.CV_32F))
+        return float(std[0, 0]) ** 2
+
+    def _enhance_gray(self, gray: np.ndarray, exposure: str) -> np.ndarray:
+        if not self.exposure_gated_clahe or exposure != PROPERLY_EXPOSED:
+            gray = self.clahe.apply(gray)
+        if self.sharpness(gray) < self.min_sharpness:
+            gray = cv2.equalizeHist(gray)
+        return gray
+
+    def enhance(self, img: np.ndarray) -> np.ndarray:
+        gray = self.to_gray(img)
+        return self._enhance_gray(gray, self.exposure_level(self.histogram(gray)))
+
+    def enhance_batch(self, imgs: List[np.ndarray]) -> List[np.ndarray]:
+        if not imgs:
+            return []
+        grays = [self.to_gray(img) for img in imgs]
+        return [self._enhance_gray(gray, exposure) for gray, exposure in zip(grays, self.exposure_levels(grays))]
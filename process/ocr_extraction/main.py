@@ -2,45 +2,25 @@ import cv2
 import os
 import numpy as np
 from process.ocr_extraction.ocr import OcrProcess
+from process.ocr_extraction.enhancement import PlateEnhancer
 from typing import List, Tuple, Union
 
 
 class TextExtraction:
-    def __init__(self):
-        self.ocr = OcrProcess()
+    def __init__(self, engine: str = 'easyocr', device: str = 'cpu'):
+        self.ocr = OcrProcess(engine, device)
+        self.enhancer = PlateEnhancer()
         self.min_vertical_distance = 12
 
-    def clahe(self, img: np.ndarray) -> np.ndarray:
-        lab = cv2.cvtColor(img, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        # CLAHE (Contrast Limited Adaptive Histogram Equalization)
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        clahe_img = clahe.apply(l)
-        updated_lab_img2 = cv2.merge((clahe_img, a, b))
-        CLAHE_img = cv2.cvtColor(updated_lab_img2, cv2.COLOR_LAB2BGR)
-        return CLAHE_img
+    def image_contrast(self, img: np.ndarray) -> np.ndarray:
+        # single-channel enhanced crop, ready for ocr
+        return self.enhancer.enhance(img)
 
-    def exposure_level(self, hist: np.ndarray) -> str:
-        hist = hist / np.sum(hist)
-        percent_over = np.sum(hist[200:])
-        percent_under = np.sum(hist[:50])
-        if percent_over > 0.75:
-            return "Overexposed"
-        elif percent_under > 0.75:
-            return "Underexposed"
-        else:
-            return "Properly exposed"
+    def image_contrast_batch(self, imgs: List[np.ndarray]) -> List[np.ndarray]:
+        return self.enhancer.enhance_batch(imgs)
 
-    def image_contrast(self, img: np.ndarray) -> np.ndarray:
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
-        if self.exposure_level(hist) == "Overexposed" or "Underexposed":
-            img = self.clahe(img)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        contrast = cv2.Laplacian(gray, cv2.CV_64F).var()  # type: ignore
-        if contrast < 100:
-            img = cv2.equalizeHist(gray)
-        return img
+    def sharpness(self, img: np.ndarray) -> float:
+        return self.enhancer.sharpness(img)
 
     def same_line(self, yi1, yi2):
         return abs(yi1 - yi2) < self.min_vertical_distance
@@ -63,3 +43,7 @@ class TextExtraction:
         number_line_text, text_detected = self.ocr.text_detection(plate_image_crop)
         full_text = self.process_text_line(text_detected)
         return full_text
+
+    def text_extraction_batch(self, plate_image_crops: List[np.ndarray]) -> List[str]:
+        detections = self.ocr.text_detection_batch(plate_image_crops)
+        return [self.process_text_line(text_detected) for _, text_detected in detections]
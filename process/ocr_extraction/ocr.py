@@ -1,28 +1,28 @@
 import numpy as np
-import cv2
-import torch
-from transformers import TrOCRProcessor, VisionEncoderDecoderModel
-import easyocr
 from typing import List, Tuple, Union, Any
+from process.ocr_extraction.backends import OcrBackend, TrOcrBackend, create_backend
 
 
 class OcrProcess:
-    def __init__(self):
-        # tr_ocr
-        self.processor = TrOCRProcessor.from_pretrained("microsoft/trocr-small-printed")
-        self.ocr_extractor = VisionEncoderDecoderModel.from_pretrained("microsoft/trocr-small-printed").to(
-            torch.device("cpu"))
-        # easyocr
-        self.ocr_detector = easyocr.Reader(['es'], gpu=True)
+    def __init__(self, engine: str = 'easyocr', device: str = 'cpu'):
+        # only the configured engine is created, and it loads its model on first use
+        self.backend: OcrBackend = create_backend(engine, device)
+        self.device = device
+        self.line_recognizer = None
 
         self.text_bbox: list = []
         self.text_extracted: str = ''
         self.text_confidence: float = 0.0
 
     def text_detection(self, text_image: np.ndarray):
-        text_line_detected = self.ocr_detector.readtext(text_image)
+        text_line_detected = self.backend.read(text_image)
         return len(text_line_detected), text_line_detected
 
+    def text_detection_batch(self, text_images: List[np.ndarray]):
+        # every line of every plate goes through a single recognition call
+        text_lines_detected = self.backend.read_batch(text_images)
+        return [(len(lines), lines) for lines in text_lines_detected]
+
     def extractor_text_line(self, text) -> Tuple[List[int], str, float]:
         bbox, self.text_extracted, self.text_confidence = text
         xi, yi, xf, yf = int(bbox[0][0]), int(bbox[0][1]), int(bbox[2][0]), int(bbox[2][1])
@@ -30,7 +30,11 @@ class OcrProcess:
         return self.text_bbox, self.text_extracted, self.text_confidence
 
     def image_to_text(self, img: np.ndarray):
-        pixel_values = self.processor(img, return_tensors="pt").pixel_values.to(torch.device("cuda"))
-        generated_ids = self.ocr_extractor.generate(pixel_values)
-        generated_text = self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+        # single line recognition with trocr, whatever engine does the plate reading
+        if isinstance(self.backend, TrOcrBackend):
+            self.line_recognizer = self.backend
+        elif self.line_recognizer is None:
+            self.line_recognizer = TrOcrBackend(self.device)
+        self.line_recognizer.ensure_loaded()
+        generated_text, _ = self.line_recognizer.recognize_lines([img])[0]
         return generated_text
@@ -0,0 +1,142 @@
+import time
+import queue
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from process.ocr_extraction.main import TextExtraction
+from process.resources import CpuAllocation, ResourceManager
+
+# every worker (thread or process) owns its OCR models; EasyOCR readers are not shared
+_worker_state = threading.local()
+
+
+def _init_worker(engine: str, device: str, resources: Optional[ResourceManager] = None,
+                 allocation: Optional[CpuAllocation] = None, own_process: bool = False):
+    # pinned before the models load, so the threads EasyOCR/torch start inherit the cpus
+    if resources is not None:
+        resources.apply(allocation=allocation, process=own_process)
+    _worker_state.text_extraction = TextExtraction(engine, device)
+
+
+def _read_plates(image_plate_crops: List[np.ndarray]) -> Tuple[List[str], float]:
+    start = time.perf_counter()
+    text_extraction = _worker_state.text_extraction
+    contrasted = text_extraction.image_contrast_batch(image_plate_crops)
+    texts = text_extraction.text_extraction_batch(contrasted)
+    return texts, time.perf_counter() - start
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class OcrWorkerPool:
+    def __init__(self, mode: str = 'thread', workers: int = 1, max_pending: int = 8, batch_size: int = 8,
+                 engine: str = 'easyocr', device: str = 'cpu', resources: Optional[ResourceManager] = None):
+        if mode not in ('thread', 'process'):
+            raise ValueError(f'unknown ocr pool mode: {mode}')
+        self.mode = mode
+        self.batch_size = batch_size
+        # with a ResourceManager the workers share the 'ocr' cpus and split its thread count
+        allocation = None
+        if resources is not None:
+            allocation = resources.allocation('ocr')
+            allocation = allocation._replace(threads=max(1, allocation.threads // workers))
+        executor_class = ThreadPoolExecutor if mode == 'thread' else ProcessPoolExecutor
+        self.executor = executor_class(max_workers=workers, initializer=_init_worker,
+                                       initargs=(engine, device, resources, allocation, mode == 'process'))
+
+        # bounded queue: submit never blocks the frame loop, it drops the job instead
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.idle_workers = threading.Semaphore(workers)
+        self.queued: queue.Queue = queue.Queue()
+        self.completed: queue.Queue = queue.Queue()
+
+        self.submitted = 0
+        self.dropped = 0
+        self.failed = 0
+        self.finished = 0
+        self.batches = 0
+        self.total_latency: deque = deque(maxlen=1000)
+        self.run_latency: deque = deque(maxlen=1000)
+
+        self.running = True
+        self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def submit(self, image_plate_crop: np.ndarray, owner: Any, block: bool = False) -> bool:
+        """
+        Queues the crop for OCR. `owner` (e.g. a Track) comes back with the text from poll().
+        Without `block` a full queue drops the job; with it the call waits for a free slot.
+        """
+        if not self.slots.acquire(blocking=block):
+            self.dropped += 1
+            return False
+        self.submitted += 1
+        self.queued.put((image_plate_crop, owner, time.perf_counter()))
+        return True
+
+    def _dispatch(self):
+        # crops that pile up while every worker is busy are sent as one batch
+        while self.running:
+            try:
+                first = self.queued.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            self.idle_workers.acquire()
+            jobs = [first]
+            while len(jobs) < self.batch_size:
+                try:
+                    jobs.append(self.queued.get_nowait())
+                except queue.Empty:
+                    break
+            future = self.executor.submit(_read_plates, [crop for crop, _, _ in jobs])
+            future.add_done_callback(lambda f, jobs=jobs: self._on_done(f, jobs))
+            self.batches += 1
+
+    def _on_done(self, future: Future, jobs: List[Tuple[np.ndarray, Any, float]]):
+        self.idle_workers.release()
+        for _ in jobs:
+            self.slots.release()
+        try:
+            texts, run_seconds = future.result()
+        except Exception as e:
+            self.failed += len(jobs)
+            print(f'ocr job failed: {e}')
+            return
+        done_at = time.perf_counter()
+        for (_, owner, submitted_at), text in zip(jobs, texts):
+            self.finished += 1
+            self.total_latency.append(done_at - submitted_at)
+            self.run_latency.append(run_seconds / len(jobs))
+            self.completed.put((owner, text))
+
+    def poll(self) -> List[Tuple[Any, str]]:
+        """Completed (owner, text) pairs since the last call; meant for the frame loop thread."""
+        results = []
+        while True:
+            try:
+                results.append(self.completed.get_nowait())
+            except queue.Empty:
+                return results
+
+    def pending(self) -> int:
+        return self.submitted - self.finished - self.failed
+
+    def stats(self) -> Dict[str, float]:
+        total = list(self.total_latency)
+        run = list(self.run_latency)
+        return {'submitted': self.submitted, 'finished': self.finished, 'failed': self.failed,
+                'dropped': self.dropped, 'pending': self.pending(), 'batches': self.batches,
+                'latency_p50': percentile(total, 0.50), 'latency_p95': percentile(total, 0.95),
+                'run_p50': percentile(run, 0.50), 'run_p95': percentile(run, 0.95)}
+
+    def shutdown(self, wait: bool = True):
+        self.running = False
+        self.dispatcher.join()
+        self.executor.shutdown(wait=wait)
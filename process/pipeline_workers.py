@@ -0,0 +1,114 @@
+import cv2
+from typing import Any, List, Optional, Tuple, Union
+from process.frame_ring import FrameRing, FrameSubscriber
+
+# process entry points of the multi-process pipeline: one capture process decodes into a FrameRing,
+# the weapon and plate processes read the same slots. Results are small tuples on a results queue:
+# (pipeline, seq, payload), and (pipeline, None, frames skipped) when the pipeline finishes.
+
+VideoSource = Union[int, str]
+
+
+def capture_shape(source: VideoSource) -> Tuple[int, int, int]:
+    """Frame shape of a camera or video file, to size the ring slots."""
+    capture = cv2.VideoCapture(source)
+    ret, frame = capture.read()
+    capture.release()
+    if not ret:
+        raise ValueError(f'cannot read frames from {source}')
+    return frame.shape
+
+
+def apply_resources(resources, component: str):
+    # once per process: OpenCV's pool is process-wide, the affinity and torch threads are this thread's
+    if resources is not None:
+        resources.configure_process()
+        resources.apply(component, process=True)
+
+
+def capture_frames(source: VideoSource, ring: FrameRing, outputs: List, stop_event, live: bool = True,
+                   max_frames: Optional[int] = None, ready: Optional[List] = None, resources=None):
+    """
+    Capture process: every frame is decoded straight into a free ring slot and published to `outputs`.
+    A live source skips frames while every slot is held; a file (live=False) waits for a slot instead.
+    Capture starts once every event in `ready` is set (the workers' models are loaded and hot).
+    `resources` (a ResourceManager) pins each process to the cpus of its component.
+    """
+    apply_resources(resources, 'capture')
+    for event in ready or []:
+        event.wait()
+    capture = cv2.VideoCapture(source)
+    seq = dropped = 0
+    try:
+        while not stop_event.is_set() and (max_frames is None or seq + dropped < max_frames):
+            slot = ring.acquire(0.0 if live else 0.1)
+            if slot is None:
+                if not live:
+                    continue
+                # every slot is still held by the consumers: skip the frame to stay live
+                if not capture.grab():
+                    break
+                dropped += 1
+                continue
+            buffer = ring.view(slot, writable=True)
+            ret, frame = capture.read(buffer)
+            if not ret:
+                ring.discard(slot)
+                break
+            shape = frame.shape if frame is buffer else ring.write(slot, frame)
+            ring.publish(slot, seq, shape, outputs)
+            seq += 1
+    finally:
+        capture.release()
+        for output in outputs:
+            output.put(None)
+    print(f'capture finished: {seq} frames published, {dropped} dropped with the ring full')
+
+
+def weapon_worker(ring: FrameRing, inbox, results, model_path: Optional[str] = None, params=None, roi=None,
+                  latest: bool = True, ready=None, resources=None):
+    # latest: frames that queued up while the model was busy are skipped (live sources)
+    from process.weapon_detection import WeaponDetector
+    apply_resources(resources, 'weapons')
+    detector = WeaponDetector(model_path, warmup=False)
+    detector.warm_up([params.imgsz if params is not None else None])
+    if ready is not None:
+        ready.set()
+    subscriber = FrameSubscriber(ring, inbox)
+    while True:
+        message = subscriber.get(latest=latest)
+        if message is None:
+            break
+        try:
+            _, detections = detector.detect_weapons(subscriber.frame(message), roi, params)
+        finally:
+            subscriber.release(message)
+        results.put(('weapon', message.seq, detections))
+    results.put(('weapon', None, subscriber.skipped))
+
+
+def plate_worker(ring: FrameRing, inbox, results, config=None, roi=None, latest: bool = True, ready=None,
+                 resources=None):
+    from process.main import PlateRecognition
+    apply_resources(resources, 'plates')
+    processor = PlateRecognition(config, roi, resources)
+    if ready is not None:
+        ready.set()
+    subscriber = FrameSubscriber(ring, inbox)
+    try:
+        while True:
+            message = subscriber.get(latest=latest)
+            if message is None:
+                break
+            try:
+                # draw=False: ring frames are read-only, the pipeline only crops copies of them
+                _, vehicles = processor.process_vehicular_plates(subscriber.frame(message), True, False)
+            finally:
+                subscriber.release(message)
+            plates: List[Any] = [{'track_id': vehicle['track_id'], 'license_plate': vehicle['license_plate'],
+                                  'vehicle_bbox': [int(v) for v in vehicle['vehicle_bbox']]}
+                                 for vehicle in vehicles if vehicle['license_plate']]
+            results.put(('plate', message.seq, plates))
+    finally:
+        processor.close()
+    results.put(('plate', None, subscriber.skipped))
@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Sequence
+
+# upper bounds (ms) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0, 2500.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram: constant memory however many samples it holds."""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q: float) -> float:
+        # linear interpolation inside the bucket holding the q-th sample, like prometheus' histogram_quantile
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen, lower = 0, 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return min(self.max_ms, lower + (bound - lower) * (rank - seen) / count)
+            seen += count
+            lower = bound
+        return self.max_ms
+
+    def stats(self) -> Dict[str, float]:
+        return {'count': self.count, 'total_ms': self.total_ms,
+                'mean_ms': self.total_ms / self.count if self.count else 0.0,
+                'p50_ms': self.percentile(0.50), 'p95_ms': self.percentile(0.95),
+                'p99_ms': self.percentile(0.99), 'max_ms': self.max_ms}
+
+
+class _NullSpan:
+    # shared by every span of a disabled profiler
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler: 'StageProfiler', name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+class StageProfiler:
+    """
+    Times named stages with `with profiler.span('stage'):` blocks. Every span feeds the histogram
+    of its stage; while a recording window is open spans are also kept as Chrome trace events
+    (chrome://tracing, ui.perfetto.dev) and written with export_trace. A disabled profiler hands
+    out a shared no-op span, so the instrumented code costs one attribute check per stage.
+    """
+
+    def __init__(self, enabled: bool = False, max_trace_events: int = 100000):
+        self.enabled = enabled
+        self.max_trace_events = max_trace_events
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.trace_events: List[Dict[str, Any]] = []
+        self.recording = False
+        self.record_until_ns: Optional[int] = None
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def span(self, name: str):
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name)
+
+    def record(self, name: str, start_ns: int, end_ns: int):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms.setdefault(name, LatencyHistogram())
+        histogram.add((end_ns - start_ns) / 1e6)
+        if self.recording:
+            self._trace(name, start_ns, end_ns)
+
+    def _trace(self, name: str, start_ns: int, end_ns: int):
+        with self._lock:
+            if self.record_until_ns is not None and start_ns > self.record_until_ns:
+                self.recording = False
+                return
+            if len(self.trace_events) >= self.max_trace_events:
+                self.recording = False
+                return
+            # complete events, timestamps in microseconds
+            self.trace_events.append({'name': name, 'cat': 'pipeline', 'ph': 'X', 'ts': start_ns / 1e3,
+                                      'dur': (end_ns - start_ns) / 1e3, 'pid': self.pid,
+                                      'tid': threading.get_ident()})
+
+    def start_recording(self, seconds: Optional[float] = None):
+        """Opens a trace recording window (enabling the profiler); None records until stop_recording."""
+        with self._lock:
+            self.enabled = True
+            self.trace_events = []
+            self.record_until_ns = None if seconds is None else time.perf_counter_ns() + int(seconds * 1e9)
+            self.recording = True
+
+    def stop_recording(self):
+        self.recording = False
+
+    def export_trace(self, path: str) -> int:
+        """Writes the recorded spans as Chrome trace-event JSON and returns how many were written."""
+        with self._lock:
+            events = list(self.trace_events)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
+
+    def reset(self):
+        self.histograms = {}
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {name: histogram.stats() for name, histogram in sorted(self.histograms.items())}
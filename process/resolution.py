@@ -0,0 +1,101 @@
+import time
+import configparser
+from typing import Any, Dict, Optional
+from process.config import ResolutionConfig
+
+CONFIG_PATH = 'weapon_config.ini'
+
+
+class ResolutionController:
+    """
+    Picks the inference size of one source among preset sizes from the latency it observes: a size
+    down when the smoothed latency exceeds the budget, a size up when load drops enough that the larger
+    size should still fit. Changes are printed with the time spent at the previous size.
+    """
+
+    def __init__(self, config: Optional[ResolutionConfig] = None, name: str = 'default'):
+        self.config = config or ResolutionConfig()
+        self.name = name
+        self.sizes = sorted(set(self.config.sizes))
+        initial = self.config.initial_size
+        self.index = self.sizes.index(initial) if initial in self.sizes else len(self.sizes) - 1
+        if self.config.latency_budget_ms is not None:
+            self.budget = self.config.latency_budget_ms / 1e3
+        else:
+            self.budget = 1.0 / self.config.target_fps
+
+        self.latency: Optional[float] = None
+        self.frames_at_size = 0
+        self.changes = 0
+        # a size up that has to be undone right away doubles the wait before the next one, so a
+        # latency that does not follow imgsz (e.g. ocr-bound frames) cannot make the size oscillate
+        self.last_change_up = False
+        self.up_backoff = 1
+        self.seconds_at_size: Dict[int, float] = {size: 0.0 for size in self.sizes}
+        self.since = time.perf_counter()
+
+    @property
+    def imgsz(self) -> int:
+        return self.sizes[self.index]
+
+    def observe(self, seconds: float) -> int:
+        """Records the latency of one frame at the current size and returns the size for the next one."""
+        if self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += self.config.smoothing * (seconds - self.latency)
+        self.frames_at_size += 1
+        min_frames = self.config.min_frames_between_changes
+        if self.frames_at_size < min_frames:
+            return self.imgsz
+        if self.last_change_up and self.frames_at_size >= 2 * min_frames:
+            self.up_backoff = 1
+
+        if self.latency > self.budget and self.index > 0:
+            self._switch(self.index - 1)
+        elif self.index < len(self.sizes) - 1 and self.frames_at_size >= min_frames * self.up_backoff:
+            predicted = self.latency * (self.sizes[self.index + 1] / self.imgsz) ** 2
+            if predicted < self.budget * self.config.up_margin:
+                self._switch(self.index + 1)
+        return self.imgsz
+
+    def _switch(self, index: int):
+        now = time.perf_counter()
+        spent = now - self.since
+        self.seconds_at_size[self.imgsz] += spent
+        print(f'{self.name}: imgsz {self.imgsz} -> {self.sizes[index]} (latency {self.latency * 1e3:.1f} ms, '
+              f'budget {self.budget * 1e3:.1f} ms, {spent:.1f} s at {self.imgsz})')
+        self.since = now
+        undone = self.last_change_up and self.frames_at_size < 2 * self.config.min_frames_between_changes
+        if index < self.index and undone:
+            self.up_backoff = min(64, self.up_backoff * 2)
+        self.last_change_up = index > self.index
+        self.index = index
+        # the average restarts with the frames of the new size
+        self.latency = None
+        self.frames_at_size = 0
+        self.changes += 1
+
+    def time_at_sizes(self) -> Dict[int, float]:
+        seconds = dict(self.seconds_at_size)
+        seconds[self.imgsz] += time.perf_counter() - self.since
+        return seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {'imgsz': self.imgsz, 'changes': self.changes, 'budget_ms': self.budget * 1e3,
+                'latency_ms': self.latency * 1e3 if self.latency is not None else 0.0,
+                'seconds_at_size': self.time_at_sizes()}
+
+
+def resolution_config_from_ini(config_path: str = CONFIG_PATH, section: str = 'DETECTION') -> ResolutionConfig:
+    """ResolutionConfig of the weapon detector from adaptive_imgsz, imgsz_sizes and target_fps in `section`."""
+    config = configparser.ConfigParser()
+    config.read(config_path, encoding='latin-1')
+    if not config.has_section(section):
+        return ResolutionConfig()
+    values = config[section]
+    resolution = ResolutionConfig(enabled=values.getboolean('adaptive_imgsz', False),
+                                  target_fps=values.getfloat('target_fps', 10.0))
+    if values.get('imgsz_sizes'):
+        resolution.sizes = [int(size) for size in values.get('imgsz_sizes').split(',')]
+    return resolution
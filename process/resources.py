@@ -0,0 +1,159 @@
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from process.config import ResourceConfig
+
+
+class CpuAllocation(NamedTuple):
+    component: str
+    cpus: Tuple[int, ...]
+    threads: int
+
+
+def available_cpus() -> List[int]:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def set_intra_op_threads(threads: int):
+    # torch's intra-op (OpenMP) thread count is per calling thread: each component sets its own
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+
+
+def set_affinity(cpus: Sequence[int], process: bool = False) -> bool:
+    """
+    Pins the calling thread (linux) to `cpus`. Elsewhere only the whole process can be pinned (with
+    psutil), so it is only done when `process` says the caller owns its process; otherwise nothing is
+    pinned and False is returned.
+    """
+    if hasattr(os, 'sched_setaffinity'):
+        # pid 0 is the calling thread; the threads it starts afterwards inherit the mask
+        os.sched_setaffinity(0, cpus)
+        return True
+    if not process:
+        # threads sharing a process would each re-pin all of it to their own cpus
+        return False
+    try:
+        import psutil
+        psutil.Process().cpu_affinity(list(cpus))
+    except (ImportError, AttributeError, OSError):
+        return False
+    return True
+
+
+def split_cpus(cpus: Sequence[int], weights: Dict[str, float]) -> Dict[str, Tuple[int, ...]]:
+    """Contiguous, disjoint cpu ranges proportional to the weights, at least one cpu each."""
+    cpus = list(cpus)
+    names = list(weights)
+    if not names:
+        return {}
+    if len(cpus) < len(names):
+        # fewer cpus than components: they have to share, round-robin
+        return {name: (cpus[i % len(cpus)],) for i, name in enumerate(names)}
+    if sum(weights.values()) <= 0:
+        weights = {name: 1.0 for name in names}
+    total = sum(weights.values())
+    exact = {name: len(cpus) * weights[name] / total for name in names}
+    counts = {name: max(1, int(exact[name])) for name in names}
+    while sum(counts.values()) > len(cpus):
+        name = max((name for name in names if counts[name] > 1), key=lambda name: counts[name] - exact[name])
+        counts[name] -= 1
+    while sum(counts.values()) < len(cpus):
+        name = max(names, key=lambda name: exact[name] - counts[name])
+        counts[name] += 1
+    ranges, start = {}, 0
+    for name in names:
+        ranges[name] = tuple(cpus[start:start + counts[name]])
+        start += counts[name]
+    return ranges
+
+
+def cpu_ranges(cpus: Sequence[int]) -> str:
+    # 0,1,2,3,8 -> 0-3,8
+    parts: List[str] = []
+    for cpu in sorted(cpus):
+        if parts and cpu == last + 1:
+            parts[-1] = f'{parts[-1].split("-")[0]}-{cpu}'
+        else:
+            parts.append(str(cpu))
+        last = cpu
+    return ','.join(parts)
+
+
+class ResourceManager:
+    """
+    Splits the host cpus between the pipeline components that share it (capture loops, weapon
+    detection, plate recognition, ocr workers) so their thread pools stop competing for every core:
+    torch, OpenCV and EasyOCR otherwise each size their pools to the whole machine. A component calls
+    apply() from the thread that runs it; that thread gets pinned to the component's cpus and its
+    intra-op thread count. Without per-thread affinity (windows, macos) only components that own their
+    process (apply(process=True)) are pinned; the others just get their thread counts.
+    benchmarks/resources.py measures the plan against the defaults.
+    """
+
+    def __init__(self, config: Optional[ResourceConfig] = None, cpus: Optional[Sequence[int]] = None):
+        self.config = config or ResourceConfig()
+        self.cpus = list(cpus or self.config.cpus or available_cpus())
+        self.plan = self._plan()
+
+    def _plan(self) -> Dict[str, CpuAllocation]:
+        components = self.config.components
+        explicit = {name: tuple(c.cpus) for name, c in components.items() if c.cpus}
+        taken = {cpu for cpus in explicit.values() for cpu in cpus}
+        # components without explicit cpus split the rest (or every cpu, when none is left)
+        free = [cpu for cpu in self.cpus if cpu not in taken] or self.cpus
+        ranges = split_cpus(free, {name: c.weight for name, c in components.items() if not c.cpus})
+        ranges.update(explicit)
+        return {name: CpuAllocation(name, ranges[name], components[name].threads or len(ranges[name]))
+                for name in components}
+
+    def allocation(self, component: str) -> CpuAllocation:
+        if component not in self.plan:
+            raise ValueError(f'unknown component: {component} (expected one of {", ".join(self.plan)})')
+        return self.plan[component]
+
+    def split(self, component: str, parts: int) -> List[CpuAllocation]:
+        """The cpus of a component divided among `parts` replicas (e.g. WeaponDetectorPool)."""
+        allocation = self.allocation(component)
+        ranges = split_cpus(allocation.cpus, {f'{component}-{i}': 1.0 for i in range(parts)})
+        return [CpuAllocation(name, cpus, max(1, allocation.threads * len(cpus) // len(allocation.cpus)))
+                for name, cpus in ranges.items()]
+
+    def apply(self, component: Optional[str] = None, allocation: Optional[CpuAllocation] = None,
+              process: bool = False) -> CpuAllocation:
+        """
+        Pins the calling thread to the component's cpus and sets its intra-op thread count. `process`
+        tells that the component runs alone in its process, which may then be pinned as a whole.
+        """
+        allocation = allocation or self.allocation(component)
+        if self.config.pin:
+            set_affinity(allocation.cpus, process)
+        set_intra_op_threads(allocation.threads)
+        return allocation
+
+    def opencv_threads(self) -> int:
+        if self.config.opencv_threads is not None:
+            return self.config.opencv_threads
+        if 'capture' in self.plan:
+            return self.plan['capture'].threads
+        return max(1, len(self.cpus) // max(1, len(self.plan)))
+
+    def configure_process(self):
+        """Process-wide settings, once per process before its components start: OpenCV's thread pool."""
+        import cv2
+        cv2.setNumThreads(self.opencv_threads())
+
+    def describe(self) -> str:
+        lines = [f'{len(self.cpus)} cpus, opencv {self.opencv_threads()} threads']
+        for allocation in self.plan.values():
+            lines.append(f'  {allocation.component:<10} cpus {cpu_ranges(allocation.cpus):<12} '
+                         f'{allocation.threads} threads')
+        return '\n'.join(lines)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'cpus': self.cpus, 'opencv_threads': self.opencv_threads(),
+                'components': {name: {'cpus': list(a.cpus), 'threads': a.threads} for name, a in self.plan.items()}}
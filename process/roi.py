@@ -0,0 +1,132 @@
+import os
+import threading
+import configparser
+import cv2
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+CONFIG_PATH = 'weapon_config.ini'
+ROI_SECTION = 'ROI'
+
+# polygon vertices as (x, y) fractions of the frame width and height
+Polygon = List[Tuple[float, float]]
+
+
+def parse_polygon(value: str) -> Polygon:
+    # "0.1,0.4 0.9,0.4 1.0,1.0 0.0,1.0"
+    points = []
+    for point in value.split():
+        x, y = point.split(',')
+        points.append((min(1.0, max(0.0, float(x))), min(1.0, max(0.0, float(y)))))
+    if len(points) < 3:
+        raise ValueError(f'roi polygon needs at least 3 points: {value!r}')
+    return points
+
+
+def format_polygon(polygon: Polygon) -> str:
+    return ' '.join(f'{x:.4f},{y:.4f}' for x, y in polygon)
+
+
+class RegionOfInterest:
+    """
+    Polygon region of one camera source. Inference only sees the polygon's bounding box, and
+    detections whose center falls outside the polygon are dropped. The pixel geometry is
+    computed once per frame size.
+    """
+
+    def __init__(self, polygon: Polygon):
+        self.polygon = polygon
+        # (h, w) -> (pixel polygon, [x1, y1, x2, y2])
+        self._geometry: Dict[Tuple[int, int], Tuple[np.ndarray, List[int]]] = {}
+
+    def geometry(self, frame_shape: Tuple[int, ...]) -> Tuple[np.ndarray, List[int]]:
+        h, w = frame_shape[:2]
+        geometry = self._geometry.get((h, w))
+        if geometry is None:
+            points = np.array([(x * w, y * h) for x, y in self.polygon], dtype=np.float32)
+            x1, y1 = (int(v) for v in np.floor(points.min(axis=0)))
+            x2, y2 = (int(v) for v in np.ceil(points.max(axis=0)))
+            geometry = (points, [max(0, x1), max(0, y1), min(w, max(x1 + 1, x2)), min(h, max(y1 + 1, y2))])
+            self._geometry[(h, w)] = geometry
+        return geometry
+
+    def crop(self, frame: np.ndarray) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """View of the frame limited to the roi bounding box, and its (x, y) offset in the frame."""
+        _, (x1, y1, x2, y2) = self.geometry(frame.shape)
+        return frame[y1:y2, x1:x2], (x1, y1)
+
+    def contains(self, frame_shape: Tuple[int, ...], bbox: List[int]) -> bool:
+        """True when the center of a frame-coordinates bbox lies inside the polygon."""
+        points, _ = self.geometry(frame_shape)
+        center = ((bbox[0] + bbox[2]) / 2.0, (bbox[1] + bbox[3]) / 2.0)
+        return cv2.pointPolygonTest(points, center, False) >= 0
+
+    def draw(self, frame: np.ndarray, color: Tuple[int, int, int] = (0, 255, 255)) -> np.ndarray:
+        points, _ = self.geometry(frame.shape)
+        cv2.polylines(frame, [np.round(points).astype(np.int32)], True, color, 2)
+        return frame
+
+
+def shift_bbox(bbox: List[int], offset: Tuple[int, int]) -> List[int]:
+    return [bbox[0] + offset[0], bbox[1] + offset[1], bbox[2] + offset[0], bbox[3] + offset[1]]
+
+
+class RoiStore:
+    """Per-source rois kept in the [ROI] section of the config file: `source = x,y x,y x,y ...`."""
+
+    def __init__(self, config_path: str = CONFIG_PATH):
+        self.config_path = config_path
+        self.lock = threading.Lock()
+        self.rois: Dict[str, RegionOfInterest] = {}
+        self.load()
+
+    def load(self):
+        config = configparser.ConfigParser()
+        config.read(self.config_path, encoding='latin-1')
+        rois = {}
+        if config.has_section(ROI_SECTION):
+            for source, value in config[ROI_SECTION].items():
+                try:
+                    rois[source] = RegionOfInterest(parse_polygon(value))
+                except ValueError as e:
+                    print(f'invalid roi for source {source}: {e}')
+        with self.lock:
+            self.rois = rois
+
+    def get(self, source: str) -> Optional[RegionOfInterest]:
+        with self.lock:
+            return self.rois.get(source.lower())
+
+    def set(self, source: str, polygon: Optional[Polygon]):
+        """Replaces the roi of a source (None removes it) and writes the config file."""
+        with self.lock:
+            if polygon:
+                self.rois[source.lower()] = RegionOfInterest(polygon)
+            else:
+                self.rois.pop(source.lower(), None)
+            lines = [f'{name} = {format_polygon(roi.polygon)}\n' for name, roi in sorted(self.rois.items())]
+            self._write_section(lines)
+
+    def _write_section(self, section_lines: List[str]):
+        # only the [ROI] block is rewritten; comments and the rest of the file stay untouched
+        lines: List[str] = []
+        if os.path.exists(self.config_path):
+            with open(self.config_path, encoding='latin-1') as f:
+                lines = f.readlines()
+        if lines and not lines[-1].endswith('\n'):
+            lines[-1] += '\n'
+
+        header = f'[{ROI_SECTION}]'
+        start = next((i for i, line in enumerate(lines) if line.strip() == header), None)
+        if start is None:
+            lines += ['\n', header + '\n'] + section_lines
+        else:
+            end = next((i for i in range(start + 1, len(lines)) if lines[i].lstrip().startswith('[')), len(lines))
+            comments = [line for line in lines[start + 1:end] if line.lstrip().startswith(('#', ';'))]
+            block = comments + section_lines + (['\n'] if end < len(lines) else [])
+            lines[start + 1:end] = block
+
+        tmp_path = self.config_path + '.tmp'
+        with open(tmp_path, 'w', encoding='latin-1') as f:
+            f.writelines(lines)
+        os.replace(tmp_path, self.config_path)
@@ -0,0 +1,45 @@
+from collections import Counter
+from typing import Dict, Optional
+from process.config import SchedulerConfig
+from process.tracking import Track
+
+STAGES = ('detection', 'segmentation', 'ocr')
+
+
+class StageScheduler:
+    """
+    Decides which stages run on a frame: vehicle detection at a reduced rate, plate segmentation
+    only for tracks whose plate is still unresolved. Keeps the fraction of frames each stage ran on.
+    """
+
+    def __init__(self, config: Optional[SchedulerConfig] = None):
+        self.config = config or SchedulerConfig()
+        self.frames = 0
+        self.stage_frames: Counter = Counter()
+        self._ran: set = set()
+
+    def start_frame(self, dynamic_image: bool = True) -> bool:
+        """Opens a new frame and returns whether vehicle detection runs on it (always for static images)."""
+        self.frames += 1
+        self._ran = set()
+        return not dynamic_image or (self.frames - 1) % max(1, self.config.detect_interval) == 0
+
+    def needs_segmentation(self, track: Optional[Track]) -> bool:
+        if track is None:
+            return True
+        if track.confirmed():
+            return False
+        # track.age counts the detection frames the vehicle was matched on
+        return (track.age - 1) % max(1, self.config.segment_interval) == 0
+
+    def ran(self, stage: str):
+        # a stage counts once per frame, however many vehicles it processed
+        if stage not in self._ran:
+            self._ran.add(stage)
+            self.stage_frames[stage] += 1
+
+    def stats(self) -> Dict[str, float]:
+        stats: Dict[str, float] = {'frames': self.frames}
+        for stage in STAGES:
+            stats[f'{stage}_fraction'] = self.stage_frames[stage] / self.frames if self.frames else 0.0
+        return stats
@@ -0,0 +1,142 @@
+import numpy as np
+from collections import Counter
+from typing import List, Optional, Tuple
+from process.config import TrackingConfig
+
+
+def iou(box_a: List[int], box_b: List[int]) -> float:
+    x1, y1 = max(box_a[0], box_b[0]), max(box_a[1], box_b[1])
+    x2, y2 = min(box_a[2], box_b[2]), min(box_a[3], box_b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    if intersection == 0:
+        return 0.0
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    return intersection / float(area_a + area_b - intersection)
+
+
+class Track:
+    def __init__(self, track_id: int, bbox: List[int], vehicle_type: str, config: TrackingConfig, conf: float = 0.0):
+        self.track_id = track_id
+        self.bbox = bbox
+        self.vehicle_type = vehicle_type
+        self.conf = conf
+        self.config = config
+        self.missed = 0
+        self.age = 1
+
+        # (score, crop, already_read, clean vehicle crop)
+        self.candidates: List[list] = []
+        # clean crop of the vehicle on the frame its ocr candidate came from: the evidence for the plate
+        self.vehicle_crop: Optional[np.ndarray] = None
+        self.candidates_seen = 0
+        self.candidates_at_last_ocr = 0
+        self.ocr_runs = 0
+        self.votes: Counter = Counter()
+        self.license_plate: str = ''
+
+    def add_candidate(self, plate_crop: np.ndarray, plate_area: float, sharpness: float,
+                      vehicle_crop: Optional[np.ndarray] = None):
+        self.candidates_seen += 1
+        self.candidates.append([plate_area * sharpness, plate_crop, False, vehicle_crop])
+        self.candidates.sort(key=lambda c: c[0], reverse=True)
+        del self.candidates[self.config.max_candidates:]
+
+    def confirmed(self) -> bool:
+        if self.ocr_runs >= self.config.max_ocr_runs:
+            return True
+        # two agreeing reads settle the plate
+        return bool(self.votes) and self.votes.most_common(1)[0][1] >= 2
+
+    def ready_for_ocr(self) -> bool:
+        if self.confirmed():
+            return False
+        pending = self.candidates_seen - self.candidates_at_last_ocr
+        return pending >= self.config.candidates_before_ocr and self.best_unread() is not None
+
+    def best_unread(self) -> Optional[list]:
+        for candidate in self.candidates:
+            if not candidate[2]:
+                return candidate
+        return None
+
+    def take_ocr_candidate(self) -> Optional[np.ndarray]:
+        candidate = self.best_unread()
+        if candidate is None:
+            return None
+        candidate[2] = True
+        if candidate[3] is not None:
+            self.vehicle_crop = candidate[3]
+        self.ocr_runs += 1
+        self.candidates_at_last_ocr = self.candidates_seen
+        return candidate[1]
+
+    def undo_ocr_candidate(self, plate_crop: np.ndarray):
+        # the ocr job could not be queued: the crop is eligible again
+        for candidate in self.candidates:
+            if candidate[1] is plate_crop:
+                candidate[2] = False
+        self.ocr_runs -= 1
+
+    def skip_ocr_candidate(self):
+        # the crop repeats one this track already read (ocr cache): spent, but neither a read nor a vote
+        self.ocr_runs -= 1
+
+    def add_vote(self, text: str):
+        text = ' '.join(text.split())
+        if text:
+            self.votes[text] += 1
+            self.license_plate = self.votes.most_common(1)[0][0]
+        if self.confirmed():
+            # crops are no longer needed once the plate is settled
+            self.candidates.clear()
+
+
+class VehicleTracker:
+    def __init__(self, config: Optional[TrackingConfig] = None):
+        self.config = config or TrackingConfig()
+        self.tracks: List[Track] = []
+        self.next_id = 1
+
+    def update(self, vehicles: List[Tuple[list, str, float]]) -> Tuple[List[Track], List[Track]]:
+        """Associates this frame's vehicles with tracks. Returns (track per vehicle, tracks lost this frame)."""
+        pairs = []
+        for t, track in enumerate(self.tracks):
+            for v, (bbox, _, _) in enumerate(vehicles):
+                overlap = iou(track.bbox, bbox)
+                if overlap >= self.config.iou_threshold:
+                    pairs.append((overlap, t, v))
+        pairs.sort(reverse=True)
+
+        assigned: List[Optional[Track]] = [None] * len(vehicles)
+        matched_tracks = set()
+        for _, t, v in pairs:
+            if t in matched_tracks or assigned[v] is not None:
+                continue
+            track = self.tracks[t]
+            track.bbox = vehicles[v][0]
+            track.conf = vehicles[v][2]
+            track.missed = 0
+            track.age += 1
+            assigned[v] = track
+            matched_tracks.add(t)
+
+        lost = []
+        active = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+                if track.missed > self.config.max_missed_frames:
+                    lost.append(track)
+                    continue
+            active.append(track)
+
+        for v, (bbox, vehicle_type, conf) in enumerate(vehicles):
+            if assigned[v] is None:
+                track = Track(self.next_id, bbox, vehicle_type, self.config, conf)
+                self.next_id += 1
+                assigned[v] = track
+                active.append(track)
+
+        self.tracks = active
+        return assigned, lost
@@ -4,48 +4,224 @@ from ultralytics import YOLO
 import os
 from datetime import datetime
 import json
+import time
+from typing import NamedTuple, Optional, Tuple
+from process.near_duplicates import NearDuplicateFilter
+from process.roi import shift_bbox
+from process.profiling import StageProfiler
+from process.metrics import model_memory, model_warmup, resolution_metrics, stage_latency
+from process.computer_vision_models.main import inference_size
+from process.computer_vision_models.letterbox import predict
+from process.computer_vision_models.warmup import ModelWarmup, WARMUP_FRAME_SHAPE
+
+
+class DetectionParams(NamedTuple):
+    """Parámetros de una llamada a detect_weapons; son inmutables y se pueden compartir entre hilos"""
+    confidence_threshold: float = 0.5
+    weapon_classes: Tuple[str, ...] = ('gun', 'knife', 'sword')
+    # Tamaño de inferencia; None usa el del modelo
+    imgsz: Optional[int] = None
+
+
+def detection_metadata(detections):
+    """
+    Metadatos JSON de una detección: los que save_detection guarda junto a la captura y los que
+    devuelve el servidor de inferencia
+    """
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'detections': detections,
+        'total_weapons': len(detections)
+    }
+
+
+def load_weapon_model(model_path=None):
+    """
+    Carga el modelo YOLO de armas
+    Args:
+        model_path: Ruta al modelo YOLO personalizado (opcional)
+    Returns:
+        YOLO: Modelo personalizado, el entrenado del proyecto o yolov8n.pt
+    """
+    # Obtener ruta absoluta al modelo entrenado
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    default_model_path = os.path.join(BASE_DIR, "computer_vision_models", "models", "best.pt")
+    
+    # Cargar modelo con mensajes de depuración
+    if model_path and os.path.exists(model_path):
+        print(f"[INFO] Usando modelo personalizado: {model_path}")
+        return YOLO(model_path)
+    elif os.path.exists(default_model_path):
+        print(f"[INFO] Usando modelo entrenado: {default_model_path}")
+        return YOLO(default_model_path)
+    else:
+        print("[INFO] Usando modelo por defecto: yolov8n.pt")
+        return YOLO('yolov8n.pt')
+
 
 class WeaponDetector:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, duplicate_filter=None, profiler=None, resolution=None, warmup=True):
         """
         Inicializa el detector de armas
         Args:
             model_path: Ruta al modelo YOLO personalizado (opcional)
+            duplicate_filter: NearDuplicateFilter usado por save_unique_detection (opcional)
+            profiler: StageProfiler que mide las etapas de detect_weapons (opcional, desactivado por defecto)
+            resolution: ResolutionController que ajusta el imgsz a la latencia observada (opcional)
+            warmup: Calentar el modelo al cargarlo para que el primer frame no pague su inicialización
         """
         self.model = None
-        self.confidence_threshold = 0.5
-        self.weapon_classes = ['gun', 'knife', 'sword']
-        
-        # Obtener ruta absoluta al modelo entrenado
-        BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-        default_model_path = os.path.join(BASE_DIR, "computer_vision_models", "models", "best.pt")
-        
-        # Cargar modelo con mensajes de depuración
-        if model_path and os.path.exists(model_path):
-            print(f"[INFO] Usando modelo personalizado: {model_path}")
-            self.model = YOLO(model_path)
-        elif os.path.exists(default_model_path):
-            print(f"[INFO] Usando modelo entrenado: {default_model_path}")
-            self.model = YOLO(default_model_path)
+        self.duplicate_filter = duplicate_filter or NearDuplicateFilter()
+        self.profiler = profiler or StageProfiler()
+        self.frame_rate = None
+        self.resolution = resolution
+        # LetterboxCache compartido con otros modelos del mismo frame (opcional, ver CombinedPipeline)
+        self.letterbox_cache = None
+        # Se reemplazan completos, nunca se modifican: cada llamada usa los de su inicio
+        self.params = DetectionParams()
+        self.warmup = ModelWarmup('weapon_detection')
+        self.load_model(model_path, warmup)
+    
+    @property
+    def is_hot(self):
+        """True cuando el modelo actual ya pasó el calentamiento"""
+        return self.model is not None and self.warmup.hot
+    
+    def warmup_sizes(self):
+        # Tamaños que detect_weapons puede usar: los del controlador de resolución o el de los parámetros
+        if self.resolution is not None:
+            return self.resolution.sizes
+        return [self.params.imgsz]
+    
+    def load_model(self, model_path=None, warmup=True, sizes=None):
+        """
+        Carga (o reemplaza) el modelo; con warmup, el nuevo modelo se calienta antes de reemplazar
+        al actual, así los frames en curso nunca pasan por un modelo frío
+        Args:
+            model_path: Ruta al modelo YOLO personalizado (opcional)
+            warmup: Calentar el modelo antes de usarlo
+            sizes: Tamaños de inferencia a calentar (por defecto warmup_sizes())
+        """
+        model = load_weapon_model(model_path)
+        if warmup:
+            self._warm_up(model, sizes or self.warmup_sizes())
         else:
-            print("[INFO] Usando modelo por defecto: yolov8n.pt")
-            self.model = YOLO('yolov8n.pt')
+            self.warmup.hot = False
+        self.model = model
     
-    def detect_weapons(self, frame):
+    def warm_up(self, sizes=None, frame_shape=WARMUP_FRAME_SHAPE, batch_sizes=(1,), repeats=2):
+        """
+        Inferencias de prueba en cada tamaño y tamaño de lote, registradas en self.warmup
+        Returns:
+            float: Segundos de calentamiento
+        """
+        return self._warm_up(self.model, sizes or self.warmup_sizes(), frame_shape, batch_sizes, repeats)
+    
+    def _warm_up(self, model, sizes, frame_shape=WARMUP_FRAME_SHAPE, batch_sizes=(1,), repeats=2):
+        confidence = self.params.confidence_threshold
+        return self.warmup.run(lambda images, imgsz: model(images, conf=confidence, verbose=False,
+                                                           **inference_size(imgsz)),
+                               sizes, frame_shape, batch_sizes, repeats)
+    
+    @property
+    def confidence_threshold(self):
+        return self.params.confidence_threshold
+    
+    @confidence_threshold.setter
+    def confidence_threshold(self, value):
+        self.params = self.params._replace(confidence_threshold=value)
+    
+    @property
+    def weapon_classes(self):
+        return self.params.weapon_classes
+    
+    @weapon_classes.setter
+    def weapon_classes(self, value):
+        self.params = self.params._replace(weapon_classes=tuple(value))
+    
+    def register_metrics(self, registry, source):
+        """
+        Publica las métricas del detector (fps, latencia por etapa, memoria del modelo)
+        Args:
+            registry: MetricsRegistry del proceso
+            source: Identificador de la cámara o fuente de video
+        """
+        stage_latency(registry, source, self.profiler)
+        self.frame_rate = registry.frame_rate(source)
+        if self.model is not None:
+            model_memory(registry, source, 'weapon_detection', self.model)
+        model_warmup(registry, source, 'weapon_detection', self.warmup)
+        if self.resolution is not None:
+            self.resolution.name = f'{source} weapon_detection'
+            resolution_metrics(registry, source, 'weapon_detection', self.resolution)
+    
+    def detect_weapons(self, frame, roi=None, params=None):
         """
         Detecta armas en un frame
         Args:
             frame: Frame de imagen (numpy array)
+            roi: RegionOfInterest de la fuente (opcional); el modelo solo procesa su recuadro
+            params: DetectionParams de esta llamada (opcional, por defecto self.params)
         Returns:
             results: Resultados de la detección
-            detections: Lista de detecciones con información
+            detections: Lista de detecciones con información (coordenadas del frame completo)
         """
         if self.model is None:
             return None, []
         
+        if self.frame_rate is not None:
+            self.frame_rate.tick()
+        params = params or self.params
+        resolution = self.resolution
+        if resolution is None:
+            with self.profiler.span('weapon_detection'):
+                return self._detect_weapons(frame, roi, params)
+        
+        # Tamaño elegido por el controlador según la latencia de los frames anteriores
+        start = time.perf_counter()
+        with self.profiler.span('weapon_detection'):
+            result = self._detect_weapons(frame, roi, params._replace(imgsz=resolution.imgsz))
+        resolution.observe(time.perf_counter() - start)
+        return result
+    
+    def _detect_weapons(self, frame, roi, params):
+        # Recortar al recuadro de la región de interés
+        offset = (0, 0)
+        image = frame
+        if roi is not None:
+            image, offset = roi.crop(frame)
+        
         # Realizar detección
-        results = self.model(frame, conf=self.confidence_threshold)
+        with self.profiler.span('weapon_inference'):
+            results = predict(self.model, image, params.imgsz, self.letterbox_cache,
+                              conf=params.confidence_threshold)
+        
+        with self.profiler.span('weapon_postprocess'):
+            detections = self._extract_detections(frame, results, roi, offset, params.weapon_classes)
+        return results, detections
+    
+    def detect_weapons_batch(self, frames, params=None):
+        """
+        Detecta armas en varios frames con una sola pasada del modelo
+        Args:
+            frames: Lista de frames (numpy arrays), pueden tener tamaños distintos
+            params: DetectionParams comunes a todos los frames (opcional, por defecto self.params)
+        Returns:
+            list: Un par (results, detections) por frame, como detect_weapons
+        """
+        if self.model is None or not frames:
+            return [(None, []) for _ in frames]
+        
+        params = params or self.params
+        with self.profiler.span('weapon_inference'):
+            results = self.model(list(frames), conf=params.confidence_threshold, **inference_size(params.imgsz))
         
+        with self.profiler.span('weapon_postprocess'):
+            return [([result], self._extract_detections(frame, [result], None, (0, 0), params.weapon_classes))
+                    for frame, result in zip(frames, results)]
+    
+    def _extract_detections(self, frame, results, roi, offset, weapon_classes):
+        # Convierte los resultados del modelo en detecciones del frame completo
         detections = []
         for result in results:
             boxes = result.boxes
@@ -58,16 +234,21 @@ class WeaponDetector:
                     class_name = result.names[class_id]
                     
                     # Verificar si es una clase de arma
-                    if any(weapon in class_name.lower() for weapon in self.weapon_classes):
+                    if any(weapon in class_name.lower() for weapon in weapon_classes):
+                        bbox = shift_bbox([int(x1), int(y1), int(x2), int(y2)], offset)
+                        
+                        # Descartar detecciones fuera del polígono
+                        if roi is not None and not roi.contains(frame.shape, bbox):
+                            continue
+                        
                         detection = {
-                            'bbox': [int(x1), int(y1), int(x2), int(y2)],
+                            'bbox': bbox,
                             'confidence': float(confidence),
                             'class_id': class_id,
                             'class_name': class_name
                         }
                         detections.append(detection)
-        
-        return results, detections
+        return detections
     
     def draw_detections(self, frame, detections):
         """
@@ -114,11 +295,7 @@ class WeaponDetector:
             cv2.imwrite(save_path, annotated_frame)
             
             # Guardar metadatos
-            metadata = {
-                'timestamp': datetime.now().isoformat(),
-                'detections': detections,
-                'total_weapons': len(detections)
-            }
+            metadata = detection_metadata(detections)
             
             metadata_path = save_path.replace('.jpg', '_metadata.json')
             with open(metadata_path, 'w') as f:
@@ -129,6 +306,65 @@ class WeaponDetector:
             print(f"Error al guardar detección: {e}")
             return False
     
+    @staticmethod
+    def detection_region(frame, detections):
+        """Recorte del frame que cubre todas las detecciones (el frame completo si no hay ninguna)"""
+        boxes = [d['bbox'] for d in detections if 'bbox' in d]
+        if not boxes:
+            return frame
+        h, w = frame.shape[:2]
+        x1, y1 = max(0, int(min(b[0] for b in boxes))), max(0, int(min(b[1] for b in boxes)))
+        x2, y2 = min(w, int(max(b[2] for b in boxes))), min(h, int(max(b[3] for b in boxes)))
+        region = frame[y1:y2, x1:x2]
+        return region if region.size else frame
+
+    def save_unique_detection(self, frame, detections, save_path, source='default'):
+        """
+        Guarda una captura salvo que sea casi idéntica a una reciente de la misma fuente.
+        Se compara la región de las detecciones y no el frame completo: con una cámara fija dos
+        eventos distintos dan frames casi iguales. Las clases detectadas forman parte de la clave,
+        así que un arma distinta nunca se fusiona. Los frames repetidos se fusionan en los
+        metadatos de la captura existente.
+        Args:
+            frame: Frame de imagen
+            detections: Lista de detecciones
+            save_path: Ruta donde guardar la imagen si es nueva
+            source: Identificador de la cámara o fuente de video
+        Returns:
+            str: Ruta de la captura que representa el frame (nueva o existente), None si falló
+        """
+        classes = ','.join(sorted({str(d.get('class_name', '')) for d in detections}))
+        key = f"{source}/{classes}"
+        previous_path = self.duplicate_filter.check(self.detection_region(frame, detections), save_path, key)
+        if previous_path is not None:
+            self.merge_detection(previous_path, detections)
+            return previous_path
+        
+        if not self.save_detection(frame, detections, save_path):
+            self.duplicate_filter.forget(save_path, key)
+            return None
+        return save_path
+    
+    def merge_detection(self, save_path, detections):
+        """
+        Registra un frame casi idéntico en los metadatos de una captura existente
+        Args:
+            save_path: Ruta de la captura existente
+            detections: Lista de detecciones del frame descartado
+        """
+        metadata_path = save_path.replace('.jpg', '_metadata.json')
+        try:
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+            metadata['merged_frames'] = metadata.get('merged_frames', 0) + 1
+            metadata['last_timestamp'] = datetime.now().isoformat()
+            metadata['max_weapons'] = max(metadata.get('max_weapons', metadata['total_weapons']),
+                                          len(detections))
+            with open(metadata_path, 'w') as f:
+                json.dump(metadata, f, indent=2)
+        except Exception as e:
+            print(f"Error al fusionar detección: {e}")
+    
     def get_detection_summary(self, detections):
         """
         Genera un resumen de las detecciones